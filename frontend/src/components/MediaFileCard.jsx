@@ -1,11 +1,12 @@
 import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { transcriptionAPI } from '../services/api';
+import { mediaAPI, transcriptionAPI } from '../services/api';
 import { formatFileSize, formatDuration, formatDate } from '../utils/formatters';
 
 export const MediaFileCard = ({ file, onDelete, onRefresh }) => {
   const [transcriptionStatus, setTranscriptionStatus] = useState(null);
   const [polling, setPolling] = useState(false);
+  const [posterFailed, setPosterFailed] = useState(false);
 
   useEffect(() => {
     // Poll for transcription status if file is processing
@@ -51,6 +52,7 @@ export const MediaFileCard = ({ file, onDelete, onRefresh }) => {
       transcribing: { color: 'bg-blue-100 text-blue-800', text: 'Transcribing' },
       transcribing_chunked: { color: 'bg-blue-100 text-blue-800', text: 'Transcribing (Large File)' },
       processing_audio: { color: 'bg-yellow-100 text-yellow-800', text: 'Processing Audio' },
+      deferred_processing: { color: 'bg-yellow-100 text-yellow-800', text: 'Waiting for Capacity' },
       pending_transcription: { color: 'bg-yellow-100 text-yellow-800', text: 'Pending Transcription' },
       uploading: { color: 'bg-gray-100 text-gray-800', text: 'Uploading' },
       failed_transcription: { color: 'bg-red-100 text-red-800', text: 'Transcription Failed' },
@@ -82,6 +84,17 @@ export const MediaFileCard = ({ file, onDelete, onRefresh }) => {
 
   return (
     <div className="card hover:shadow-md transition-shadow duration-200">
+      {/* Poster frame, generated at ingest so the video itself is never touched */}
+      {file.storage_path_trickplay && !posterFailed && (
+        <img
+          src={mediaAPI.getTrickplayUrl(file.id, 'poster.jpg')}
+          alt=""
+          loading="lazy"
+          onError={() => setPosterFailed(true)}
+          className="w-full aspect-video object-cover rounded-lg mb-4 bg-gray-100"
+        />
+      )}
+
       {/* File Header */}
       <div className="flex items-start justify-between mb-4">
         <div className="flex items-center space-x-3">
@@ -161,8 +174,21 @@ export const MediaFileCard = ({ file, onDelete, onRefresh }) => {
             <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-primary-600"></div>
             <span className="text-sm text-gray-600">Processing...</span>
           </div>
+          {transcriptionStatus?.queue_position && (
+            <p className="text-xs text-gray-500 mb-2">
+              Queue position {transcriptionStatus.queue_position} of {transcriptionStatus.queue_length}
+              {' '}• starts in ~{formatDuration(transcriptionStatus.estimated_start_seconds)}
+            </p>
+          )}
           <div className="w-full bg-gray-200 rounded-full h-2">
-            <div className="bg-primary-600 h-2 rounded-full animate-pulse" style={{ width: '60%' }}></div>
+            {transcriptionStatus?.status === 'processing_audio' && transcriptionStatus.processing_progress != null ? (
+              <div
+                className="bg-primary-600 h-2 rounded-full transition-all duration-500"
+                style={{ width: `${transcriptionStatus.processing_progress}%` }}
+              ></div>
+            ) : (
+              <div className="bg-primary-600 h-2 rounded-full animate-pulse" style={{ width: '60%' }}></div>
+            )}
           </div>
         </div>
       )}
@@ -1,5 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
 import './ModernInteractiveTranscript.css';
+import { findWordAt, segmentWords } from '../../utils/wordTimings';
 
 const ModernInteractiveTranscript = ({
   segments,
@@ -7,6 +8,8 @@ const ModernInteractiveTranscript = ({
   onSegmentClick,
   onSegmentUpdate,
   onRepeatModeActivate,
+  wordTimings = null,
+  currentTime = 0,
   className = ''
 }) => {
   const [focusMode, setFocusMode] = useState(false);
@@ -178,6 +181,25 @@ const ModernInteractiveTranscript = ({
     );
   };
 
+  // Active segment rendered word by word, with the word at the playhead highlighted
+  const renderActiveWords = (segmentIndex) => {
+    if (!wordTimings || segmentIndex >= wordTimings.segmentCount) return null;
+    const [first, last] = segmentWords(wordTimings, segmentIndex);
+    if (first === last) return null;
+
+    const current = findWordAt(wordTimings, currentTime);
+    const words = [];
+    for (let i = first; i < last; i++) {
+      words.push(
+        <span key={i} className={i === current ? 'word-highlight' : undefined}>
+          {wordTimings.word(i)}
+        </span>,
+        ' '
+      );
+    }
+    return words;
+  };
+
   const filteredSegments = segments.filter(segment =>
     !searchTerm || segment.text.toLowerCase().includes(searchTerm.toLowerCase())
   );
@@ -370,7 +392,7 @@ const ModernInteractiveTranscript = ({
                   </div>
                   
                   <div className="segment-text">
-                    {highlightSearchTerm(segment.text)}
+                    {(isActive && !searchTerm && renderActiveWords(originalIndex)) || highlightSearchTerm(segment.text)}
                   </div>
                   
                   {segment.speaker && (
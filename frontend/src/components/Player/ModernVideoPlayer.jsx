@@ -3,6 +3,7 @@ import videojs from 'video.js';
 import 'video.js/dist/video-js.css';
 import './ModernVideoPlayer.css';
 import { mediaAPI } from '../../services/api';
+import { parseThumbnailsVtt, findThumbnail } from '../../utils/thumbnails';
 
 const ESL_MODES = {
   NORMAL: 'normal',
@@ -36,6 +37,8 @@ const ModernVideoPlayer = ({
   const [currentTime, setCurrentTime] = useState(0);
   const [duration, setDuration] = useState(0);
   const [volume, setVolume] = useState(1);
+  const [thumbnails, setThumbnails] = useState([]);
+  const [hoverPreview, setHoverPreview] = useState(null);
 
   // Toggle play/pause
   const togglePlay = useCallback(() => {
@@ -321,8 +324,15 @@ const ModernVideoPlayer = ({
     console.log('MediaFile properties:', mediaFile ? Object.keys(mediaFile) : 'null');
 
     if (playerRef.current && mediaFile && mediaFile.id) {
-      // Use the correct API endpoint for serving media files
-      const videoUrl = mediaAPI.getMediaFileUrl(mediaFile.id);
+      // Prefer the HLS package for long videos: seeks fetch one small segment
+      const useHls = mediaFile.file_type === 'video' && !!mediaFile.storage_path_hls;
+      // Audio uploads play the compact playback rendition once it exists
+      const useAudioRendition = mediaFile.file_type === 'audio' && !!mediaFile.storage_path_audio_playback;
+      const videoUrl = useHls
+        ? mediaAPI.getHlsManifestUrl(mediaFile.id)
+        : useAudioRendition
+          ? mediaAPI.getAudioFileUrl(mediaFile.id)
+          : mediaAPI.getMediaFileUrl(mediaFile.id);
 
       console.log('Setting video source:', videoUrl);
       console.log('Media file type:', mediaFile.file_type);
@@ -331,7 +341,11 @@ const ModernVideoPlayer = ({
       // Set the source
       playerRef.current.src({
         src: videoUrl,
-        type: mediaFile.file_type === 'video' ? 'video/mp4' : 'audio/mp3'
+        type: useHls
+          ? 'application/x-mpegURL'
+          : useAudioRendition
+            ? (mediaFile.storage_path_audio_playback.endsWith('.webm') ? 'audio/webm' : 'audio/mp4')
+            : mediaFile.file_type === 'video' ? 'video/mp4' : 'audio/mp3'
       });
 
       // Reset player state
@@ -348,6 +362,28 @@ const ModernVideoPlayer = ({
     }
   }, [mediaFile, playerRef.current]);
 
+  // Load the scrubbing thumbnails track when the video has one
+  useEffect(() => {
+    setThumbnails([]);
+    if (!mediaFile?.id || !mediaFile.storage_path_trickplay) return;
+
+    let cancelled = false;
+    mediaAPI.getThumbnailsTrack(mediaFile.id)
+      .then((text) => {
+        if (!cancelled) {
+          setThumbnails(parseThumbnailsVtt(text, mediaAPI.getTrickplayUrl(mediaFile.id, 'thumbnails.vtt')));
+        }
+      })
+      .catch((error) => {
+        // Scrubbing still works without previews
+        console.warn('Thumbnails not available:', error);
+      });
+
+    return () => {
+      cancelled = true;
+    };
+  }, [mediaFile?.id, mediaFile?.storage_path_trickplay]);
+
   const seekToSegment = (segmentIndex) => {
     if (!playerRef.current || !segments[segmentIndex]) return;
 
@@ -387,6 +423,14 @@ const ModernVideoPlayer = ({
     playerRef.current.currentTime(time);
   };
 
+  const handleProgressHover = (e) => {
+    if (!thumbnails.length || !duration) return;
+    const rect = e.currentTarget.getBoundingClientRect();
+    const ratio = Math.min(Math.max((e.clientX - rect.left) / rect.width, 0), 1);
+    const cue = findThumbnail(thumbnails, ratio * duration);
+    setHoverPreview(cue ? { cue, left: e.clientX - rect.left, time: ratio * duration } : null);
+  };
+
   const formatTime = (seconds) => {
     if (!seconds && seconds !== 0) return '00:00';
     const mins = Math.floor(seconds / 60);
@@ -441,14 +485,34 @@ const ModernVideoPlayer = ({
       <div className="custom-controls">
         {/* Progress Bar */}
         <div className="progress-container">
-          <input
-            type="range"
-            min="0"
-            max={duration || 0}
-            value={currentTime}
-            onChange={(e) => seek(parseFloat(e.target.value))}
-            className="progress-slider"
-          />
+          <div
+            className="progress-track"
+            onMouseMove={handleProgressHover}
+            onMouseLeave={() => setHoverPreview(null)}
+          >
+            {hoverPreview && (
+              <div className="thumbnail-preview" style={{ left: hoverPreview.left }}>
+                <div
+                  className="thumbnail-image"
+                  style={{
+                    width: hoverPreview.cue.w,
+                    height: hoverPreview.cue.h,
+                    backgroundImage: `url(${hoverPreview.cue.url})`,
+                    backgroundPosition: `-${hoverPreview.cue.x}px -${hoverPreview.cue.y}px`,
+                  }}
+                />
+                <span className="thumbnail-time">{formatTime(hoverPreview.time)}</span>
+              </div>
+            )}
+            <input
+              type="range"
+              min="0"
+              max={duration || 0}
+              value={currentTime}
+              onChange={(e) => seek(parseFloat(e.target.value))}
+              className="progress-slider"
+            />
+          </div>
           <div className="time-display">
             <span>{formatTime(currentTime)}</span>
             <span>/</span>
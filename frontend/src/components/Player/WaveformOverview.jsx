@@ -0,0 +1,72 @@
+import { useState, useEffect, useRef } from 'react';
+import { mediaAPI } from '../../services/api';
+import { parseWaveform, drawWaveform } from '../../utils/waveform';
+
+/**
+ * Whole-file waveform overview built from precomputed peaks.
+ * Clicking seeks the player to that point.
+ */
+export const WaveformOverview = ({ fileId, currentTime, duration, onSeek, className = '' }) => {
+  const canvasRef = useRef(null);
+  const [waveform, setWaveform] = useState(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    let retryTimer = null;
+
+    // Ask for about two peaks per CSS pixel so the overview stays sharp on HiDPI screens
+    const width = canvasRef.current?.clientWidth || 1000;
+    const load = () => {
+      mediaAPI.getWaveform(fileId, Math.round(width * 2))
+        .then((buffer) => {
+          if (!cancelled) setWaveform(parseWaveform(buffer));
+        })
+        .catch((error) => {
+          if (cancelled) return;
+          if (error.response?.status === 202) {
+            // Peaks of an older file are being generated; ask again shortly
+            const retryAfter = parseInt(error.response.headers['retry-after'], 10) || 5;
+            retryTimer = setTimeout(load, retryAfter * 1000);
+            return;
+          }
+          // No waveform is not an error for playback; just leave the overview empty
+          console.warn('Waveform not available:', error);
+        });
+    };
+    load();
+
+    return () => {
+      cancelled = true;
+      clearTimeout(retryTimer);
+    };
+  }, [fileId]);
+
+  useEffect(() => {
+    const canvas = canvasRef.current;
+    if (!canvas || !waveform) return;
+
+    const ratio = window.devicePixelRatio || 1;
+    canvas.width = Math.round(canvas.clientWidth * ratio);
+    canvas.height = Math.round(canvas.clientHeight * ratio);
+
+    const totalSeconds = duration || waveform.peakCount * waveform.secondsPerPeak;
+    drawWaveform(canvas, waveform, { progress: totalSeconds ? currentTime / totalSeconds : 0 });
+  }, [waveform, currentTime, duration]);
+
+  const handleClick = (e) => {
+    if (!waveform || !onSeek) return;
+    const rect = e.currentTarget.getBoundingClientRect();
+    const totalSeconds = duration || waveform.peakCount * waveform.secondsPerPeak;
+    onSeek(((e.clientX - rect.left) / rect.width) * totalSeconds);
+  };
+
+  return (
+    <canvas
+      ref={canvasRef}
+      onClick={handleClick}
+      className={`w-full h-16 cursor-pointer ${className}`}
+    />
+  );
+};
+
+export default WaveformOverview;
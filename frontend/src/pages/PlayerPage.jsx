@@ -6,8 +6,21 @@ import { LoadingSpinner } from '../components/LoadingSpinner';
 
 import ModernVideoPlayer from '../components/Player/ModernVideoPlayer';
 import ModernInteractiveTranscript from '../components/Player/ModernInteractiveTranscript';
+import WaveformOverview from '../components/Player/WaveformOverview';
 import { useVideoPlayer } from '../hooks/useVideoPlayer';
 import { useESLModes } from '../hooks/useESLModes';
+import { parseWordTimings } from '../utils/wordTimings';
+
+// Segments per request when loading the transcript
+const SEGMENT_PAGE_SIZE = 200;
+// Segment pages in flight at once after the first
+const SEGMENT_PAGE_CONCURRENCY = 4;
+
+// Transcription summary fields the player uses
+const TRANSCRIPTION_FIELDS = [
+  'id', 'has_vtt', 'has_word_level_vtt', 'has_srt', 'has_txt',
+  'word_count', 'segment_count', 'speaker_count',
+];
 
 export const PlayerPage = ({ onPlayerPageInfoChange }) => {
   const { fileId } = useParams();
@@ -19,6 +32,7 @@ export const PlayerPage = ({ onPlayerPageInfoChange }) => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [segments, setSegments] = useState([]);
+  const [wordTimings, setWordTimings] = useState(null);
 
   // Initialize video player hook first
   const videoPlayer = useVideoPlayer(segments);
@@ -77,32 +91,52 @@ export const PlayerPage = ({ onPlayerPageInfoChange }) => {
   };
 
   const fetchTranscription = async () => {
+    // Word timings are independent of the segments: load them alongside
+    const wordTimingsRequest = transcriptionAPI.getWordTimings(fileId)
+      .then((data) => setWordTimings(parseWordTimings(data)))
+      .catch((error) => {
+        // Segments still play and highlight without word timings
+        console.warn('Word timings not available:', error);
+      });
+
     try {
       console.log('=== FETCHING TRANSCRIPTION ===');
-      const transcriptionData = await transcriptionAPI.getTranscription(fileId);
+      // The media file is fetched on its own, so skip the nested copy
+      const transcriptionData = await transcriptionAPI.getTranscription(fileId, false, TRANSCRIPTION_FIELDS);
       console.log('Transcription data received:', transcriptionData);
-
-      // Parse segments from raw output for transcript display
-      if (transcriptionData.raw_whisperx_output?.segments) {
-        console.log('Setting segments from raw_whisperx_output:', transcriptionData.raw_whisperx_output.segments.length, 'segments');
-        console.log('First few segments:', transcriptionData.raw_whisperx_output.segments.slice(0, 10));
-        setSegments(transcriptionData.raw_whisperx_output.segments);
-
-        // Add segments to transcription object for WordHighlighter
-        const transcriptionWithSegments = {
-          ...transcriptionData,
-          segments: transcriptionData.raw_whisperx_output.segments
-        };
-        setTranscription(transcriptionWithSegments);
-      } else {
-        console.log('No segments found in raw_whisperx_output');
-        // Set transcription without segments if no segments available
-        setTranscription(transcriptionData);
-      }
+      setTranscription(transcriptionData);
+
+      // Load segments a window at a time: the first page renders immediately,
+      // the rest are fetched concurrently, shown as each gap before them fills
+      const getPage = (page) => transcriptionAPI.getSegments(fileId, {
+        from_index: page * SEGMENT_PAGE_SIZE,
+        to_index: (page + 1) * SEGMENT_PAGE_SIZE,
+      });
+      const first = await getPage(0);
+      const pages = [first.segments];
+      setSegments(first.segments);
+
+      const pageCount = Math.ceil((first.segment_count || 0) / SEGMENT_PAGE_SIZE);
+      let nextPage = 1;
+      let loadedPages = 1;
+      const fetchPages = async () => {
+        while (nextPage < pageCount) {
+          const page = nextPage++;
+          pages[page] = (await getPage(page)).segments;
+          if (page === loadedPages) {
+            while (pages[loadedPages]) loadedPages++;
+            setSegments(pages.slice(0, loadedPages).flat());
+          }
+        }
+      };
+      await Promise.all(Array.from({ length: SEGMENT_PAGE_CONCURRENCY }, fetchPages));
+      console.log('Loaded', pages.flat().length, 'segments');
     } catch (error) {
       console.error('Error fetching transcription:', error);
       // Don't show error toast as transcription might still be processing
     }
+
+    await wordTimingsRequest;
   };
 
   const startStatusPolling = () => {
@@ -262,7 +296,14 @@ export const PlayerPage = ({ onPlayerPageInfoChange }) => {
                 eslMode={eslModes.eslMode}
                 repeatSegment={eslModes.repeatSegment}
                 segments={segments}
-                className="w-full h-full"
+                className="w-full flex-1 min-h-0"
+              />
+              <WaveformOverview
+                fileId={mediaFile.id}
+                currentTime={videoPlayer.currentTime}
+                duration={videoPlayer.duration || mediaFile.duration_seconds}
+                onSeek={videoPlayer.seekTo}
+                className="mt-3 shrink-0"
               />
             </div>
 
@@ -275,6 +316,8 @@ export const PlayerPage = ({ onPlayerPageInfoChange }) => {
                   onSegmentClick={handleSegmentClick}
                   onSegmentUpdate={handleSegmentUpdate}
                   onRepeatModeActivate={handleRepeatModeActivate}
+                  wordTimings={wordTimings}
+                  currentTime={videoPlayer.currentTime}
                   className="w-full h-full"
                 />
               ) : (
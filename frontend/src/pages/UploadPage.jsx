@@ -5,6 +5,9 @@ import { mediaAPI, uploadUtils } from '../services/api';
 import { formatFileSize, formatProgress } from '../utils/formatters';
 import { DebugPanel } from '../components/DebugPanel';
 
+// Give up on an upload after the server has been busy this many times in a row
+const MAX_BUSY_RETRIES = 20;
+
 export const UploadPage = () => {
   const [selectedFile, setSelectedFile] = useState(null);
   const [language, setLanguage] = useState('en');
@@ -28,7 +31,7 @@ export const UploadPage = () => {
 
     // Validate file type
     if (!uploadUtils.validateFileType(file)) {
-      toast.error('Invalid file type. Please select an MP3, MP4, or MKV file.');
+      toast.error('Invalid file type. Please select an MP3, WAV, MP4, or MKV file.');
       return;
     }
 
@@ -63,6 +66,7 @@ export const UploadPage = () => {
       setUploadStatus(`Uploading ${totalChunks} chunks...`);
 
       // Upload chunks
+      let busyRetries = 0;
       for (let chunkNumber = 0; chunkNumber < totalChunks; chunkNumber++) {
         const chunk = uploadUtils.createChunk(selectedFile, chunkNumber, chunkSize);
         
@@ -78,6 +82,7 @@ export const UploadPage = () => {
 
         try {
           const response = await mediaAPI.uploadChunk(chunkData);
+          busyRetries = 0;
           
           // Update progress
           const progress = formatProgress(chunkNumber + 1, totalChunks);
@@ -105,6 +110,19 @@ export const UploadPage = () => {
             }
           }
         } catch (chunkError) {
+          // Server is at capacity: wait as instructed and retry the same chunk
+          if (chunkError.response?.status === 429) {
+            busyRetries++;
+            if (busyRetries > MAX_BUSY_RETRIES) {
+              throw new Error('The server is busy. Please try uploading again later.');
+            }
+            const retryAfter = parseInt(chunkError.response.headers['retry-after'], 10) || 30;
+            setUploadStatus(`Server is busy, retrying in ${retryAfter} seconds...`);
+            await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+            chunkNumber--;
+            continue;
+          }
+
           console.error(`Error uploading chunk ${chunkNumber}:`, chunkError);
           throw new Error(`Failed to upload chunk ${chunkNumber + 1}`);
         }
@@ -153,7 +171,7 @@ export const UploadPage = () => {
       <div>
         <h1 className="text-3xl font-bold text-gray-900">Upload Media File</h1>
         <p className="text-gray-600 mt-1">
-          Upload audio (.mp3) or video (.mp4, .mkv) files for transcription
+          Upload audio (.mp3, .wav) or video (.mp4, .mkv) files for transcription
         </p>
       </div>
 
@@ -191,7 +209,7 @@ export const UploadPage = () => {
                       name="file-upload"
                       type="file"
                       className="sr-only"
-                      accept=".mp3,.mp4,.mkv"
+                      accept=".mp3,.wav,.mp4,.mkv"
                       onChange={handleFileSelect}
                       disabled={uploading}
                     />
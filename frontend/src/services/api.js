@@ -80,17 +80,52 @@ export const mediaAPI = {
   
   // Get media file URL for serving
   getMediaFileUrl: (fileId) => `${API_BASE_URL}/media/${fileId}/serve/`,
+
+  // Get the HLS master playlist URL (only for files with storage_path_hls)
+  getHlsManifestUrl: (fileId) => `${API_BASE_URL}/media/${fileId}/hls/master.m3u8`,
   
   // Get audio file URL for serving
   getAudioFileUrl: (fileId) => `${API_BASE_URL}/media/${fileId}/audio/`,
+
+  // Get URL of a trickplay file: 'poster.jpg', 'thumbnails.vtt' or a sprite sheet
+  getTrickplayUrl: (fileId, asset) => `${API_BASE_URL}/media/${fileId}/trickplay/${asset}`,
+
+  // Get the WebVTT thumbnails track (see utils/thumbnails.js)
+  getThumbnailsTrack: (fileId) =>
+    api.get(`/media/${fileId}/trickplay/thumbnails.vtt`, {
+      responseType: 'text',
+    }),
+
+  // Get precomputed waveform peaks (binary, see utils/waveform.js)
+  // Rejects with status 202 (and a Retry-After header) while the peaks are being generated
+  getWaveform: (fileId, peaks) =>
+    api.get(`/media/${fileId}/waveform/`, {
+      params: { peaks },
+      responseType: 'arraybuffer',
+      validateStatus: (status) => status === 200,
+    }),
 };
 
 // Transcriptions API
 export const transcriptionAPI = {
-  // Get transcription details
-  getTranscription: (fileId, includeRaw = false) =>
+  // Get transcription details; fields is an optional list of fields to return
+  getTranscription: (fileId, includeRaw = false, fields = null) =>
     api.get(`/transcriptions/${fileId}/`, {
-      params: { include_raw: includeRaw }
+      params: { include_raw: includeRaw, ...(fields && { fields: fields.join(',') }) }
+    }),
+
+  // Get a window of segments: { start, end } in seconds or { from_index, to_index }, optional words: true
+  getSegments: (fileId, params) =>
+    api.get(`/transcriptions/${fileId}/segments/`, { params }),
+
+  // Get the segment and word at time t (seconds)
+  getTranscriptAt: (fileId, t) =>
+    api.get(`/transcriptions/${fileId}/at/`, { params: { t } }),
+
+  // Get binary word timings for highlighting (see utils/wordTimings.js)
+  getWordTimings: (fileId) =>
+    api.get(`/transcriptions/${fileId}/words/`, {
+      responseType: 'arraybuffer',
     }),
 
   // Get transcription status
@@ -141,6 +176,10 @@ export const uploadUtils = {
   validateFileType: (file) => {
     const allowedTypes = [
       'audio/mpeg',        // .mp3
+      'audio/wav',         // .wav
+      'audio/x-wav',       // .wav (Firefox, Windows)
+      'audio/wave',        // .wav
+      'audio/vnd.wave',    // .wav
       'video/mp4',         // .mp4
       'video/x-matroska',  // .mkv
     ];
@@ -0,0 +1,50 @@
+/**
+ * Parse a WebVTT thumbnails track served by /media/<id>/trickplay/thumbnails.vtt.
+ *
+ * Each cue's text is `sprite_001.jpg#xywh=x,y,w,h`; sprite URLs are resolved
+ * against `baseUrl` (the track's own URL).
+ */
+export const parseThumbnailsVtt = (text, baseUrl) => {
+  const cues = [];
+  const blocks = text.replace(/\r\n/g, '\n').split('\n\n');
+
+  for (const block of blocks) {
+    const lines = block.trim().split('\n');
+    const timing = lines.findIndex((line) => line.includes('-->'));
+    if (timing === -1 || !lines[timing + 1]) continue;
+
+    const [start, end] = lines[timing].split('-->').map((part) => parseTimestamp(part.trim()));
+    const [file, fragment] = lines[timing + 1].trim().split('#xywh=');
+    if (!fragment) continue;
+    const [x, y, w, h] = fragment.split(',').map(Number);
+
+    cues.push({ start, end, url: new URL(file, new URL(baseUrl, window.location.href)).href, x, y, w, h });
+  }
+
+  return cues;
+};
+
+/**
+ * Cue covering `time` (seconds), by binary search over the sorted cues.
+ */
+export const findThumbnail = (cues, time) => {
+  let low = 0;
+  let high = cues.length - 1;
+
+  while (low <= high) {
+    const middle = (low + high) >> 1;
+    if (time < cues[middle].start) {
+      high = middle - 1;
+    } else if (time >= cues[middle].end) {
+      low = middle + 1;
+    } else {
+      return cues[middle];
+    }
+  }
+  return null;
+};
+
+const parseTimestamp = (value) => {
+  const parts = value.split(':').map(Number);
+  return parts.reduce((total, part) => total * 60 + part, 0);
+};
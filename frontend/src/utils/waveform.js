@@ -0,0 +1,50 @@
+/**
+ * Parse a waveform level served by /media/<id>/waveform/.
+ *
+ * Layout: uint32 LE sample rate, samples per peak and peak count, followed by
+ * peak count int8 (min, max) pairs.
+ */
+export const parseWaveform = (buffer) => {
+  const view = new DataView(buffer);
+  const sampleRate = view.getUint32(0, true);
+  const samplesPerPeak = view.getUint32(4, true);
+  const peakCount = view.getUint32(8, true);
+
+  return {
+    sampleRate,
+    samplesPerPeak,
+    peakCount,
+    secondsPerPeak: samplesPerPeak / sampleRate,
+    peaks: new Int8Array(buffer, 12, peakCount * 2),
+  };
+};
+
+/**
+ * Draw min/max peaks onto a canvas, one column per pixel.
+ * Time before `progress` (0-1) is drawn in `playedColor`.
+ */
+export const drawWaveform = (canvas, waveform, { color = '#cbd5e1', playedColor = '#3b82f6', progress = 0 } = {}) => {
+  const ctx = canvas.getContext('2d');
+  const { width, height } = canvas;
+  const { peaks, peakCount } = waveform;
+  const middle = height / 2;
+  const scale = middle / 128;
+  const playedX = progress * width;
+
+  ctx.clearRect(0, 0, width, height);
+
+  for (let x = 0; x < width; x++) {
+    // Fold the peaks that fall into this pixel column
+    const first = Math.floor((x / width) * peakCount);
+    const last = Math.max(first + 1, Math.floor(((x + 1) / width) * peakCount));
+    let min = 0;
+    let max = 0;
+    for (let i = first; i < last && i < peakCount; i++) {
+      min = Math.min(min, peaks[i * 2]);
+      max = Math.max(max, peaks[i * 2 + 1]);
+    }
+
+    ctx.fillStyle = x < playedX ? playedColor : color;
+    ctx.fillRect(x, middle - max * scale, 1, Math.max(1, (max - min) * scale));
+  }
+};
@@ -0,0 +1,81 @@
+/**
+ * Parse the binary word timings served by /transcriptions/<id>/words/
+ * (gzip is undone by the browser).
+ *
+ * Layout, little-endian: 'WTIM', uint16 version, uint16 flags, uint32 word
+ * count n, segment count m and text length, then float32 word starts[n],
+ * float32 word ends[n], uint32 text offsets[n + 1], float32 segment
+ * starts[m], float32 segment ends[m], uint32 first word of each segment[m + 1]
+ * and the UTF-8 text of all words. The arrays are viewed in place.
+ */
+export const parseWordTimings = (buffer) => {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== 'WTIM') {
+    throw new Error('Not a word timings file');
+  }
+
+  const wordCount = view.getUint32(8, true);
+  const segmentCount = view.getUint32(12, true);
+  const textLength = view.getUint32(16, true);
+
+  let offset = 20;
+  const take = (Type, length) => {
+    const values = new Type(buffer, offset, length);
+    offset += length * 4;
+    return values;
+  };
+
+  const wordStarts = take(Float32Array, wordCount);
+  const wordEnds = take(Float32Array, wordCount);
+  const textOffsets = take(Uint32Array, wordCount + 1);
+  const segmentStarts = take(Float32Array, segmentCount);
+  const segmentEnds = take(Float32Array, segmentCount);
+  const segmentFirstWord = take(Uint32Array, segmentCount + 1);
+  const text = new Uint8Array(buffer, offset, textLength);
+  const decoder = new TextDecoder();
+
+  return {
+    wordCount,
+    segmentCount,
+    wordStarts,
+    wordEnds,
+    segmentStarts,
+    segmentEnds,
+    segmentFirstWord,
+    // Words are decoded on demand; most are never displayed highlighted
+    word: (index) => decoder.decode(text.subarray(textOffsets[index], textOffsets[index + 1])),
+  };
+};
+
+/**
+ * Index of the word being spoken at `time` (seconds), or -1 between words.
+ * Binary search over the non-decreasing start times: O(log n) per frame.
+ */
+export const findWordAt = (timings, time) => {
+  const { wordStarts, wordEnds } = timings;
+  let low = 0;
+  let high = timings.wordCount - 1;
+  let found = -1;
+
+  // Last word starting at or before `time`
+  while (low <= high) {
+    const middle = (low + high) >> 1;
+    if (wordStarts[middle] <= time) {
+      found = middle;
+      low = middle + 1;
+    } else {
+      high = middle - 1;
+    }
+  }
+
+  return found !== -1 && time < wordEnds[found] ? found : -1;
+};
+
+/**
+ * Word indices [first, last) of a segment.
+ */
+export const segmentWords = (timings, segmentIndex) => [
+  timings.segmentFirstWord[segmentIndex],
+  timings.segmentFirstWord[segmentIndex + 1],
+];
@@ -23,7 +23,8 @@ class MediaFileAdmin(admin.ModelAdmin):
             'fields': ('status', 'language_transcription', 'replicate_job_id')
         }),
         ('Storage Paths', {
-            'fields': ('storage_path_original', 'storage_path_audio'),
+            'fields': ('storage_path_original', 'storage_path_audio', 'storage_path_playback', 'storage_path_hls',
+                       'storage_path_audio_playback', 'storage_path_trickplay'),
             'classes': ('collapse',)
         }),
         ('Error Information', {
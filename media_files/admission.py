@@ -0,0 +1,225 @@
+import os
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """
+    Admission control for uploads and audio processing.
+
+    Watches the transcription backlog, free disk space in MEDIA_ROOT and the
+    number of running FFmpeg processes, and tells callers to back off instead
+    of overcommitting the worker.
+
+    FFmpeg slots are held per thread: a thread that already holds one (see
+    reserved_ffmpeg) runs any further FFmpeg in it rather than waiting for a
+    second slot, so a pipeline job cannot deadlock against itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._holder = threading.local()  # .depth: slots this thread is inside
+        self._ffmpeg_running = 0
+        self._deferred = set()
+        self._counters = {
+            'chunks_admitted': 0,
+            'chunks_rejected_queue_depth': 0,
+            'chunks_rejected_disk': 0,
+            'processing_deferred': 0,
+        }
+
+    @contextmanager
+    def ffmpeg_slot(self):
+        """
+        Hold an FFmpeg slot for the duration of the block, waiting until one
+        is free under ADMISSION_MAX_CONCURRENT_FFMPEG. Reuses the slot the
+        thread already holds, if any.
+        """
+        if self._depth():
+            with self._holding():
+                yield
+            return
+
+        with self._lock:
+            while self._ffmpeg_running >= settings.ADMISSION_MAX_CONCURRENT_FFMPEG:
+                self._slot_freed.wait()
+            self._ffmpeg_running += 1
+        try:
+            with self._holding():
+                yield
+        finally:
+            self.release_ffmpeg()
+
+    @contextmanager
+    def reserved_ffmpeg(self):
+        """
+        Run the block in the slot reserved by try_reserve_ffmpeg(), possibly
+        from another thread, and release it afterwards.
+        """
+        try:
+            with self._holding():
+                yield
+        finally:
+            self.release_ffmpeg()
+
+    @contextmanager
+    def _holding(self):
+        self._holder.depth = self._depth() + 1
+        try:
+            yield
+        finally:
+            self._holder.depth -= 1
+
+    def _depth(self):
+        return getattr(self._holder, 'depth', 0)
+
+    def try_reserve_ffmpeg(self):
+        """
+        Reserve an FFmpeg slot for a pipeline job if the worker has capacity.
+        The caller must call release_ffmpeg() when the job is done.
+        """
+        if self.free_disk_bytes() < settings.ADMISSION_MIN_FREE_DISK_MB * 1024 * 1024:
+            return False
+
+        with self._lock:
+            if self._ffmpeg_running >= settings.ADMISSION_MAX_CONCURRENT_FFMPEG:
+                return False
+            self._ffmpeg_running += 1
+        return True
+
+    def reserve_free_ffmpeg(self, count):
+        """
+        Reserve up to `count` more FFmpeg slots without waiting, e.g. for extra
+        parallel processes of a job. Returns how many were reserved; release
+        them with release_ffmpeg(reserved).
+        """
+        with self._lock:
+            reserved = max(0, min(count, settings.ADMISSION_MAX_CONCURRENT_FFMPEG - self._ffmpeg_running))
+            self._ffmpeg_running += reserved
+        return reserved
+
+    def release_ffmpeg(self, count=1):
+        with self._lock:
+            self._ffmpeg_running -= count
+            self._slot_freed.notify(count)
+
+    def check_upload(self, total_size, is_new_upload):
+        """
+        Decide whether to accept an upload chunk.
+
+        New upload sessions are refused while the backlog is deep or the disk
+        cannot hold the assembled file; chunks of sessions already in flight
+        are only refused when the disk is about to fill up.
+
+        Returns (admitted, reason).
+        """
+        free_bytes = self.free_disk_bytes()
+        min_free_bytes = settings.ADMISSION_MIN_FREE_DISK_MB * 1024 * 1024
+
+        if is_new_upload:
+            if self.queue_depth() >= settings.ADMISSION_MAX_QUEUE_DEPTH:
+                return self._reject('chunks_rejected_queue_depth', 'Processing backlog is full')
+            if free_bytes - total_size < min_free_bytes:
+                return self._reject('chunks_rejected_disk', 'Not enough free disk space')
+        elif free_bytes < min_free_bytes:
+            return self._reject('chunks_rejected_disk', 'Not enough free disk space')
+
+        with self._lock:
+            self._counters['chunks_admitted'] += 1
+        return True, None
+
+    def defer(self, media_file, start_callback):
+        """
+        Hold a media file in the deferred state and retry `start_callback`
+        after ADMISSION_RETRY_AFTER_SECONDS.
+        """
+        media_file_id = str(media_file.id)
+
+        with self._lock:
+            first_deferral = media_file_id not in self._deferred
+            self._deferred.add(media_file_id)
+            if first_deferral:
+                self._counters['processing_deferred'] += 1
+
+        if media_file.status != 'deferred_processing':
+            media_file.status = 'deferred_processing'
+            media_file.save(update_fields=['status'])
+
+        logger.info(f"Deferring audio processing for {media_file_id} (worker at capacity)")
+
+        timer = threading.Timer(
+            settings.ADMISSION_RETRY_AFTER_SECONDS,
+            self._retry_deferred,
+            args=(media_file, start_callback)
+        )
+        timer.daemon = True
+        timer.start()
+
+    def _retry_deferred(self, media_file, start_callback):
+        from .models import MediaFile
+
+        if not MediaFile.objects.filter(id=media_file.id).exists():
+            logger.info(f"Dropping deferred job for deleted media file {media_file.id}")
+            self.release_deferred(media_file)
+            return
+        start_callback(media_file)
+
+    def release_deferred(self, media_file):
+        """Forget a media file that has left the deferred state."""
+        with self._lock:
+            self._deferred.discard(str(media_file.id))
+
+    def queue_depth(self):
+        """Jobs waiting for transcription plus jobs waiting for FFmpeg."""
+        from transcriptions.scheduler import transcription_scheduler
+
+        with self._lock:
+            deferred = len(self._deferred)
+        return transcription_scheduler.queue_depth() + deferred
+
+    @staticmethod
+    def free_disk_bytes():
+        # MEDIA_ROOT is created lazily; measure its parent until it exists
+        path = settings.MEDIA_ROOT
+        if not os.path.exists(path):
+            path = os.path.dirname(path)
+        return shutil.disk_usage(path).free
+
+    def metrics(self):
+        """Current load, thresholds and counters for monitoring."""
+        from transcriptions.scheduler import transcription_scheduler
+
+        with self._lock:
+            ffmpeg_running = self._ffmpeg_running
+            deferred = len(self._deferred)
+            counters = dict(self._counters)
+
+        return {
+            'queue_depth': transcription_scheduler.queue_depth() + deferred,
+            'transcriptions_running': transcription_scheduler.running_count(),
+            'deferred_jobs': deferred,
+            'ffmpeg_running': ffmpeg_running,
+            'free_disk_mb': int(self.free_disk_bytes() / (1024 * 1024)),
+            'thresholds': {
+                'max_queue_depth': settings.ADMISSION_MAX_QUEUE_DEPTH,
+                'min_free_disk_mb': settings.ADMISSION_MIN_FREE_DISK_MB,
+                'max_concurrent_ffmpeg': settings.ADMISSION_MAX_CONCURRENT_FFMPEG,
+                'retry_after_seconds': settings.ADMISSION_RETRY_AFTER_SECONDS,
+            },
+            'counters': counters,
+        }
+
+    def _reject(self, counter, reason):
+        with self._lock:
+            self._counters[counter] += 1
+        logger.warning(f"Upload rejected by admission control: {reason}")
+        return False, reason
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,178 @@
+import time
+import logging
+import threading
+import subprocess
+from collections import deque
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# media_file_id -> set of running FFmpeg processes for that file
+_active_processes = {}
+_active_lock = threading.Lock()
+
+
+class FFmpegResult:
+    """Outcome of an FFmpeg run, shaped like subprocess.CompletedProcess."""
+
+    def __init__(self, args, returncode, stderr, cancelled=False):
+        self.args = args
+        self.returncode = returncode
+        self.stderr = stderr
+        self.cancelled = cancelled
+
+
+class FFmpegRunner:
+    """
+    Shared runner for FFmpeg jobs.
+
+    Reads `-progress pipe:1` output as it is produced, writes a throttled
+    percent-complete to the MediaFile, keeps only the last lines of stderr,
+    and stops the process if its MediaFile is deleted mid-run.
+    """
+
+    @staticmethod
+    def run(cmd, media_file=None, duration_seconds=None, timeout=3600, on_progress=None, report_progress=True):
+        """
+        Run an FFmpeg command and return an FFmpegResult.
+
+        Args:
+            cmd: FFmpeg argument list, starting with the binary
+            media_file: MediaFile to report progress on and to watch for deletion
+            duration_seconds: Expected output duration, used for percent-complete
+            timeout: Seconds before the process is killed and TimeoutExpired raised
+            on_progress: Called with the seconds of output written so far, instead
+                of the runner writing percent-complete itself; returning False
+                stops FFmpeg as a cancellation
+            report_progress: False for side jobs (e.g. renditions) that must not
+                touch the MediaFile's processing progress; they can still be
+                stopped with cancel()
+        """
+        full_cmd = [cmd[0], '-nostats', '-progress', 'pipe:1'] + list(cmd[1:])
+        media_file_id = str(media_file.id) if media_file is not None else None
+        progress_id = media_file_id if report_progress else None
+
+        process = subprocess.Popen(
+            full_cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors='replace',
+            bufsize=1
+        )
+        process.cancelled = False
+
+        if media_file_id:
+            with _active_lock:
+                _active_processes.setdefault(media_file_id, set()).add(process)
+
+        # Drain stderr concurrently so FFmpeg never blocks on a full pipe
+        stderr_tail = deque(maxlen=settings.FFMPEG_STDERR_TAIL_LINES)
+        stderr_thread = threading.Thread(
+            target=FFmpegRunner._drain, args=(process.stderr, stderr_tail)
+        )
+        stderr_thread.daemon = True
+        stderr_thread.start()
+
+        timed_out = threading.Event()
+
+        def on_timeout():
+            timed_out.set()
+            process.kill()
+
+        watchdog = threading.Timer(timeout, on_timeout)
+        watchdog.daemon = True
+        watchdog.start()
+
+        try:
+            if progress_id and on_progress is None:
+                FFmpegRunner._set_progress(progress_id, 0.0)
+            FFmpegRunner._follow_progress(process, progress_id, duration_seconds, on_progress)
+            process.wait()
+        finally:
+            watchdog.cancel()
+            stderr_thread.join(timeout=5)
+            if media_file_id:
+                with _active_lock:
+                    processes = _active_processes.get(media_file_id)
+                    if processes is not None:
+                        processes.discard(process)
+                        if not processes:
+                            del _active_processes[media_file_id]
+
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(full_cmd, timeout, stderr='\n'.join(stderr_tail))
+
+        if progress_id and on_progress is None and process.returncode == 0 and not process.cancelled:
+            FFmpegRunner._set_progress(progress_id, 100.0)
+
+        return FFmpegResult(
+            full_cmd,
+            process.returncode,
+            '\n'.join(stderr_tail),
+            cancelled=process.cancelled
+        )
+
+    @staticmethod
+    def cancel(media_file_id):
+        """Stop every FFmpeg process running for a media file."""
+        with _active_lock:
+            processes = list(_active_processes.get(str(media_file_id), ()))
+
+        for process in processes:
+            process.cancelled = True
+            try:
+                process.terminate()
+            except OSError:
+                pass
+
+        if processes:
+            logger.info(f"Cancelled {len(processes)} FFmpeg process(es) for {media_file_id}")
+        return len(processes)
+
+    @staticmethod
+    def _follow_progress(process, media_file_id, duration_seconds, on_progress=None):
+        """Parse key=value progress blocks from stdout until FFmpeg exits."""
+        min_interval = 1.0 / settings.FFMPEG_PROGRESS_UPDATES_PER_SECOND
+        last_write = 0.0
+        last_percent = None
+
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+
+            # out_time_us is microseconds; older builds misname it out_time_ms
+            if key not in ('out_time_us', 'out_time_ms') or not value.isdigit():
+                continue
+            if on_progress is not None:
+                if on_progress(int(value) / 1e6) is False and not process.cancelled:
+                    process.cancelled = True
+                    process.terminate()
+                continue
+            if not media_file_id or not duration_seconds:
+                continue
+
+            percent = min(99.9, int(value) / 1e6 / duration_seconds * 100)
+            now = time.monotonic()
+            if now - last_write < min_interval or percent == last_percent:
+                continue
+
+            last_write = now
+            last_percent = percent
+            if not FFmpegRunner._set_progress(media_file_id, round(percent, 1)):
+                # The MediaFile was deleted while we were working on it
+                logger.info(f"Media file {media_file_id} deleted, stopping FFmpeg")
+                process.cancelled = True
+                process.terminate()
+
+    @staticmethod
+    def _set_progress(media_file_id, percent):
+        """Write progress without touching other fields; False if the row is gone."""
+        from .models import MediaFile
+
+        return MediaFile.objects.filter(id=media_file_id).update(processing_progress=percent) > 0
+
+    @staticmethod
+    def _drain(stream, tail):
+        for line in stream:
+            tail.append(line.rstrip())
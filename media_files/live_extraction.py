@@ -0,0 +1,314 @@
+import os
+import queue
+import struct
+import logging
+import threading
+import subprocess
+from collections import deque
+from pathlib import Path
+from django.conf import settings
+from .models import ChunkUpload
+from .admission import admission_controller
+
+logger = logging.getLogger(__name__)
+
+# Containers FFmpeg can demux from a non-seekable pipe
+STREAMABLE_EXTENSIONS = {'.mkv', '.webm', '.mp3', '.wav'}
+
+# upload_id -> LiveExtractionSession
+_sessions = {}
+# Sessions whose FFmpeg has not exited yet, including ones taken from _sessions
+_running = set()
+_sessions_lock = threading.Lock()
+
+
+class LiveExtractionSession:
+    """
+    An FFmpeg process decoding an upload's bytes from stdin while the
+    remaining chunks are still arriving.
+
+    Chunks are fed strictly in order by a writer thread, so the request that
+    saved a chunk never blocks on FFmpeg. Each chunk is opened when it is
+    queued, so the upload can clean up its chunk files before the writer
+    gets to them. A session that receives no chunk for
+    LIVE_EXTRACTION_IDLE_TIMEOUT_SECONDS aborts itself.
+
+    Sessions are limited by LIVE_EXTRACTION_MAX_SESSIONS rather than the
+    FFmpeg slots: they mostly wait on the network, decoding each chunk as it
+    arrives, and holding a slot for the whole upload would let a few slow
+    uploads block every other FFmpeg job.
+    """
+
+    def __init__(self, upload_id, output_path):
+        self.upload_id = str(upload_id)
+        self.output_path = Path(output_path)
+        self.next_chunk = 0
+        self.failed = False
+        self.feed_lock = threading.Lock()  # guards next_chunk
+        self._queue = queue.Queue()
+        self._stderr_tail = deque(maxlen=settings.FFMPEG_STDERR_TAIL_LINES)
+
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        cmd = [
+            settings.FFMPEG_BINARY,
+            '-nostats',
+            '-i', 'pipe:0',
+            '-vn',
+            '-acodec', 'pcm_s16le',
+            '-ar', '16000',
+            '-ac', '1',
+            '-y',
+            str(self.output_path)
+        ]
+        logger.info(f"Starting live extraction for upload {self.upload_id}: {' '.join(cmd)}")
+
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=False
+        )
+
+        self._stderr_thread = threading.Thread(target=self._drain_stderr)
+        self._stderr_thread.daemon = True
+        self._stderr_thread.start()
+
+        self._writer = threading.Thread(target=self._write_chunks)
+        self._writer.daemon = True
+        self._writer.start()
+
+    @property
+    def stderr(self):
+        return '\n'.join(self._stderr_tail)
+
+    def enqueue(self, chunk_path):
+        self._queue.put(open(chunk_path, 'rb'))
+
+    def close_input(self):
+        """Signal end of input; the writer closes FFmpeg's stdin once the queued chunks are written."""
+        self._queue.put(None)
+
+    def wait(self, timeout):
+        """Wait for FFmpeg to finish; True if the output is complete."""
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+            self.failed = True
+        self._exited()
+        self._writer.join(timeout=5)
+        self._stderr_thread.join(timeout=5)
+        return not self.failed and self.process.returncode == 0 and self.output_path.exists()
+
+    def abort(self):
+        """Stop FFmpeg and discard partial output."""
+        self.failed = True
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+        self._queue.put(None)
+        self.process.wait()
+        self._exited()
+        try:
+            if self.output_path.exists():
+                os.remove(self.output_path)
+        except OSError as e:
+            logger.warning(f"Error removing partial live extraction {self.output_path}: {str(e)}")
+
+    def _exited(self):
+        with _sessions_lock:
+            _running.discard(self)
+
+    def _write_chunks(self):
+        block_size = 1024 * 1024
+
+        while True:
+            try:
+                chunk_file = self._queue.get(timeout=settings.LIVE_EXTRACTION_IDLE_TIMEOUT_SECONDS)
+            except queue.Empty:
+                # The rest of the upload went to another worker, or never came
+                LiveExtractionService.expire(self)
+                break
+            if chunk_file is None:
+                break
+            if self.failed:
+                chunk_file.close()
+                continue
+            try:
+                with chunk_file:
+                    while True:
+                        data = chunk_file.read(block_size)
+                        if not data:
+                            break
+                        self.process.stdin.write(data)
+            except (BrokenPipeError, OSError) as e:
+                # FFmpeg gave up on the stream; the upload falls back to the file path
+                logger.warning(f"Live extraction for upload {self.upload_id} stopped: {str(e)}")
+                self.failed = True
+
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    def _drain_stderr(self):
+        for line in self.process.stderr:
+            self._stderr_tail.append(line.decode('utf-8', 'replace').rstrip())
+
+
+class LiveExtractionService:
+    """
+    Service that pipelines audio extraction with the chunked upload.
+
+    When the first chunk of a streamable upload arrives, an FFmpeg process is
+    started reading from a pipe, and every chunk that arrives in order is fed
+    to it. By the time the last chunk lands most of the 16kHz PCM is already
+    written. Formats that need seekable input (MP4 with the moov atom at the
+    end) and uploads seen by another worker process fall back to extracting
+    from the assembled file.
+    """
+
+    @staticmethod
+    def start_if_streamable(upload_id, user, first_chunk):
+        """Start a live extraction session for an upload when its format allows it."""
+        if not settings.LIVE_EXTRACTION_ENABLED or first_chunk.total_chunks < 2:
+            return None
+
+        if not LiveExtractionService.is_streamable(first_chunk.filename, first_chunk.chunk_file.path):
+            logger.info(f"Upload {upload_id} needs seekable input, extracting after assembly")
+            return None
+
+        if admission_controller.free_disk_bytes() < settings.ADMISSION_MIN_FREE_DISK_MB * 1024 * 1024:
+            return None
+
+        with _sessions_lock:
+            if str(upload_id) in _sessions:
+                return _sessions[str(upload_id)]
+            if len(_running) >= settings.LIVE_EXTRACTION_MAX_SESSIONS:
+                logger.info(f"Too many live extractions running, extracting upload {upload_id} after assembly")
+                return None
+
+            output_path = Path(settings.MEDIA_ROOT) / 'temp_live_extraction' / str(user.id) / f"{upload_id}.wav"
+            try:
+                session = LiveExtractionSession(upload_id, output_path)
+            except Exception as e:
+                logger.warning(f"Could not start live extraction for upload {upload_id}: {str(e)}")
+                return None
+
+            _sessions[str(upload_id)] = session
+            _running.add(session)
+        return session
+
+    @staticmethod
+    def feed(upload_id, user):
+        """Queue every chunk that continues the in-order prefix of the upload."""
+        with _sessions_lock:
+            session = _sessions.get(str(upload_id))
+        if session is None or session.failed:
+            return
+
+        # Concurrent chunk requests must not queue the same chunk twice
+        with session.feed_lock:
+            chunks = ChunkUpload.objects.filter(
+                upload_id=upload_id,
+                user=user,
+                chunk_number__gte=session.next_chunk
+            ).order_by('chunk_number')
+
+            for chunk in chunks:
+                if chunk.chunk_number != session.next_chunk:
+                    break
+                try:
+                    session.enqueue(chunk.chunk_file.path)
+                except OSError as e:
+                    logger.warning(f"Live extraction for upload {upload_id} lost chunk {chunk.chunk_number}: {str(e)}")
+                    session.failed = True
+                    break
+                session.next_chunk += 1
+
+    @staticmethod
+    def take(upload_id, user):
+        """
+        Detach the session for a fully uploaded file and queue its last bytes.
+
+        Returns the session, or None if this process has no usable session.
+        Must be called before the chunk files are cleaned up. Does not wait
+        for FFmpeg: the thread that adopts the session does, in wait().
+        """
+        LiveExtractionService.feed(upload_id, user)
+
+        with _sessions_lock:
+            session = _sessions.pop(str(upload_id), None)
+        if session is None:
+            return None
+
+        session.close_input()
+        if session.failed:
+            LiveExtractionService.discard(session)
+            return None
+        return session
+
+    @staticmethod
+    def cancel(upload_id):
+        """Abort a session, e.g. when the upload is cancelled."""
+        with _sessions_lock:
+            session = _sessions.pop(str(upload_id), None)
+        if session is not None:
+            LiveExtractionService.discard(session)
+
+    @staticmethod
+    def expire(session):
+        """Abort an idle session, unless it was already taken or cancelled."""
+        with _sessions_lock:
+            if _sessions.get(session.upload_id) is not session:
+                return
+            del _sessions[session.upload_id]
+
+        logger.info(f"Aborting idle live extraction for upload {session.upload_id}")
+        LiveExtractionService.discard(session)
+
+    @staticmethod
+    def discard(session):
+        session.abort()
+
+    @staticmethod
+    def is_streamable(filename, first_chunk_path):
+        """
+        Whether FFmpeg can decode the file from a pipe. MP4/MOV is only
+        streamable when the moov atom precedes the media data.
+        """
+        ext = Path(filename).suffix.lower()
+        if ext in STREAMABLE_EXTENSIONS:
+            return True
+        if ext in ('.mp4', '.m4a', '.mov'):
+            return LiveExtractionService.moov_before_mdat(first_chunk_path)
+        return False
+
+    @staticmethod
+    def moov_before_mdat(path):
+        """Walk top-level MP4 atoms of a file (or its first chunk) looking for moov vs mdat."""
+        try:
+            with open(path, 'rb') as f:
+                file_size = os.fstat(f.fileno()).st_size
+                offset = 0
+                while offset + 8 <= file_size:
+                    f.seek(offset)
+                    size, atom_type = struct.unpack('>I4s', f.read(8))
+                    if atom_type == b'moov':
+                        return True
+                    if atom_type == b'mdat':
+                        return False
+                    if size == 1:
+                        size = struct.unpack('>Q', f.read(8))[0]
+                    elif size == 0:
+                        return False
+                    if size < 8:
+                        return False
+                    offset += size
+        except (OSError, struct.error):
+            pass
+        # moov not within the first chunk: too far in to stream safely
+        return False
@@ -0,0 +1 @@
+# Management commands for media_files app
@@ -0,0 +1,85 @@
+import os
+import time
+import tempfile
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from media_files.ffmpeg import FFmpegRunner
+from media_files.services import AudioProcessingService, MediaProbeService, ParallelExtractionService
+
+
+class Command(BaseCommand):
+    help = 'Compare single-process and time-sharded parallel audio extraction on a video file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input_path',
+            type=str,
+            help='Video file to extract audio from',
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            nargs='+',
+            default=[2, 4, os.cpu_count() or 1],
+            help='Shard counts to benchmark (default: 2, 4 and one per CPU core)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help='Runs per configuration; the fastest is reported',
+        )
+
+    def handle(self, *args, **options):
+        input_path = options['input_path']
+        if not os.path.exists(input_path):
+            raise CommandError(f'File not found: {input_path}')
+
+        info = MediaProbeService.probe(input_path)
+        duration = float(info.get('format', {}).get('duration') or 0)
+        if not duration:
+            raise CommandError('Could not determine media duration')
+
+        self.stdout.write(f'Input: {input_path} ({duration:.1f}s, {os.cpu_count()} CPUs)')
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            baseline_path = Path(tmp_dir) / 'single.wav'
+            baseline = self.time_runs(options['repeat'], lambda: self.run_single(input_path, baseline_path))
+            baseline_size = os.path.getsize(baseline_path)
+            self.stdout.write(f'  single process : {baseline:8.2f}s')
+
+            for shards in sorted(set(options['shards'])):
+                if shards < 2:
+                    continue
+                output_path = Path(tmp_dir) / f'sharded_{shards}.wav'
+                elapsed = self.time_runs(
+                    options['repeat'],
+                    lambda: self.run_sharded(input_path, output_path, duration, shards)
+                )
+                size_delta = os.path.getsize(output_path) - baseline_size
+                self.stdout.write(
+                    f'  {shards:2d} shards      : {elapsed:8.2f}s  '
+                    f'speedup {baseline / elapsed:5.2f}x  '
+                    f'size delta {size_delta:+d} bytes'
+                )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark completed'))
+
+    def time_runs(self, repeat, run):
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def run_single(self, input_path, output_path):
+        result = FFmpegRunner.run(AudioProcessingService.extraction_command(input_path, output_path))
+        if result.returncode != 0:
+            raise CommandError(f'Single-process extraction failed: {result.stderr}')
+
+    def run_sharded(self, input_path, output_path, duration, shards):
+        result = ParallelExtractionService.extract(input_path, output_path, duration, shards)
+        if result.returncode != 0:
+            raise CommandError(f'Sharded extraction failed: {result.stderr}')
@@ -0,0 +1,81 @@
+import os
+import shutil
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from media_files.models import MediaFile
+from media_files.services import AudioStorageService
+
+
+class Command(BaseCommand):
+    help = 'Re-encode stored extracted WAV audio as FLAC and remove leftover chunk directories'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be converted without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        if settings.AUDIO_STORAGE_FORMAT != 'flac':
+            self.stdout.write(self.style.WARNING('AUDIO_STORAGE_FORMAT is not flac, nothing to do'))
+            return
+
+        dry_run = options['dry_run']
+        converted = 0
+        bytes_before = 0
+        bytes_after = 0
+
+        media_files = MediaFile.objects.filter(storage_path_audio__endswith='.wav').select_related('user')
+        for media_file in media_files:
+            # A ready 16kHz WAV upload doubles as the audio file; it is the original, so keep it
+            if media_file.storage_path_audio == media_file.storage_path_original:
+                continue
+
+            wav_path = Path(settings.MEDIA_ROOT) / media_file.storage_path_audio
+            if not wav_path.exists():
+                self.stdout.write(self.style.WARNING(f'{media_file.id}: {wav_path} is missing, skipping'))
+                continue
+
+            size = wav_path.stat().st_size
+            if dry_run:
+                self.stdout.write(f'{media_file.id}: would compress {size / (1024 * 1024):.1f}MB')
+                bytes_before += size
+                continue
+
+            try:
+                media_file.storage_path_audio = AudioStorageService.store_pcm(media_file, wav_path)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'{media_file.id}: {str(e)}'))
+                continue
+            media_file.save(update_fields=['storage_path_audio'])
+
+            new_size = os.path.getsize(Path(settings.MEDIA_ROOT) / media_file.storage_path_audio)
+            bytes_before += size
+            bytes_after += new_size
+            converted += 1
+            self.stdout.write(
+                f'{media_file.id}: {size / (1024 * 1024):.1f}MB -> {new_size / (1024 * 1024):.1f}MB'
+            )
+
+        # Chunk files used to be left next to the audio after transcription
+        removed_dirs = 0
+        audio_root = Path(settings.MEDIA_ROOT) / 'uploads' / 'audio'
+        if audio_root.exists():
+            for chunks_dir in audio_root.glob('*/*/chunks'):
+                if not dry_run:
+                    shutil.rmtree(chunks_dir, ignore_errors=True)
+                removed_dirs += 1
+
+        if dry_run:
+            self.stdout.write(
+                f'Would compress {bytes_before / (1024 * 1024):.1f}MB of WAV audio '
+                f'and remove {removed_dirs} chunk directories'
+            )
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Compressed {converted} files: {bytes_before / (1024 * 1024):.1f}MB -> '
+            f'{bytes_after / (1024 * 1024):.1f}MB; removed {removed_dirs} chunk directories'
+        ))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_files', '0003_add_deferred_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='audio_channel_layout',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='audio_channels',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='audio_codec',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='audio_sample_rate',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='container_format',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='media_streams',
+            field=models.JSONField(blank=True, help_text='Per-stream summary from ffprobe', null=True),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='video_codec',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mediafile',
+            name='duration_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_files', '0004_add_probed_media_properties'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='processing_progress',
+            field=models.FloatField(blank=True, help_text='Percent complete of the running FFmpeg stage', null=True),
+        ),
+    ]
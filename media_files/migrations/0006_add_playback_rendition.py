@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_files', '0005_add_processing_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='storage_path_playback',
+            field=models.CharField(blank=True, help_text='Fast-start MP4 remux of the original, served for playback when present', max_length=512, null=True),
+        ),
+    ]
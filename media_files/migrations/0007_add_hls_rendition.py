@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_files', '0006_add_playback_rendition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='storage_path_hls',
+            field=models.CharField(blank=True, help_text='HLS master playlist packaged from the original, when present', max_length=512, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_files', '0007_add_hls_rendition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='storage_path_audio_playback',
+            field=models.CharField(blank=True, help_text='Compressed audio-only rendition for listening, when present', max_length=512, null=True),
+        ),
+    ]
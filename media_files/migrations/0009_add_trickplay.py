@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_files', '0008_add_playback_audio_rendition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='storage_path_trickplay',
+            field=models.CharField(blank=True, help_text='Directory with the poster, thumbnail sprite sheets and their WebVTT track', max_length=512, null=True),
+        ),
+    ]
@@ -18,6 +18,7 @@ class MediaFile(models.Model):
         ('uploading', 'Uploading'),
         ('uploaded_processing_assembly', 'Processing Assembly'),
         ('processing_audio', 'Processing Audio'),
+        ('deferred_processing', 'Deferred - Waiting for Capacity'),
         ('pending_transcription', 'Pending Transcription'),
         ('transcribing', 'Transcribing'),
         ('transcribing_chunked', 'Transcribing (Chunked)'),
@@ -52,17 +53,49 @@ class MediaFile(models.Model):
     # Timestamps
     upload_date = models.DateTimeField(auto_now_add=True)
 
-    # Media properties
-    duration_seconds = models.IntegerField(null=True, blank=True)
+    # Media properties (populated by a single ffprobe pass after assembly)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    container_format = models.CharField(max_length=100, null=True, blank=True)
+    video_codec = models.CharField(max_length=50, null=True, blank=True)
+    audio_codec = models.CharField(max_length=50, null=True, blank=True)
+    audio_sample_rate = models.IntegerField(null=True, blank=True)
+    audio_channels = models.IntegerField(null=True, blank=True)
+    audio_channel_layout = models.CharField(max_length=50, null=True, blank=True)
+    media_streams = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Per-stream summary from ffprobe"
+    )
     language_transcription = models.CharField(max_length=10, choices=LANGUAGE_CHOICES, default='en')
 
     # Processing status
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='pending_upload')
     replicate_job_id = models.CharField(max_length=100, null=True, blank=True)
+    processing_progress = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Percent complete of the running FFmpeg stage"
+    )
 
     # File paths
     storage_path_original = models.CharField(max_length=512, null=True, blank=True)
     storage_path_audio = models.CharField(max_length=512, null=True, blank=True)
+    storage_path_playback = models.CharField(
+        max_length=512, null=True, blank=True,
+        help_text="Fast-start MP4 remux of the original, served for playback when present"
+    )
+    storage_path_hls = models.CharField(
+        max_length=512, null=True, blank=True,
+        help_text="HLS master playlist packaged from the original, when present"
+    )
+    storage_path_audio_playback = models.CharField(
+        max_length=512, null=True, blank=True,
+        help_text="Compressed audio-only rendition for listening, when present"
+    )
+    storage_path_trickplay = models.CharField(
+        max_length=512, null=True, blank=True,
+        help_text="Directory with the poster, thumbnail sprite sheets and their WebVTT track"
+    )
 
     # Error handling
     error_message = models.TextField(null=True, blank=True)
@@ -82,7 +115,8 @@ class MediaFile(models.Model):
         """Check if the file is currently being processed."""
         processing_statuses = [
             'uploading', 'uploaded_processing_assembly',
-            'processing_audio', 'pending_transcription', 'transcribing'
+            'processing_audio', 'deferred_processing',
+            'pending_transcription', 'transcribing'
         ]
         return self.status in processing_statuses
 
@@ -91,6 +125,17 @@ class MediaFile(models.Model):
         """Check if the file processing is completed."""
         return self.status == 'completed'
 
+    @property
+    def is_whisper_ready_pcm(self):
+        """Check if the original is already 16kHz mono 16-bit PCM WAV."""
+        return (
+            self.container_format == 'wav'
+            and self.video_codec is None
+            and self.audio_codec == 'pcm_s16le'
+            and self.audio_sample_rate == 16000
+            and self.audio_channels == 1
+        )
+
     @property
     def has_failed(self):
         """Check if the file processing has failed."""
@@ -3,7 +3,29 @@ from django.contrib.auth.models import User
 from .models import MediaFile, ChunkUpload
 
 
-class UserSerializer(serializers.ModelSerializer):
+def requested_fields(request):
+    """Field names from a comma-separated `?fields=` parameter, or None for all fields."""
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Lets a serializer be narrowed to a subset of its fields with `fields=`,
+    e.g. from `requested_fields(request)`. Unknown names are ignored.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for User model."""
     
     class Meta:
@@ -12,7 +34,7 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class MediaFileSerializer(serializers.ModelSerializer):
+class MediaFileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for MediaFile model."""
     
     user = UserSerializer(read_only=True)
@@ -25,13 +47,20 @@ class MediaFileSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'filename_original', 'filesize_bytes', 
             'file_type', 'mime_type', 'upload_date', 'duration_seconds',
-            'language_transcription', 'status', 'replicate_job_id',
-            'storage_path_original', 'storage_path_audio', 'error_message',
+            'container_format', 'video_codec', 'audio_codec', 'audio_sample_rate',
+            'audio_channels', 'audio_channel_layout', 'media_streams',
+            'language_transcription', 'status', 'processing_progress', 'replicate_job_id',
+            'storage_path_original', 'storage_path_audio', 'storage_path_playback', 'storage_path_hls', 'storage_path_audio_playback',
+            'storage_path_trickplay', 'error_message',
             'is_processing', 'is_completed', 'has_failed'
         ]
         read_only_fields = [
-            'id', 'user', 'upload_date', 'status', 'replicate_job_id',
-            'storage_path_original', 'storage_path_audio', 'error_message'
+            'id', 'user', 'upload_date', 'duration_seconds', 'container_format',
+            'video_codec', 'audio_codec', 'audio_sample_rate', 'audio_channels',
+            'audio_channel_layout', 'media_streams', 'status', 'processing_progress',
+            'replicate_job_id',
+            'storage_path_original', 'storage_path_audio', 'storage_path_playback', 'storage_path_hls', 'storage_path_audio_playback',
+            'storage_path_trickplay', 'error_message'
         ]
 
 
@@ -62,13 +91,19 @@ class MediaFileCreateSerializer(serializers.ModelSerializer):
             )
         return value
     
+    # Other names browsers and platforms send for WAV, stored as audio/wav
+    WAV_MIME_ALIASES = ['audio/x-wav', 'audio/wave', 'audio/vnd.wave']
+
     def validate_mime_type(self, value):
         """Validate MIME type is supported."""
         supported_types = [
             'audio/mpeg',  # .mp3
+            'audio/wav',  # .wav
             'video/mp4',   # .mp4
             'video/x-matroska',  # .mkv
         ]
+        if value in self.WAV_MIME_ALIASES:
+            return 'audio/wav'
         if value not in supported_types:
             raise serializers.ValidationError(
                 f"MIME type '{value}' is not supported. "
@@ -1,16 +1,32 @@
 import os
+import re
+import json
 import uuid
 import logging
+import wave
+import struct
+import tempfile
 import subprocess
+import shutil
 import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from .models import MediaFile, ChunkUpload
+from .admission import admission_controller
+from .ffmpeg import FFmpegRunner, FFmpegResult
 
 logger = logging.getLogger(__name__)
 
+# Guards the PCM cache directory (installs, eviction) and _pcm_decode_locks
+_pcm_cache_lock = threading.Lock()
+# media_file_id -> lock held while that file is decoded into the cache
+_pcm_decode_locks = {}
+
 
 class FileUploadService:
     """Service for handling file uploads and chunk assembly."""
@@ -70,8 +86,12 @@ class FileUploadService:
             storage_dir = Path(settings.MEDIA_ROOT) / 'uploads' / 'originals' / str(user.id) / str(media_file.id)
             storage_dir.mkdir(parents=True, exist_ok=True)
 
-            # Assemble file
-            output_path = storage_dir / first_chunk.filename
+            # Assemble file, named after the media file: the client's name is kept in
+            # filename_original and never becomes part of a filesystem path
+            extension = Path(first_chunk.filename).suffix.lower()
+            if not re.fullmatch(r'\.[a-z0-9]{1,10}', extension):
+                extension = ''
+            output_path = storage_dir / f"{media_file.id}{extension}"
 
             with open(output_path, 'wb') as output_file:
                 for chunk in chunks:
@@ -82,6 +102,10 @@ class FileUploadService:
             relative_path = os.path.relpath(output_path, settings.MEDIA_ROOT)
             media_file.storage_path_original = relative_path
             media_file.status = 'processing_audio'
+
+            # Record duration, codecs and stream layout for later stages
+            MediaProbeService.apply_probe(media_file, output_path)
+
             media_file.save()
 
             # Mark chunks as assembled
@@ -106,6 +130,7 @@ class FileUploadService:
         ext = Path(filename).suffix.lower()
         mime_types = {
             '.mp3': 'audio/mpeg',
+            '.wav': 'audio/wav',
             '.mp4': 'video/mp4',
             '.mkv': 'video/x-matroska',
         }
@@ -131,11 +156,27 @@ class FileUploadService:
                 os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
             )
 
-        if media_file.storage_path_audio:
+        if media_file.storage_path_audio and media_file.storage_path_audio != media_file.storage_path_original:
             files_to_remove.append(
                 os.path.join(settings.MEDIA_ROOT, media_file.storage_path_audio)
             )
 
+        if media_file.storage_path_playback:
+            files_to_remove.append(
+                os.path.join(settings.MEDIA_ROOT, media_file.storage_path_playback)
+            )
+
+        if media_file.storage_path_audio_playback:
+            files_to_remove.append(
+                os.path.join(settings.MEDIA_ROOT, media_file.storage_path_audio_playback)
+            )
+
+        if media_file.storage_path_audio:
+            from .waveform import WaveformService
+            files_to_remove.append(WaveformService.peaks_path(media_file))
+
+        files_to_remove.append(str(AudioStorageService.cache_path(media_file)))
+
         for file_path in files_to_remove:
             try:
                 if os.path.exists(file_path):
@@ -144,128 +185,354 @@ class FileUploadService:
             except Exception as e:
                 logger.warning(f"Error removing file {file_path}: {str(e)}")
 
+        if media_file.storage_path_hls:
+            HLSRenditionService.remove(media_file)
 
-class AudioChunkingService:
-    """Service for splitting large audio files into chunks for Replicate API."""
+        if media_file.storage_path_trickplay:
+            from .trickplay import TrickplayService
+            TrickplayService.remove(media_file)
+
+        if hasattr(media_file, 'transcription'):
+            from transcriptions.artifacts import SubtitleArtifactCache
+            SubtitleArtifactCache.remove(media_file.transcription)
+
+
+class MediaProbeService:
+    """Service for reading media properties with a single ffprobe call."""
 
     @staticmethod
-    def split_audio_if_needed(audio_path, max_size_mb=95):
+    def probe(file_path):
         """
-        Split audio file into chunks if it exceeds the size limit.
-
-        This method first tries the optimized approach (95MB threshold, 90MB chunks).
-        If you need smaller chunks due to network issues, call split_audio_with_smaller_chunks().
+        Run ffprobe on a file and return its parsed JSON description
+        (format and streams).
         """
-        return AudioChunkingService._split_audio_internal(audio_path, max_size_mb)
+        cmd = [
+            settings.FFPROBE_BINARY,
+            '-v', 'error',
+            '-print_format', 'json',
+            '-show_format',
+            '-show_streams',
+            str(file_path)
+        ]
+
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=60
+        )
+
+        if result.returncode != 0:
+            raise RuntimeError(f"ffprobe error: {result.stderr.strip()}")
+
+        return json.loads(result.stdout or '{}')
 
     @staticmethod
-    def split_audio_with_smaller_chunks(audio_path, max_size_mb=50):
+    def apply_probe(media_file, file_path):
         """
-        Split audio file into smaller chunks for better network reliability.
-        Use this as a fallback when large chunks fail due to connection issues.
+        Probe the assembled original and record its properties on the
+        MediaFile (not saved). A failed probe is logged and leaves the
+        fields empty so later stages fall back to their estimates.
         """
-        logger.info(f"Using smaller chunks ({max_size_mb}MB) for better network reliability")
+        try:
+            info = MediaProbeService.probe(file_path)
+        except Exception as e:
+            logger.warning(f"Could not probe {file_path}: {str(e)}")
+            return
 
-        # Use different chunk sizes based on threshold
-        if max_size_mb <= 25:
-            target_chunk_size_mb = 15  # Ultra-conservative for very unreliable networks (reduced from 20MB)
-        else:
-            target_chunk_size_mb = 45  # Conservative for moderately unreliable networks
+        MediaProbeService.record_probe(media_file, info)
 
-        return AudioChunkingService._split_audio_internal(audio_path, max_size_mb, target_chunk_size_mb=target_chunk_size_mb)
+    @staticmethod
+    def record_probe(media_file, info):
+        """Copy the properties from ffprobe JSON output onto the MediaFile (not saved)."""
+        streams = info.get('streams', [])
+        media_format = info.get('format', {})
+
+        video_stream = next(
+            (s for s in streams
+             if s.get('codec_type') == 'video'
+             and not s.get('disposition', {}).get('attached_pic')),
+            None
+        )
+        audio_stream = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+
+        duration = media_format.get('duration')
+        if duration is None and audio_stream:
+            duration = audio_stream.get('duration')
+        if duration is not None:
+            media_file.duration_seconds = float(duration)
+
+        # ffprobe reports e.g. "mov,mp4,m4a,3gp,3g2,mj2"; keep the first name
+        format_name = media_format.get('format_name')
+        media_file.container_format = format_name.split(',')[0] if format_name else None
+
+        media_file.video_codec = video_stream.get('codec_name') if video_stream else None
+
+        if audio_stream:
+            media_file.audio_codec = audio_stream.get('codec_name')
+            media_file.audio_sample_rate = int(audio_stream.get('sample_rate', 0)) or None
+            media_file.audio_channels = audio_stream.get('channels')
+            media_file.audio_channel_layout = audio_stream.get('channel_layout')
+
+        media_file.media_streams = [
+            {
+                'index': s.get('index'),
+                'codec_type': s.get('codec_type'),
+                'codec_name': s.get('codec_name'),
+                'sample_rate': s.get('sample_rate'),
+                'channels': s.get('channels'),
+                'channel_layout': s.get('channel_layout'),
+                'width': s.get('width'),
+                'height': s.get('height'),
+                'bit_rate': s.get('bit_rate'),
+                'language': s.get('tags', {}).get('language'),
+            }
+            for s in streams
+        ]
+
+        logger.info(
+            f"Probed {media_file.id}: {media_file.duration_seconds}s, "
+            f"container={media_file.container_format}, video={media_file.video_codec}, "
+            f"audio={media_file.audio_codec} {media_file.audio_sample_rate}Hz "
+            f"x{media_file.audio_channels}"
+        )
 
     @staticmethod
-    def _split_audio_internal(audio_path, max_size_mb=95, target_chunk_size_mb=None):
-        """
-        Internal method to split audio file into chunks if it exceeds the size limit.
-        Returns list of chunk file paths.
+    def ffmpeg_timeout(duration_seconds, default=3600):
+        """Timeout for an FFmpeg job over media of the given duration."""
+        if not duration_seconds:
+            return default
+        return max(
+            settings.FFMPEG_MIN_TIMEOUT_SECONDS,
+            int(duration_seconds * settings.FFMPEG_TIMEOUT_PER_MEDIA_SECOND)
+        )
 
-        Args:
-            audio_path: Path to the audio file
-            max_size_mb: Maximum size threshold for chunking
-            target_chunk_size_mb: Target size for each chunk when chunking is needed
 
-        Returns:
-            List of chunk file paths
-        """
-        file_size_mb = os.path.getsize(audio_path) / (1024 * 1024)
+class AudioChunkingService:
+    """Service for splitting large audio files into chunks for Replicate API."""
 
-        if file_size_mb <= max_size_mb:
-            # File is small enough, return as single chunk
-            return [audio_path]
+    # Transport encodings for chunks uploaded to Replicate. bytes_per_second is
+    # a conservative size estimate used for chunk planning.
+    TRANSPORT_FORMATS = {
+        'wav': {
+            'extension': 'wav',
+            'codec_args': ['-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1'],
+            'bytes_per_second': 32000,
+        },
+        'flac': {
+            'extension': 'flac',
+            'codec_args': ['-acodec', 'flac', '-ar', '16000', '-ac', '1'],
+            'bytes_per_second': 21000,  # Lossless; speech typically compresses to 50-65%
+        },
+        'opus': {
+            'extension': 'ogg',
+            'codec_args': ['-acodec', 'libopus', '-ac', '1', '-application', 'voip'],
+            'bytes_per_second': None,  # Derived from TRANSCRIPTION_TRANSPORT_OPUS_BITRATE
+        },
+    }
+
+    # Source audio codecs that can be stream-copied into a standalone file
+    COPYABLE_CODECS = {
+        'aac': 'm4a',
+        'mp3': 'mp3',
+        'opus': 'ogg',
+        'vorbis': 'ogg',
+        'flac': 'flac',
+    }
 
-        # When chunking is needed, use specified target chunk size or default
-        if target_chunk_size_mb is None:
-            target_chunk_size_mb = 90  # Default: 90MB chunks for optimal performance
+    @staticmethod
+    def prepare_transport_chunks(media_file, audio_path, max_size_mb=25, target_chunk_size_mb=15,
+                                 duration_seconds=None, work_dir=None):
+        """
+        Produce the files to upload for transcription, encoded in
+        TRANSCRIPTION_TRANSPORT_FORMAT and split so each stays under the limit.
 
-        # Calculate chunk duration based on file size
-        # Estimate: 16kHz mono WAV is approximately 32KB per second
-        estimated_duration_seconds = file_size_mb * 1024 * 1024 / (16000 * 2)  # 2 bytes per sample
-        chunk_duration_seconds = int((estimated_duration_seconds * target_chunk_size_mb) / file_size_mb)
+        The local 16kHz WAV at `audio_path` is left untouched. Pass
+        `duration_seconds` when `audio_path` is not the full-length audio of
+        the media file (e.g. silence-compacted); stream copy is then skipped.
+        Chunks are written to `work_dir`, which the caller removes after use.
 
-        # Ensure minimum chunk duration of 30 seconds
-        chunk_duration_seconds = max(30, chunk_duration_seconds)
+        Returns a list of {'path', 'start', 'duration'} dicts, where `start`
+        is the chunk's offset in seconds within the full audio.
+        """
+        transport = settings.TRANSCRIPTION_TRANSPORT_FORMAT
+        source_path = audio_path
+
+        if transport == 'copy':
+            copy_spec = AudioChunkingService._copy_spec(media_file) if duration_seconds is None else None
+            if copy_spec:
+                extension, bytes_per_second = copy_spec
+                source_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
+                codec_args = ['-map', '0:a:0', '-vn', '-acodec', 'copy']
+            else:
+                logger.info(f"Source audio of {media_file.id} cannot be stream-copied, using FLAC transport")
+                transport = 'flac'
+
+        if transport != 'copy':
+            spec = AudioChunkingService.TRANSPORT_FORMATS.get(transport)
+            if spec is None:
+                logger.warning(f"Unknown transport format '{transport}', using WAV")
+                transport = 'wav'
+                spec = AudioChunkingService.TRANSPORT_FORMATS['wav']
+            extension = spec['extension']
+            codec_args = list(spec['codec_args'])
+            bytes_per_second = spec['bytes_per_second']
+            if transport == 'opus':
+                bitrate = settings.TRANSCRIPTION_TRANSPORT_OPUS_BITRATE
+                codec_args += ['-b:a', f"{bitrate}k"]
+                bytes_per_second = bitrate * 1000 / 8
+
+        duration = duration_seconds or media_file.duration_seconds or (os.path.getsize(audio_path) / (16000 * 2))
+        max_bytes = max_size_mb * 1024 * 1024
+        estimated_size = duration * bytes_per_second
+
+        # The local WAV can be sent as-is when it already fits
+        if transport == 'wav' and os.path.getsize(audio_path) <= max_bytes:
+            return [{'path': str(audio_path), 'start': 0.0, 'duration': duration}]
+
+        if estimated_size <= max_bytes:
+            chunk_duration = duration
+        else:
+            chunk_duration = max(30, int(target_chunk_size_mb * 1024 * 1024 / bytes_per_second))
 
-        logger.info(f"Splitting audio file ({file_size_mb:.2f}MB) into ~{target_chunk_size_mb}MB chunks of {chunk_duration_seconds}s")
+        logger.info(
+            f"Preparing {transport} transport for {media_file.id}: {duration:.0f}s audio, "
+            f"~{estimated_size / (1024 * 1024):.1f}MB, chunks of {chunk_duration:.0f}s"
+        )
 
-        # Create chunks directory
-        audio_path_obj = Path(audio_path)
-        chunks_dir = audio_path_obj.parent / 'chunks'
-        chunks_dir.mkdir(exist_ok=True)
+        chunks_dir = Path(work_dir) if work_dir else Path(audio_path).parent / 'chunks'
+        chunks_dir.mkdir(parents=True, exist_ok=True)
 
-        chunk_paths = []
+        chunks = []
+        start_time = 0.0
         chunk_number = 0
-        start_time = 0
 
-        while start_time < estimated_duration_seconds:
-            chunk_path = chunks_dir / f"chunk_{chunk_number:03d}.wav"
+        while start_time < duration:
+            chunk_path = chunks_dir / f"chunk_{chunk_number:03d}.{extension}"
+            this_duration = min(chunk_duration, duration - start_time)
 
-            # FFmpeg command to extract chunk
             cmd = [
                 settings.FFMPEG_BINARY,
-                '-i', str(audio_path),
-                '-ss', str(start_time),  # Start time
-                '-t', str(chunk_duration_seconds),  # Duration
-                '-acodec', 'pcm_s16le',  # Same format as original
-                '-ar', '16000',
-                '-ac', '1',
-                '-y',  # Overwrite
+                '-ss', f"{start_time:.3f}",  # Input seeking: no re-decoding of earlier audio
+                '-i', str(source_path),
+                '-t', f"{this_duration:.3f}",
+            ] + codec_args + [
+                '-y',
                 str(chunk_path)
             ]
 
-            logger.info(f"Creating chunk {chunk_number}: {' '.join(cmd)}")
+            logger.info(f"Creating transport chunk {chunk_number}: {' '.join(cmd)}")
 
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=600  # 10 minutes timeout per chunk
-            )
+            with admission_controller.ffmpeg_slot():
+                result = FFmpegRunner.run(cmd, timeout=600)  # 10 minutes timeout per chunk
 
-            if result.returncode == 0 and os.path.exists(chunk_path):
-                chunk_size_mb = os.path.getsize(chunk_path) / (1024 * 1024)
-                logger.info(f"Created chunk {chunk_number}: {chunk_size_mb:.2f}MB")
-                chunk_paths.append(str(chunk_path))
-                chunk_number += 1
-                start_time += chunk_duration_seconds
-            else:
-                logger.error(f"Failed to create chunk {chunk_number}: {result.stderr}")
-                break
+            if result.returncode != 0 or not os.path.exists(chunk_path):
+                raise RuntimeError(f"Failed to create transport chunk {chunk_number}: {result.stderr}")
+
+            chunk_size_mb = os.path.getsize(chunk_path) / (1024 * 1024)
+            logger.info(f"Created chunk {chunk_number}: {chunk_size_mb:.2f}MB ({this_duration:.0f}s)")
+
+            chunks.append({'path': str(chunk_path), 'start': start_time, 'duration': this_duration})
+            start_time += chunk_duration
+            chunk_number += 1
 
-        return chunk_paths
+        return chunks
+
+    @staticmethod
+    def _copy_spec(media_file):
+        """
+        (extension, bytes_per_second) for stream-copying the source audio
+        track, or None if the source is not a compressed codec we can copy.
+        """
+        extension = AudioChunkingService.COPYABLE_CODECS.get(media_file.audio_codec)
+        if not extension or not media_file.storage_path_original:
+            return None
+
+        audio_stream = next(
+            (s for s in (media_file.media_streams or []) if s.get('codec_type') == 'audio'),
+            None
+        )
+        if not audio_stream or not audio_stream.get('bit_rate'):
+            return None
+
+        # 5% headroom for container overhead
+        return extension, int(audio_stream['bit_rate']) / 8 * 1.05
 
 
 class AudioProcessingService:
     """Service for audio extraction and processing."""
 
+    @staticmethod
+    def start_processing(media_file):
+        """
+        Start the audio stage for a newly assembled file.
+        """
+        if media_file.file_type == 'video':
+            AudioProcessingService.extract_audio_async(media_file)
+        else:
+            # For audio files, convert to required format
+            AudioProcessingService.convert_audio_async(media_file)
+
+    @staticmethod
+    def adopt_live_extraction_async(media_file, session):
+        """
+        Finish an extraction that ran while the upload was arriving,
+        falling back to the regular pipeline if it produced nothing usable.
+        """
+        thread = threading.Thread(
+            target=AudioProcessingService._finish_live_extraction,
+            args=(media_file, session)
+        )
+        thread.daemon = True
+        thread.start()
+
+    @staticmethod
+    def _finish_live_extraction(media_file, session):
+        """
+        Wait for the live FFmpeg process and install its output as the audio file.
+        """
+        try:
+            # A ready 16kHz mono WAV skips conversion entirely, so the live copy is redundant
+            usable = (
+                not media_file.is_whisper_ready_pcm
+                and session.wait(MediaProbeService.ffmpeg_timeout(media_file.duration_seconds))
+            )
+
+            if not usable:
+                logger.info(f"Live extraction for {media_file.id} not used, falling back: {session.stderr}")
+                session.abort()
+                AudioProcessingService.start_processing(media_file)
+                return
+
+            with admission_controller.ffmpeg_slot():
+                media_file.storage_path_audio = AudioStorageService.store_pcm(media_file, session.output_path)
+            media_file.status = 'pending_transcription'
+            media_file.processing_progress = 100.0
+            media_file.save()
+
+            logger.info(f"Audio for {media_file.id} was extracted during upload")
+
+            AudioProcessingService._audio_ready(media_file)
+
+        except Exception as e:
+            media_file.status = 'failed_extraction'
+            media_file.error_message = str(e)
+            media_file.save()
+            logger.error(f"Error finishing live extraction for {media_file.id}: {str(e)}")
+
     @staticmethod
     def extract_audio_async(media_file):
         """
         Extract audio from video file asynchronously.
+        Deferred while the worker is at its FFmpeg or disk limits.
         """
+        if not admission_controller.try_reserve_ffmpeg():
+            admission_controller.defer(media_file, AudioProcessingService.extract_audio_async)
+            return
+
         thread = threading.Thread(
-            target=AudioProcessingService._extract_audio,
-            args=(media_file,)
+            target=AudioProcessingService._run_admitted,
+            args=(AudioProcessingService._extract_audio, media_file)
         )
         thread.daemon = True
         thread.start()
@@ -274,49 +541,107 @@ class AudioProcessingService:
     def convert_audio_async(media_file):
         """
         Convert audio file to required format asynchronously.
+        Deferred while the worker is at its FFmpeg or disk limits.
         """
+        if not admission_controller.try_reserve_ffmpeg():
+            admission_controller.defer(media_file, AudioProcessingService.convert_audio_async)
+            return
+
         thread = threading.Thread(
-            target=AudioProcessingService._convert_audio,
-            args=(media_file,)
+            target=AudioProcessingService._run_admitted,
+            args=(AudioProcessingService._convert_audio, media_file)
         )
         thread.daemon = True
         thread.start()
 
     @staticmethod
-    def _extract_audio(media_file):
+    def _run_admitted(target, media_file):
+        """Run a pipeline step holding the FFmpeg slot reserved for it."""
+        with admission_controller.reserved_ffmpeg():
+            admission_controller.release_deferred(media_file)
+            if media_file.status == 'deferred_processing':
+                media_file.status = 'processing_audio'
+                media_file.save(update_fields=['status'])
+            target(media_file)
+
+    @staticmethod
+    def _audio_ready(media_file):
         """
-        Extract audio from video file using FFmpeg.
+        Run the post-extraction stages on the stored audio, then queue transcription.
         """
+        from .waveform import WaveformService
         try:
-            input_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
+            WaveformService.generate(media_file)
+        except Exception as e:
+            # The player works without a waveform; never hold up transcription for it
+            logger.warning(f"Error generating waveform peaks for {media_file.id}: {str(e)}")
 
-            # Create audio storage directory
-            audio_dir = Path(settings.MEDIA_ROOT) / 'uploads' / 'audio' / str(media_file.user.id) / str(media_file.id)
-            audio_dir.mkdir(parents=True, exist_ok=True)
+        PlaybackAudioService.prepare_async(media_file)
 
-            output_path = audio_dir / f"{media_file.id}.wav"
+        from transcriptions.services import TranscriptionService
+        TranscriptionService.start_transcription_async(media_file)
 
-            # FFmpeg command for high-quality audio extraction (WAV PCM format)
-            # Following FFmpeg_settings.md recommendations for optimal WhisperX quality
-            cmd = [
-                settings.FFMPEG_BINARY,
-                '-i', input_path,
-                '-vn',  # No video
-                '-acodec', 'pcm_s16le',  # 16-bit PCM (uncompressed, high quality)
-                '-ar', '16000',  # 16kHz sample rate (optimal for WhisperX)
-                '-ac', '1',  # Mono channel
-                '-y',  # Overwrite output file
-                str(output_path)  # WAV file with PCM format
-            ]
+    @staticmethod
+    def extraction_command(input_path, output_path):
+        """
+        FFmpeg command extracting a video's audio track as 16kHz mono audio,
+        WAV or FLAC depending on the extension of `output_path`.
+        """
+        # FFmpeg command for high-quality audio extraction
+        # Following FFmpeg_settings.md recommendations for optimal WhisperX quality
+        return [
+            settings.FFMPEG_BINARY,
+            '-i', str(input_path),
+            '-vn',  # No video
+        ] + AudioStorageService.codec_args(output_path) + [
+            '-y',  # Overwrite output file
+            str(output_path)
+        ]
+
+    @staticmethod
+    def _extract_audio(media_file):
+        """
+        Extract audio from video file using FFmpeg.
+        """
+        try:
+            input_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
 
-            logger.info(f"Extracting audio for {media_file.id}: {' '.join(cmd)}")
+            output_path = AudioStorageService.output_path(media_file)
+            timeout = MediaProbeService.ffmpeg_timeout(media_file.duration_seconds)
 
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=3600  # 1 hour timeout
+            # The job holds one FFmpeg slot; each further shard needs a free one
+            extra_slots = admission_controller.reserve_free_ffmpeg(
+                ParallelExtractionService.shard_count(media_file.duration_seconds) - 1
             )
+            try:
+                shards = 1 + extra_slots
+                if shards > 1:
+                    logger.info(f"Extracting audio for {media_file.id} in {shards} parallel shards")
+                    # Shards are joined as WAV, then stored in the at-rest format
+                    wav_path = output_path.with_suffix('.extract.wav')
+                    result = ParallelExtractionService.extract(
+                        input_path, wav_path, media_file.duration_seconds, shards,
+                        media_file=media_file, timeout=timeout
+                    )
+                    if result.returncode == 0 and not result.cancelled:
+                        AudioStorageService.store_pcm(media_file, wav_path)
+                else:
+                    cmd = AudioProcessingService.extraction_command(input_path, output_path)
+
+                    logger.info(f"Extracting audio for {media_file.id}: {' '.join(cmd)}")
+
+                    result = FFmpegRunner.run(
+                        cmd,
+                        media_file=media_file,
+                        duration_seconds=media_file.duration_seconds,
+                        timeout=timeout
+                    )
+            finally:
+                admission_controller.release_ffmpeg(extra_slots)
+
+            if result.cancelled:
+                logger.info(f"Audio processing cancelled for {media_file.id}")
+                return
 
             if result.returncode == 0:
                 # Update MediaFile with audio path
@@ -327,9 +652,7 @@ class AudioProcessingService:
 
                 logger.info(f"Successfully extracted audio for {media_file.id}")
 
-                # Start transcription
-                from transcriptions.services import TranscriptionService
-                TranscriptionService.start_transcription_async(media_file)
+                AudioProcessingService._audio_ready(media_file)
 
             else:
                 media_file.status = 'failed_extraction'
@@ -355,35 +678,43 @@ class AudioProcessingService:
         Convert audio file to required format using FFmpeg.
         """
         try:
-            input_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
+            # Already 16kHz mono PCM WAV: use the original as-is
+            if media_file.is_whisper_ready_pcm:
+                media_file.storage_path_audio = media_file.storage_path_original
+                media_file.status = 'pending_transcription'
+                media_file.save()
 
-            # Create audio storage directory
-            audio_dir = Path(settings.MEDIA_ROOT) / 'uploads' / 'audio' / str(media_file.user.id) / str(media_file.id)
-            audio_dir.mkdir(parents=True, exist_ok=True)
+                logger.info(f"Audio for {media_file.id} is already 16kHz mono PCM, skipping conversion")
 
-            output_path = audio_dir / f"{media_file.id}.wav"
+                AudioProcessingService._audio_ready(media_file)
+                return
+
+            input_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
+            output_path = AudioStorageService.output_path(media_file)
 
-            # FFmpeg command for high-quality audio conversion (WAV PCM format)
+            # FFmpeg command for high-quality audio conversion (16kHz mono, WAV or FLAC at rest)
             # Following FFmpeg_settings.md recommendations for optimal WhisperX quality
             cmd = [
                 settings.FFMPEG_BINARY,
                 '-i', input_path,
-                '-acodec', 'pcm_s16le',  # 16-bit PCM (uncompressed, high quality)
-                '-ar', '16000',  # 16kHz sample rate (optimal for WhisperX)
-                '-ac', '1',  # Mono channel
+            ] + AudioStorageService.codec_args(output_path) + [
                 '-y',  # Overwrite output file
-                str(output_path)  # WAV file with PCM format
+                str(output_path)
             ]
 
             logger.info(f"Converting audio for {media_file.id}: {' '.join(cmd)}")
 
-            result = subprocess.run(
+            result = FFmpegRunner.run(
                 cmd,
-                capture_output=True,
-                text=True,
-                timeout=3600  # 1 hour timeout
+                media_file=media_file,
+                duration_seconds=media_file.duration_seconds,
+                timeout=MediaProbeService.ffmpeg_timeout(media_file.duration_seconds)
             )
 
+            if result.cancelled:
+                logger.info(f"Audio processing cancelled for {media_file.id}")
+                return
+
             if result.returncode == 0:
                 # Update MediaFile with audio path
                 relative_path = os.path.relpath(output_path, settings.MEDIA_ROOT)
@@ -393,9 +724,7 @@ class AudioProcessingService:
 
                 logger.info(f"Successfully converted audio for {media_file.id}")
 
-                # Start transcription
-                from transcriptions.services import TranscriptionService
-                TranscriptionService.start_transcription_async(media_file)
+                AudioProcessingService._audio_ready(media_file)
 
             else:
                 media_file.status = 'failed_extraction'
@@ -414,3 +743,865 @@ class AudioProcessingService:
             media_file.error_message = str(e)
             media_file.save()
             logger.error(f"Error converting audio for {media_file.id}: {str(e)}")
+
+
+class AudioStorageService:
+    """
+    Service for the canonical extracted audio at rest and its decode cache.
+
+    Extracted 16kHz mono audio is stored as FLAC by default (AUDIO_STORAGE_FORMAT),
+    about half the size of the equivalent WAV. Code that needs raw samples
+    asks for `pcm_path()`, which decodes into MEDIA_ROOT/cache/pcm on first
+    use; the cache is trimmed least-recently-used first to
+    AUDIO_PCM_CACHE_MAX_MB.
+    """
+
+    @staticmethod
+    def output_path(media_file):
+        """Where the canonical audio of a media file is stored."""
+        audio_dir = Path(settings.MEDIA_ROOT) / 'uploads' / 'audio' / str(media_file.user.id) / str(media_file.id)
+        audio_dir.mkdir(parents=True, exist_ok=True)
+        extension = 'flac' if settings.AUDIO_STORAGE_FORMAT == 'flac' else 'wav'
+        return audio_dir / f"{media_file.id}.{extension}"
+
+    @staticmethod
+    def codec_args(output_path):
+        """FFmpeg output arguments for 16kHz mono audio in the format of `output_path`."""
+        codec = 'flac' if str(output_path).endswith('.flac') else 'pcm_s16le'
+        return [
+            '-acodec', codec,  # Lossless either way
+            '-ar', '16000',  # 16kHz sample rate (optimal for WhisperX)
+            '-ac', '1',  # Mono channel
+        ]
+
+    @staticmethod
+    def store_pcm(media_file, wav_path):
+        """
+        Move a freshly extracted 16kHz WAV into storage, encoding it to the
+        at-rest format. The WAV is consumed: it becomes the stored file or,
+        since transcription reads it next, the media file's PCM cache entry.
+        Returns the MEDIA_ROOT-relative path.
+        """
+        output_path = AudioStorageService.output_path(media_file)
+        AudioStorageService.evict(media_file)
+
+        if output_path.suffix == '.wav':
+            os.replace(wav_path, output_path)
+        else:
+            cmd = [
+                settings.FFMPEG_BINARY,
+                '-i', str(wav_path),
+            ] + AudioStorageService.codec_args(output_path) + [
+                '-y',
+                str(output_path)
+            ]
+            result = FFmpegRunner.run(cmd, timeout=MediaProbeService.ffmpeg_timeout(media_file.duration_seconds))
+            if result.returncode != 0:
+                raise RuntimeError(f"Failed to encode stored audio: {result.stderr}")
+
+            cache_path = AudioStorageService.cache_path(media_file)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with _pcm_cache_lock:
+                shutil.move(str(wav_path), cache_path)
+                AudioStorageService._trim_cache(keep=cache_path)
+
+        return os.path.relpath(output_path, settings.MEDIA_ROOT)
+
+    @staticmethod
+    def pcm_data_offset(wav_path):
+        """Byte offset of the sample data in a RIFF/WAVE file, for memory-mapping."""
+        with open(wav_path, 'rb') as f:
+            f.seek(12)  # RIFF header
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"No data chunk in {wav_path}")
+                chunk_id, size = struct.unpack('<4sI', header)
+                if chunk_id == b'data':
+                    return f.tell()
+                f.seek(size + (size & 1), 1)  # Chunks are word-aligned
+
+    @staticmethod
+    def cache_path(media_file):
+        return Path(settings.MEDIA_ROOT) / 'cache' / 'pcm' / f"{media_file.id}.wav"
+
+    @staticmethod
+    def pcm_path(media_file):
+        """
+        Path of a 16kHz mono WAV of the media file's audio, for code that
+        reads raw samples. Stored WAVs are returned directly.
+        """
+        stored_path = Path(settings.MEDIA_ROOT) / media_file.storage_path_audio
+        if stored_path.suffix.lower() == '.wav':
+            return stored_path
+
+        cache_path = AudioStorageService.cache_path(media_file)
+        with _pcm_cache_lock:
+            if AudioStorageService._touch(cache_path):
+                return cache_path
+            decode_lock = _pcm_decode_locks.setdefault(media_file.id, threading.Lock())
+
+        # Only requests for this file wait on its decode
+        with decode_lock:
+            try:
+                with _pcm_cache_lock:
+                    if AudioStorageService._touch(cache_path):
+                        return cache_path
+
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                # Unique name, outside the cache's *.wav glob, so neither another
+                # worker process nor eviction can touch it mid-decode
+                fd, partial_path = tempfile.mkstemp(
+                    prefix=f"{media_file.id}_", suffix='.partial', dir=cache_path.parent
+                )
+                os.close(fd)
+                cmd = [
+                    settings.FFMPEG_BINARY,
+                    '-i', str(stored_path),
+                    '-acodec', 'pcm_s16le',
+                    '-ar', '16000',
+                    '-ac', '1',
+                    '-f', 'wav',
+                    '-y',
+                    partial_path
+                ]
+                logger.info(f"Decoding {stored_path} into the PCM cache")
+                try:
+                    with admission_controller.ffmpeg_slot():
+                        result = FFmpegRunner.run(
+                            cmd, timeout=MediaProbeService.ffmpeg_timeout(media_file.duration_seconds)
+                        )
+                    if result.returncode != 0:
+                        raise RuntimeError(f"Failed to decode stored audio: {result.stderr}")
+                except BaseException:
+                    Path(partial_path).unlink(missing_ok=True)
+                    raise
+
+                with _pcm_cache_lock:
+                    os.replace(partial_path, cache_path)
+                    AudioStorageService._trim_cache(keep=cache_path)
+                return cache_path
+            finally:
+                with _pcm_cache_lock:
+                    _pcm_decode_locks.pop(media_file.id, None)
+
+    @staticmethod
+    def _touch(cache_path):
+        """Mark a cache entry as recently used; False if it is not cached."""
+        try:
+            os.utime(cache_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def evict(media_file):
+        """Drop the cached decode of a media file, e.g. after its audio changed."""
+        try:
+            os.remove(AudioStorageService.cache_path(media_file))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _trim_cache(keep):
+        """Delete least recently used decodes until the cache fits its budget."""
+        cache_dir = keep.parent
+        max_bytes = settings.AUDIO_PCM_CACHE_MAX_MB * 1024 * 1024
+
+        entries = []
+        for path in cache_dir.glob('*.wav'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                logger.info(f"Evicted {path.name} from the PCM cache")
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    @contextmanager
+    def transient_dir(media_file):
+        """
+        Scratch directory for files needed only while a job runs (transport
+        chunks, compacted audio); removed with its contents afterwards.
+        """
+        parent = Path(settings.MEDIA_ROOT) / 'temp_processing'
+        parent.mkdir(parents=True, exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix=f"{media_file.id}_", dir=parent)
+        try:
+            yield Path(work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class PlaybackRenditionService:
+    """
+    Service for a browser-friendly playback copy of uploaded videos.
+
+    MP4/MOV files with the moov atom at the end make the player fetch the
+    end of the file before the first frame, and MKV plays poorly in
+    browsers. When the streams are already browser-compatible, the original
+    is remuxed with stream copy (no re-encode) into a fast-start or
+    fragmented MP4 (PLAYBACK_REMUX_MODE), which serve_media_file then serves.
+    """
+
+    # Codecs browsers play from an MP4 container
+    VIDEO_CODECS = {'h264'}
+    AUDIO_CODECS = {'aac', 'mp3', 'opus'}
+
+    @staticmethod
+    def prepare_async(media_file):
+        """Create the playback rendition in the background if it is needed and cheap."""
+        if not PlaybackRenditionService.needs_remux(media_file):
+            return
+
+        thread = threading.Thread(
+            target=PlaybackRenditionService._remux,
+            args=(media_file,)
+        )
+        thread.daemon = True
+        thread.start()
+
+    @staticmethod
+    def needs_remux(media_file):
+        """Whether the original would play better remuxed and can be remuxed without re-encoding."""
+        if not settings.PLAYBACK_REMUX_MODE or media_file.file_type != 'video':
+            return False
+        if media_file.video_codec not in PlaybackRenditionService.VIDEO_CODECS:
+            return False
+        if media_file.audio_codec and media_file.audio_codec not in PlaybackRenditionService.AUDIO_CODECS:
+            return False
+
+        input_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
+        ext = Path(input_path).suffix.lower()
+        if ext in ('.mp4', '.m4v', '.mov'):
+            from .live_extraction import LiveExtractionService
+            return not LiveExtractionService.moov_before_mdat(input_path)
+        return ext == '.mkv'
+
+    @staticmethod
+    def _remux(media_file):
+        input_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
+        output_dir = Path(settings.MEDIA_ROOT) / 'uploads' / 'playback' / str(media_file.user.id) / str(media_file.id)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_path = output_dir / f"{media_file.id}.mp4"
+
+        if settings.PLAYBACK_REMUX_MODE == 'fragmented':
+            movflags = 'frag_keyframe+empty_moov+default_base_moof'
+        else:
+            movflags = '+faststart'
+
+        cmd = [
+            settings.FFMPEG_BINARY,
+            '-i', input_path,
+            '-map', '0:v:0',
+            '-map', '0:a:0?',
+            '-c', 'copy',  # Stream copy: container change only
+            '-movflags', movflags,
+            '-y',
+            str(output_path)
+        ]
+
+        logger.info(f"Remuxing {media_file.id} for playback: {' '.join(cmd)}")
+
+        try:
+            with admission_controller.ffmpeg_slot():
+                # Registered under the media file so deleting it stops the remux
+                result = FFmpegRunner.run(
+                    cmd, media_file=media_file, report_progress=False,
+                    timeout=MediaProbeService.ffmpeg_timeout(media_file.duration_seconds)
+                )
+
+            if result.cancelled:
+                logger.info(f"Playback remux of {media_file.id} cancelled")
+                if output_path.exists():
+                    os.remove(output_path)
+                return
+            if result.returncode != 0:
+                logger.warning(f"Playback remux failed for {media_file.id}, serving the original: {result.stderr}")
+                if output_path.exists():
+                    os.remove(output_path)
+                return
+
+            relative_path = os.path.relpath(output_path, settings.MEDIA_ROOT)
+            # Set on the shared instance too, so later saves by the pipeline keep it
+            media_file.storage_path_playback = relative_path
+            if not MediaFile.objects.filter(id=media_file.id).update(storage_path_playback=relative_path):
+                # Deleted while we were remuxing
+                os.remove(output_path)
+                return
+
+            logger.info(f"Playback rendition ready for {media_file.id}")
+
+        except Exception as e:
+            logger.warning(f"Error remuxing {media_file.id} for playback: {str(e)}")
+            if output_path.exists():
+                os.remove(output_path)
+
+
+class HLSRenditionService:
+    """
+    Service for HLS packaging of long videos.
+
+    The original is cut into HLS_SEGMENT_SECONDS MPEG-TS segments under
+    uploads/hls/<user>/<id>/, stream-copied when the codecs allow it, with
+    an optional re-encoded low-bitrate rendition (HLS_LOW_RENDITION) for
+    slow links. The libx264 encode of that rendition costs as much as another
+    FFmpeg job, so it is only added when a second FFmpeg slot is free. Seeks
+    then fetch one small segment instead of ranging into the original, and
+    because a package is never rewritten the browser can cache its segments
+    indefinitely.
+    """
+
+    # Codecs that can be stream-copied into MPEG-TS segments browsers play
+    VIDEO_CODECS = {'h264'}
+    AUDIO_CODECS = {'aac', 'mp3'}
+
+    MASTER_PLAYLIST = 'master.m3u8'
+
+    @staticmethod
+    def prepare_async(media_file):
+        """Package the video as HLS in the background if it is long enough to benefit."""
+        if not HLSRenditionService.should_package(media_file):
+            return
+
+        thread = threading.Thread(
+            target=HLSRenditionService._package,
+            args=(media_file,)
+        )
+        thread.daemon = True
+        thread.start()
+
+    @staticmethod
+    def should_package(media_file):
+        return (
+            settings.HLS_ENABLED
+            and media_file.file_type == 'video'
+            and media_file.video_codec is not None
+            and (media_file.duration_seconds or 0) >= settings.HLS_MIN_DURATION_SECONDS
+        )
+
+    @staticmethod
+    def output_dir(media_file):
+        return Path(settings.MEDIA_ROOT) / 'uploads' / 'hls' / str(media_file.user.id) / str(media_file.id)
+
+    @staticmethod
+    def package_command(media_file, input_path, output_dir, low_rendition=False):
+        """Single FFmpeg pass writing every rendition, its playlist and the master playlist."""
+        has_audio = bool(media_file.audio_codec)
+        copy_video = media_file.video_codec in HLSRenditionService.VIDEO_CODECS
+        copy_audio = media_file.audio_codec in HLSRenditionService.AUDIO_CODECS
+        segment_seconds = settings.HLS_SEGMENT_SECONDS
+        # Re-encoded renditions get a keyframe at every segment boundary
+        keyframes = f'expr:gte(t,n_forced*{segment_seconds})'
+
+        renditions = 2 if low_rendition else 1
+        cmd = [settings.FFMPEG_BINARY, '-i', str(input_path)]
+        for _ in range(renditions):
+            cmd += ['-map', '0:v:0']
+            if has_audio:
+                cmd += ['-map', '0:a:0']
+
+        if copy_video:
+            cmd += ['-c:v:0', 'copy']
+        else:
+            cmd += ['-c:v:0', 'libx264', '-preset', 'veryfast', '-crf:v:0', '23', '-force_key_frames:v:0', keyframes]
+        if has_audio:
+            cmd += ['-c:a:0', 'copy'] if copy_audio else ['-c:a:0', 'aac', '-b:a:0', '128k']
+
+        if renditions == 2:
+            cmd += [
+                '-c:v:1', 'libx264', '-preset', 'veryfast',
+                '-filter:v:1', 'scale=-2:360',
+                '-b:v:1', f'{settings.HLS_LOW_VIDEO_BITRATE}k',
+                '-maxrate:v:1', f'{settings.HLS_LOW_VIDEO_BITRATE * 3 // 2}k',
+                '-bufsize:v:1', f'{settings.HLS_LOW_VIDEO_BITRATE * 2}k',
+                '-force_key_frames:v:1', keyframes,
+            ]
+            if has_audio:
+                cmd += ['-c:a:1', 'aac', '-b:a:1', f'{settings.HLS_LOW_AUDIO_BITRATE}k', '-ac:a:1', '2']
+
+        stream_map = ' '.join(
+            f'v:{i},a:{i}' if has_audio else f'v:{i}' for i in range(renditions)
+        )
+        cmd += [
+            '-f', 'hls',
+            '-hls_time', str(segment_seconds),
+            '-hls_playlist_type', 'vod',
+            '-hls_segment_filename', str(output_dir / 'v%v' / 'seg_%05d.ts'),
+            '-master_pl_name', HLSRenditionService.MASTER_PLAYLIST,
+            '-var_stream_map', stream_map,
+            '-y',
+            str(output_dir / 'v%v' / 'index.m3u8')
+        ]
+        return cmd
+
+    @staticmethod
+    def _package(media_file):
+        input_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
+        output_dir = HLSRenditionService.output_dir(media_file)
+        # Package next to the final location and rename, so a partial package is never served
+        work_dir = output_dir.with_name(f"{output_dir.name}.partial")
+        shutil.rmtree(work_dir, ignore_errors=True)
+        work_dir.mkdir(parents=True)
+
+        try:
+            with admission_controller.ffmpeg_slot():
+                encode_slots = admission_controller.reserve_free_ffmpeg(1) if settings.HLS_LOW_RENDITION else 0
+                try:
+                    cmd = HLSRenditionService.package_command(
+                        media_file, input_path, work_dir, low_rendition=bool(encode_slots)
+                    )
+                    logger.info(f"Packaging {media_file.id} as HLS: {' '.join(cmd)}")
+                    # Registered under the media file so deleting it stops the packaging
+                    result = FFmpegRunner.run(
+                        cmd, media_file=media_file, report_progress=False,
+                        timeout=MediaProbeService.ffmpeg_timeout(media_file.duration_seconds)
+                    )
+                finally:
+                    admission_controller.release_ffmpeg(encode_slots)
+
+            if result.cancelled:
+                logger.info(f"HLS packaging of {media_file.id} cancelled")
+                shutil.rmtree(work_dir, ignore_errors=True)
+                return
+            if result.returncode != 0:
+                logger.warning(f"HLS packaging failed for {media_file.id}: {result.stderr}")
+                shutil.rmtree(work_dir, ignore_errors=True)
+                return
+
+            shutil.rmtree(output_dir, ignore_errors=True)
+            os.replace(work_dir, output_dir)
+
+            relative_path = os.path.relpath(output_dir / HLSRenditionService.MASTER_PLAYLIST, settings.MEDIA_ROOT)
+            # Set on the shared instance too, so later saves by the pipeline keep it
+            media_file.storage_path_hls = relative_path
+            if not MediaFile.objects.filter(id=media_file.id).update(storage_path_hls=relative_path):
+                # Deleted while we were packaging
+                shutil.rmtree(output_dir, ignore_errors=True)
+                return
+
+            logger.info(f"HLS rendition ready for {media_file.id}")
+
+        except Exception as e:
+            logger.warning(f"Error packaging {media_file.id} as HLS: {str(e)}")
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    @staticmethod
+    def remove(media_file):
+        output_dir = HLSRenditionService.output_dir(media_file)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        shutil.rmtree(output_dir.with_name(f"{output_dir.name}.partial"), ignore_errors=True)
+
+
+class PlaybackAudioService:
+    """
+    Service for the compressed audio-only rendition used for listening.
+
+    The stored 16kHz PCM is about 115 MB per hour; AAC (in an M4A with the
+    moov atom first) or Opus (in WebM) at PLAYBACK_AUDIO_BITRATE is around
+    a twentieth of that. It is encoded from the original rather than the
+    PCM so the listening copy keeps the source's sample rate and stereo.
+    """
+
+    # codec: (extension, content type, encoder args)
+    FORMATS = {
+        'aac': ('m4a', 'audio/mp4', ['-c:a', 'aac', '-movflags', '+faststart']),
+        'opus': ('webm', 'audio/webm', ['-c:a', 'libopus']),
+    }
+
+    @staticmethod
+    def prepare_async(media_file):
+        """Encode the playback audio in the background if it is enabled and the file has audio."""
+        if settings.PLAYBACK_AUDIO_CODEC not in PlaybackAudioService.FORMATS or not media_file.audio_codec:
+            return
+
+        thread = threading.Thread(
+            target=PlaybackAudioService._encode,
+            args=(media_file,)
+        )
+        thread.daemon = True
+        thread.start()
+
+    @staticmethod
+    def content_type(path):
+        extension = Path(path).suffix.lstrip('.').lower()
+        for format_extension, content_type, _ in PlaybackAudioService.FORMATS.values():
+            if extension == format_extension:
+                return content_type
+        return 'application/octet-stream'
+
+    @staticmethod
+    def _encode(media_file):
+        extension, _, codec_args = PlaybackAudioService.FORMATS[settings.PLAYBACK_AUDIO_CODEC]
+        input_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
+        output_dir = Path(settings.MEDIA_ROOT) / 'uploads' / 'playback' / str(media_file.user.id) / str(media_file.id)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_path = output_dir / f"{media_file.id}.audio.{extension}"
+
+        cmd = [
+            settings.FFMPEG_BINARY,
+            '-i', input_path,
+            '-vn',
+            '-map', '0:a:0',
+            *codec_args,
+            '-b:a', f'{settings.PLAYBACK_AUDIO_BITRATE}k',
+            '-ac', str(min(media_file.audio_channels or 1, 2)),
+            '-y',
+            str(output_path)
+        ]
+
+        logger.info(f"Encoding playback audio for {media_file.id}: {' '.join(cmd)}")
+
+        try:
+            with admission_controller.ffmpeg_slot():
+                result = FFmpegRunner.run(cmd, timeout=MediaProbeService.ffmpeg_timeout(media_file.duration_seconds))
+
+            if result.returncode != 0:
+                logger.warning(f"Playback audio encode failed for {media_file.id}: {result.stderr}")
+                if output_path.exists():
+                    os.remove(output_path)
+                return
+
+            relative_path = os.path.relpath(output_path, settings.MEDIA_ROOT)
+            # Set on the shared instance too, so later saves by the pipeline keep it
+            media_file.storage_path_audio_playback = relative_path
+            if not MediaFile.objects.filter(id=media_file.id).update(storage_path_audio_playback=relative_path):
+                # Deleted while we were encoding
+                os.remove(output_path)
+                return
+
+            logger.info(f"Playback audio ready for {media_file.id}")
+
+        except Exception as e:
+            logger.warning(f"Error encoding playback audio for {media_file.id}: {str(e)}")
+            if output_path.exists():
+                os.remove(output_path)
+
+
+class AudioClipService:
+    """
+    Service for short clips of the 16kHz audio, e.g. one transcript segment.
+
+    Clips of a stored WAV are byte ranges of the file behind a freshly built
+    44-byte WAV header, streamed straight from disk. Stored FLAC is
+    seek-decoded by FFmpeg for just the requested span, so a clip never
+    waits for a full decode. Opus clips are encoded on the fly from either.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+    SAMPLE_RATE = 16000
+    SAMPLE_WIDTH = 2
+
+    @staticmethod
+    def wav_header(data_size, sample_rate=16000, channels=1, sample_width=2):
+        """Canonical PCM WAV header for `data_size` bytes of samples."""
+        byte_rate = sample_rate * channels * sample_width
+        return struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', 36 + data_size, b'WAVE',
+            b'fmt ', 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8,
+            b'data', data_size
+        )
+
+    @staticmethod
+    def span(media_file, start, end):
+        """
+        (audio_path, first_sample, sample_count) of the clip from `start` to
+        `end` seconds, clamped to the audio and aligned to whole samples.
+        """
+        audio_path = Path(settings.MEDIA_ROOT) / media_file.storage_path_audio
+        if audio_path.suffix.lower() == '.wav':
+            with wave.open(str(audio_path), 'rb') as wav:
+                total_samples = wav.getnframes()
+        elif media_file.duration_seconds:
+            total_samples = int(media_file.duration_seconds * AudioClipService.SAMPLE_RATE)
+        else:
+            total_samples = None
+
+        first = max(0, int(start * AudioClipService.SAMPLE_RATE))
+        last = max(first, int(round(end * AudioClipService.SAMPLE_RATE)))
+        if total_samples is not None:
+            first = min(total_samples, first)
+            last = min(total_samples, last)
+        return audio_path, first, last - first
+
+    @staticmethod
+    def stream_wav(audio_path, first_sample, sample_count):
+        """
+        Iterator over a WAV header followed by exactly `sample_count` samples
+        from `first_sample`. A stored WAV is opened right away, so the file
+        can be replaced before the response is consumed.
+        """
+        length = sample_count * AudioClipService.SAMPLE_WIDTH
+        if Path(audio_path).suffix.lower() != '.wav':
+            return AudioClipService._stream_decoded_wav(audio_path, first_sample, sample_count)
+
+        f = open(audio_path, 'rb')
+        f.seek(AudioStorageService.pcm_data_offset(audio_path) + first_sample * AudioClipService.SAMPLE_WIDTH)
+
+        def chunks():
+            with f:
+                yield AudioClipService.wav_header(length)
+                remaining = length
+                while remaining > 0:
+                    data = f.read(min(AudioClipService.BLOCK_SIZE, remaining))
+                    if not data:
+                        break
+                    remaining -= len(data)
+                    yield data
+
+        return chunks()
+
+    @staticmethod
+    def _stream_decoded_wav(audio_path, first_sample, sample_count):
+        """Decode only the span of a compressed file, padded or cut to the promised length."""
+        length = sample_count * AudioClipService.SAMPLE_WIDTH
+        yield AudioClipService.wav_header(length)
+
+        remaining = length
+        pcm_args = ['-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1', '-f', 's16le']
+        for data in AudioClipService._ffmpeg_output(audio_path, first_sample, sample_count, pcm_args):
+            data = data[:remaining]
+            remaining -= len(data)
+            if data:
+                yield data
+            if not remaining:
+                break
+        if remaining:
+            yield bytes(remaining)
+
+    @staticmethod
+    def stream_opus(audio_path, first_sample, sample_count):
+        """Yield an Ogg/Opus encoding of the span, produced by FFmpeg as it is read."""
+        opus_args = ['-acodec', 'libopus', '-b:a', f"{settings.AUDIO_CLIP_OPUS_BITRATE}k", '-f', 'ogg']
+        return AudioClipService._ffmpeg_output(audio_path, first_sample, sample_count, opus_args)
+
+    @staticmethod
+    def _ffmpeg_output(audio_path, first_sample, sample_count, output_args):
+        """Yield FFmpeg's stdout for the span of `audio_path`, encoded with `output_args`."""
+        sample_rate = AudioClipService.SAMPLE_RATE
+        cmd = [
+            settings.FFMPEG_BINARY,
+            '-nostats', '-loglevel', 'error',
+            '-ss', f"{first_sample / sample_rate:.6f}",  # Input seeking: only the span is decoded
+            '-i', str(audio_path),
+            '-t', f"{sample_count / sample_rate:.6f}",
+        ] + output_args + [
+            'pipe:1'
+        ]
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            while True:
+                data = process.stdout.read(AudioClipService.BLOCK_SIZE)
+                if not data:
+                    break
+                yield data
+        finally:
+            # Also reached when the client disconnects mid-stream
+            process.kill()
+            process.wait()
+
+    @staticmethod
+    def segment_bounds(media_file, index):
+        """(start, end) of transcript segment `index`, or None if there is no such segment."""
+        transcription = getattr(media_file, 'transcription', None)
+        if transcription is None:
+            return None
+
+        bounds = transcription.segments.filter(index=index).values_list('start', 'end').first()
+        if bounds is not None:
+            return bounds
+
+        # Not indexed yet (see the backfill_transcript_index command)
+        from transcriptions.transcript_store import TranscriptStore
+        segments = (TranscriptStore.raw_output(transcription) or {}).get('segments', [])
+        if not 0 <= index < len(segments):
+            return None
+        return segments[index].get('start'), segments[index].get('end')
+
+
+class ParallelExtractionService:
+    """
+    Service for extracting audio from long videos in parallel time shards.
+
+    The source is split into N time ranges; each range is decoded by its own
+    FFmpeg process using input seeking, so N cores decode at once. Shard
+    boundaries are placed on exact sample indices and each shard's raw PCM is
+    trimmed or padded to its expected length before the shards are joined,
+    so the result lines up sample-for-sample with the single-process output.
+    """
+
+    SAMPLE_RATE = 16000
+    SAMPLE_WIDTH = 2  # 16-bit PCM
+
+    @staticmethod
+    def shard_count(duration_seconds):
+        """Number of shards to use for media of the given duration (1 = don't shard)."""
+        if not duration_seconds or duration_seconds < settings.AUDIO_PARALLEL_EXTRACTION_MIN_SECONDS:
+            return 1
+
+        shards = settings.AUDIO_EXTRACTION_SHARDS or (os.cpu_count() or 1)
+        # Keep every shard at least a minute long
+        return max(1, min(shards, int(duration_seconds // 60)))
+
+    @staticmethod
+    def extract(input_path, output_path, duration_seconds, shards, media_file=None, timeout=3600):
+        """
+        Extract 16kHz mono WAV audio from `input_path` into `output_path`
+        using `shards` concurrent FFmpeg processes. Progress is reported
+        across all shards, and the first shard to fail stops the others.
+
+        Returns an FFmpegResult describing the combined run.
+        """
+        sample_rate = ParallelExtractionService.SAMPLE_RATE
+        total_samples = int(round(duration_seconds * sample_rate))
+        boundaries = [total_samples * i // shards for i in range(shards + 1)]
+        output_path = Path(output_path)
+        progress = ShardProgress(media_file, duration_seconds, shards)
+
+        with tempfile.TemporaryDirectory(prefix='shards_', dir=output_path.parent) as shard_dir:
+            shard_paths = [Path(shard_dir) / f"shard_{i:03d}.pcm" for i in range(shards)]
+            failure = None
+
+            # Each shard is an independent FFmpeg process; threads only wait on them
+            with ThreadPoolExecutor(max_workers=shards) as pool:
+                futures = [
+                    pool.submit(
+                        ParallelExtractionService._extract_shard,
+                        input_path,
+                        shard_paths[i],
+                        boundaries[i],
+                        # The last shard runs to the end so nothing is lost to probe rounding
+                        boundaries[i + 1] if i < shards - 1 else None,
+                        media_file,
+                        timeout,
+                        progress.reporter(i)
+                    )
+                    for i in range(shards)
+                ]
+                for future in as_completed(futures):
+                    result = future.result()
+                    if failure is None and (result.cancelled or result.returncode != 0):
+                        failure = result
+                        progress.stop()
+                        if media_file is not None:
+                            FFmpegRunner.cancel(media_file.id)
+
+            if failure is not None:
+                return FFmpegResult(failure.args, failure.returncode or 1, failure.stderr, cancelled=failure.cancelled)
+
+            ParallelExtractionService._join_shards(shard_paths, boundaries, output_path)
+
+        progress.finish()
+        return FFmpegResult(['parallel-extract', str(input_path)], 0, '')
+
+    @staticmethod
+    def _extract_shard(input_path, shard_path, start_sample, end_sample, media_file, timeout, on_progress=None):
+        sample_rate = ParallelExtractionService.SAMPLE_RATE
+        cmd = [
+            settings.FFMPEG_BINARY,
+            '-ss', f"{start_sample / sample_rate:.6f}",  # Input seeking: skip straight to the shard
+            '-i', str(input_path),
+        ]
+        if end_sample is not None:
+            cmd += ['-t', f"{(end_sample - start_sample) / sample_rate:.6f}"]
+        cmd += [
+            '-vn',
+            '-acodec', 'pcm_s16le',
+            '-ar', str(sample_rate),
+            '-ac', '1',
+            '-f', 's16le',  # Raw PCM, joined into one WAV afterwards
+            '-y',
+            str(shard_path)
+        ]
+
+        logger.debug(f"Extracting shard: {' '.join(cmd)}")
+        return FFmpegRunner.run(cmd, media_file=media_file, timeout=timeout, on_progress=on_progress)
+
+    @staticmethod
+    def _join_shards(shard_paths, boundaries, output_path):
+        """Concatenate raw PCM shards into a WAV, trimming/padding each to its exact length."""
+        width = ParallelExtractionService.SAMPLE_WIDTH
+        block_size = 1024 * 1024
+
+        with wave.open(str(output_path), 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(width)
+            wav.setframerate(ParallelExtractionService.SAMPLE_RATE)
+
+            last = len(shard_paths) - 1
+            for i, shard_path in enumerate(shard_paths):
+                expected = None if i == last else (boundaries[i + 1] - boundaries[i]) * width
+                written = 0
+
+                with open(shard_path, 'rb') as shard:
+                    while expected is None or written < expected:
+                        to_read = block_size if expected is None else min(block_size, expected - written)
+                        data = shard.read(to_read)
+                        if not data:
+                            break
+                        wav.writeframesraw(data)
+                        written += len(data)
+
+                if expected is not None and written < expected:
+                    # Decoder produced slightly fewer samples; keep later shards aligned
+                    wav.writeframesraw(b'\x00' * (expected - written))
+
+
+class ShardProgress:
+    """
+    Combined percent-complete of the shards of a parallel extraction,
+    written to the MediaFile at most FFMPEG_PROGRESS_UPDATES_PER_SECOND
+    times a second. Each shard's reporter returns False once the run is
+    stopped or the MediaFile is gone, which stops that shard's FFmpeg.
+    """
+
+    def __init__(self, media_file, duration_seconds, shards):
+        self.media_file_id = str(media_file.id) if media_file is not None else None
+        self.duration_seconds = duration_seconds
+        self.done = [0.0] * shards
+        self.stopped = False
+        self.lock = threading.Lock()
+        self.last_write = 0.0
+        if self.media_file_id:
+            FFmpegRunner._set_progress(self.media_file_id, 0.0)
+
+    def reporter(self, shard):
+        return lambda seconds: self.update(shard, seconds)
+
+    def update(self, shard, seconds):
+        with self.lock:
+            if self.stopped:
+                return False
+            self.done[shard] = seconds
+            now = time.monotonic()
+            if not self.media_file_id or now - self.last_write < 1.0 / settings.FFMPEG_PROGRESS_UPDATES_PER_SECOND:
+                return True
+            self.last_write = now
+            percent = min(99.9, sum(self.done) / self.duration_seconds * 100)
+
+        if not FFmpegRunner._set_progress(self.media_file_id, round(percent, 1)):
+            self.stop()
+            return False
+        return True
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+
+    def finish(self):
+        if self.media_file_id:
+            FFmpegRunner._set_progress(self.media_file_id, 100.0)
+
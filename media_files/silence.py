@@ -0,0 +1,192 @@
+import wave
+import logging
+from bisect import bisect_right
+from pathlib import Path
+from django.conf import settings
+from .services import AudioStorageService
+
+try:
+    import numpy as np
+except ImportError:  # Compaction is skipped without numpy
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class OffsetMap:
+    """
+    Piecewise-linear map from the compacted timeline back to the original.
+
+    Each kept span is stored as (compacted_start, original_start); a time in
+    the compacted audio is remapped with one binary search.
+    """
+
+    def __init__(self, compacted_starts, original_starts):
+        self.compacted_starts = compacted_starts
+        self.original_starts = original_starts
+
+    def to_original(self, t):
+        i = bisect_right(self.compacted_starts, t) - 1
+        if i < 0:
+            i = 0
+        return self.original_starts[i] + (t - self.compacted_starts[i])
+
+    def remap_result(self, whisperx_output):
+        """Remap segment and word timestamps of a WhisperX result in place."""
+        if not isinstance(whisperx_output, dict):
+            return whisperx_output
+
+        for segment in whisperx_output.get('segments', []):
+            self._remap_item(segment)
+            for word in segment.get('words', []):
+                self._remap_item(word)
+
+        for word in whisperx_output.get('word_segments', []):
+            self._remap_item(word)
+
+        return whisperx_output
+
+    def _remap_item(self, item):
+        if isinstance(item.get('start'), (int, float)):
+            item['start'] = round(self.to_original(item['start']), 3)
+        if isinstance(item.get('end'), (int, float)):
+            # An end exactly on a cut belongs to the span before it
+            end = item['end']
+            i = bisect_right(self.compacted_starts, end) - 1
+            if i > 0 and end == self.compacted_starts[i]:
+                i -= 1
+            i = max(i, 0)
+            item['end'] = round(self.original_starts[i] + (end - self.compacted_starts[i]), 3)
+
+
+class SilenceCompactionService:
+    """
+    Service that removes long non-speech spans from the 16kHz mono WAV
+    before it is sent for transcription.
+
+    Speech is detected per 30ms frame from RMS energy against a threshold
+    adapted to the file's noise floor. Silences longer than
+    SILENCE_COMPACTION_MIN_SILENCE_SECONDS are cut down to a short padding
+    on either side, and an OffsetMap is returned to restore the original
+    timeline in the transcript.
+    """
+
+    FRAME_SECONDS = 0.03
+
+    @staticmethod
+    def compact(audio_path, output_path):
+        """
+        Write a compacted copy of `audio_path` to `output_path`.
+
+        Returns (offset_map, compacted_duration), or None when compaction is
+        disabled, unavailable or would not save enough to be worth it.
+        """
+        if not settings.SILENCE_COMPACTION_ENABLED:
+            return None
+        if np is None:
+            logger.info("numpy is not installed, skipping silence compaction")
+            return None
+
+        with wave.open(str(audio_path), 'rb') as wav_in:
+            params = wav_in.getparams()
+        if params.sampwidth != 2 or params.nchannels != 1:
+            logger.info(f"Silence compaction needs 16-bit mono audio, skipping {audio_path}")
+            return None
+
+        # Memory-map the samples rather than reading the whole file into the heap
+        samples = np.memmap(
+            audio_path, dtype='<i2', mode='r',
+            offset=AudioStorageService.pcm_data_offset(audio_path), shape=(params.nframes,)
+        )
+        sample_rate = params.framerate
+        kept = SilenceCompactionService.speech_spans(samples, sample_rate)
+
+        total = len(samples)
+        kept_samples = sum(end - start for start, end in kept)
+        if not total or not kept_samples:
+            return None
+
+        savings = 1 - kept_samples / total
+        if savings < settings.SILENCE_COMPACTION_MIN_SAVINGS:
+            logger.info(f"Silence compaction would only save {savings:.1%} of {audio_path}, skipping")
+            return None
+
+        compacted_starts = []
+        original_starts = []
+        position = 0
+
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with wave.open(str(output_path), 'wb') as wav_out:
+                wav_out.setnchannels(1)
+                wav_out.setsampwidth(2)
+                wav_out.setframerate(sample_rate)
+                for start, end in kept:
+                    compacted_starts.append(position / sample_rate)
+                    original_starts.append(start / sample_rate)
+                    wav_out.writeframes(samples[start:end].tobytes())
+                    position += end - start
+        except Exception:
+            # Never leave a truncated copy behind for the caller to pick up
+            Path(output_path).unlink(missing_ok=True)
+            raise
+
+        logger.info(
+            f"Compacted {audio_path}: {total / sample_rate:.0f}s -> {kept_samples / sample_rate:.0f}s "
+            f"({savings:.1%} removed, {len(kept)} speech spans kept)"
+        )
+        return OffsetMap(compacted_starts, original_starts), kept_samples / sample_rate
+
+    @staticmethod
+    def speech_spans(samples, sample_rate):
+        """Sample ranges [(start, end)] to keep, in order and non-overlapping."""
+        frame_length = int(sample_rate * SilenceCompactionService.FRAME_SECONDS)
+        frame_count = len(samples) // frame_length
+        if frame_count == 0:
+            return [(0, len(samples))]
+
+        # Frame energies in blocks, so only a block at a time is held as float
+        frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+        rms = np.empty(frame_count, dtype=np.float32)
+        block = 20000  # Frames (10 minutes) per block
+        for i in range(0, frame_count, block):
+            chunk = frames[i:i + block].astype(np.float32)
+            rms[i:i + block] = np.sqrt(np.mean(chunk * chunk, axis=1))
+        db = 20 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+
+        # Adapt to clean recordings, whose silence sits well below the configured
+        # level, but never raise the threshold: on continuous or quiet speech the
+        # quietest frames are speech, and a higher threshold would cut it
+        noise_floor = np.percentile(db, 10)
+        threshold = min(settings.SILENCE_COMPACTION_THRESHOLD_DB, noise_floor + 10)
+        silent = db < threshold
+
+        min_frames = int(settings.SILENCE_COMPACTION_MIN_SILENCE_SECONDS / SilenceCompactionService.FRAME_SECONDS)
+        padding = int(settings.SILENCE_COMPACTION_PADDING_SECONDS * sample_rate)
+
+        # Run boundaries of the silent mask
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], silent.astype(np.int8), [0]))))
+        run_starts, run_ends = edges[::2], edges[1::2]
+
+        cuts = []
+        for run_start, run_end in zip(run_starts, run_ends):
+            if run_end - run_start < min_frames:
+                continue
+            cut_start = run_start * frame_length + padding
+            cut_end = run_end * frame_length - padding
+            if run_start == 0:
+                cut_start = 0
+            if run_end == frame_count:
+                cut_end = len(samples)
+            if cut_end > cut_start:
+                cuts.append((int(cut_start), int(cut_end)))
+
+        kept = []
+        position = 0
+        for cut_start, cut_end in cuts:
+            if cut_start > position:
+                kept.append((position, cut_start))
+            position = cut_end
+        if position < len(samples):
+            kept.append((position, len(samples)))
+        return kept
@@ -0,0 +1,194 @@
+import os
+import uuid
+from urllib.parse import quote
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+BLOCK_SIZE = 64 * 1024
+
+# More ranges than this are answered with the whole file (RFC 9110 allows ignoring Range)
+MAX_RANGES = 16
+
+
+def file_response(request, file_path, content_type, filename=None, disposition='inline'):
+    """
+    Response for a file under MEDIA_ROOT, according to FILE_OFFLOAD_MODE.
+
+    'nginx' returns an empty response with X-Accel-Redirect pointing into
+    FILE_OFFLOAD_INTERNAL_PREFIX, and 'sendfile' one with X-Sendfile holding
+    the absolute path, so the front proxy sends the bytes (including ranges)
+    and the worker is released immediately. Without offload, or for files
+    outside MEDIA_ROOT, Django streams the file itself. So does 'sendfile'
+    for non-ASCII paths: X-Sendfile takes the raw path, which Django would
+    RFC 2047-encode into something Apache and lighttpd cannot resolve.
+    """
+    mode = settings.FILE_OFFLOAD_MODE
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    real_path = os.path.realpath(file_path)
+    offloadable = os.path.commonpath([media_root, real_path]) == media_root
+    if mode == 'sendfile' and not real_path.isascii():
+        offloadable = False
+
+    if mode and offloadable:
+        response = HttpResponse(content_type=content_type)
+        if mode == 'nginx':
+            relative_path = os.path.relpath(real_path, media_root).replace(os.sep, '/')
+            response['X-Accel-Redirect'] = settings.FILE_OFFLOAD_INTERNAL_PREFIX.rstrip('/') + '/' + quote(relative_path)
+        else:
+            response['X-Sendfile'] = real_path
+        if filename:
+            response['Content-Disposition'] = content_disposition_header(disposition == 'attachment', filename)
+        return response
+
+    return ranged_file_response(request, file_path, content_type, filename=filename, disposition=disposition)
+
+
+def ranged_file_response(request, file_path, content_type, filename=None, disposition='inline'):
+    """
+    Serve a file with HTTP range support, streaming it in BLOCK_SIZE pieces.
+
+    Handles single ranges (`bytes=a-b`, `bytes=a-`, suffix `bytes=-n`),
+    multiple ranges as multipart/byteranges, `If-Range` against the ETag or
+    Last-Modified date, and 416 for unsatisfiable ranges. Memory use per
+    request is one block regardless of file or range size.
+    """
+    stat = os.stat(file_path)
+    file_size = stat.st_size
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = http_date(stat.st_mtime)
+
+    ranges = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and _if_range_matches(request, etag, stat.st_mtime):
+        ranges = parse_range_header(range_header, file_size)
+
+    if ranges == []:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{file_size}'
+    elif ranges is None:
+        response = StreamingHttpResponse(_read_ranges(file_path, [(0, file_size - 1)]), content_type=content_type)
+        response['Content-Length'] = str(file_size)
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(_read_ranges(file_path, ranges), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        boundary = uuid.uuid4().hex
+        parts = [
+            (
+                (
+                    f'--{boundary}\r\n'
+                    f'Content-Type: {content_type}\r\n'
+                    f'Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n'
+                ).encode('ascii'),
+                start,
+                end
+            )
+            for start, end in ranges
+        ]
+        closing = f'--{boundary}--\r\n'.encode('ascii')
+        length = sum(len(head) + (end - start + 1) + 2 for head, start, end in parts) + len(closing)
+
+        response = StreamingHttpResponse(
+            _multipart(file_path, parts, closing),
+            status=206,
+            content_type=f'multipart/byteranges; boundary={boundary}'
+        )
+        response['Content-Length'] = str(length)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    if filename:
+        response['Content-Disposition'] = content_disposition_header(disposition == 'attachment', filename)
+    return response
+
+
+def parse_range_header(header, file_size):
+    """
+    Parse a `Range` header into a sorted list of inclusive (start, end) byte
+    ranges with overlaps merged.
+
+    Returns None when the header should be ignored (not bytes, malformed or
+    too many ranges) and [] when no range is satisfiable.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(','):
+        first, dash, last = part.strip().partition('-')
+        if not dash:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else file_size - 1
+                if last and end < start:
+                    return None
+            else:
+                # Suffix range: the last N bytes
+                length = int(last)
+                start = max(0, file_size - length)
+                end = file_size - 1
+                if length == 0:
+                    continue
+        except ValueError:
+            return None
+
+        if start >= file_size:
+            continue
+        ranges.append((start, min(end, file_size - 1)))
+
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    if len(merged) > MAX_RANGES:
+        return None
+    return merged
+
+
+def _if_range_matches(request, etag, mtime):
+    """Whether a Range request may be honoured given its If-Range precondition."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        # Only a strong, exact ETag match validates
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) == since  # Dates must match exactly
+
+
+def _read_ranges(file_path, ranges):
+    with open(file_path, 'rb') as f:
+        for start, end in ranges:
+            yield from _read_span(f, start, end)
+
+
+def _multipart(file_path, parts, closing):
+    with open(file_path, 'rb') as f:
+        for head, start, end in parts:
+            yield head
+            yield from _read_span(f, start, end)
+            yield b'\r\n'
+    yield closing
+
+
+def _read_span(f, start, end):
+    f.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        data = f.read(min(BLOCK_SIZE, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+        yield data
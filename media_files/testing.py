@@ -0,0 +1,57 @@
+import os
+import sys
+import shutil
+import tempfile
+import textwrap
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from .models import MediaFile
+
+
+class MediaTestCase(TestCase):
+    """
+    TestCase with a temporary MEDIA_ROOT, a user, and helpers for media
+    files and the files under MEDIA_ROOT they point at.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = get_user_model().objects.create_user(username='learner', password='secret')
+
+    def create_media_file(self, **fields):
+        """A completed video of the test user, with `fields` overriding the defaults."""
+        values = {
+            'user': self.user,
+            'filename_original': 'lesson.mp4',
+            'filesize_bytes': 1,
+            'file_type': 'video',
+            'mime_type': 'video/mp4',
+            'status': 'completed',
+        }
+        values.update(fields)
+        return MediaFile.objects.create(**values)
+
+    def write_media(self, relative_path, content):
+        """Write `content` to MEDIA_ROOT/relative_path and return the full path."""
+        full_path = os.path.join(self.media_root, relative_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(content)
+        return full_path
+
+    def fake_ffmpeg(self, body):
+        """
+        Path of an executable standing in for FFmpeg in tests of the code that
+        drives it: Python `body`, run with sys and time imported.
+        """
+        path = os.path.join(self.media_root, 'fake_ffmpeg')
+        with open(path, 'w') as f:
+            f.write(f"#!{sys.executable}\nimport sys, time\n{textwrap.dedent(body)}")
+        os.chmod(path, 0o755)
+        return path
+
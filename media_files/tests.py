@@ -1,3 +1,1273 @@
-from django.test import TestCase
+import os
+import time
+import uuid
+import wave
+import struct
+import threading
+import subprocess
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from unittest import skipIf
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from transcriptions.models import Transcription
+from .admission import AdmissionController, admission_controller
+from .ffmpeg import FFmpegRunner
+from .live_extraction import LiveExtractionService
+from .models import ChunkUpload, MediaFile
+from .serializers import MediaFileCreateSerializer
+from .silence import OffsetMap, SilenceCompactionService, np
+from .streaming import MAX_RANGES, parse_range_header
+from .services import (
+    AudioChunkingService, AudioClipService, AudioStorageService, FileUploadService, HLSRenditionService,
+    MediaProbeService, ParallelExtractionService, PlaybackRenditionService, ShardProgress
+)
+from .testing import MediaTestCase
+from .trickplay import TrickplayService
+from .waveform import WaveformService
 
-# Create your tests here.
+
+class FileServingOffloadTests(MediaTestCase):
+    """File-serving views hand the bytes to the front proxy when offload is enabled."""
+
+    def setUp(self):
+        super().setUp()
+        self.content = bytes(range(256)) * 16
+        self.write_media('uploads/original/lesson 1.mp4', self.content)
+        self.media_file = self.create_media_file(
+            filename_original='lesson 1.mp4',
+            filesize_bytes=len(self.content),
+            storage_path_original='uploads/original/lesson 1.mp4',
+        )
+        self.url = reverse('media_files:serve_media_file', args=[self.media_file.id])
+
+    @override_settings(FILE_OFFLOAD_MODE='nginx', FILE_OFFLOAD_INTERNAL_PREFIX='/protected-media/')
+    def test_nginx_mode_returns_accel_redirect(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/uploads/original/lesson%201.mp4')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="lesson 1.mp4"')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(FILE_OFFLOAD_MODE='sendfile')
+    def test_sendfile_mode_returns_absolute_path(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-99')
+
+        # Ranges are left to the proxy
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(os.path.realpath(self.media_root), 'uploads', 'original', 'lesson 1.mp4')
+        )
+        self.assertEqual(response.content, b'')
+
+    @override_settings(FILE_OFFLOAD_MODE='sendfile')
+    def test_sendfile_mode_streams_non_ascii_paths(self):
+        self.write_media('uploads/original/Leçon 1.mp4', self.content)
+        self.media_file.filename_original = 'Leçon 1.mp4'
+        self.media_file.storage_path_original = 'uploads/original/Leçon 1.mp4'
+        self.media_file.save()
+
+        response = self.client.get(self.url)
+
+        self.assertNotIn('X-Sendfile', response)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Disposition'], "inline; filename*=utf-8''Le%C3%A7on%201.mp4")
+
+    def test_uploads_are_stored_under_the_media_file_id(self):
+        upload_id = uuid.uuid4()
+        for chunk_number, data in enumerate((self.content[:1000], self.content[1000:])):
+            FileUploadService.save_chunk(
+                user=self.user, upload_id=upload_id, chunk_number=chunk_number, total_chunks=2,
+                filename='../Leçon 1.MP4', file_type='video', total_size=len(self.content),
+                chunk_file=SimpleUploadedFile('blob', data),
+            )
+
+        media_file = FileUploadService.assemble_chunks(upload_id, self.user)
+
+        self.assertEqual(media_file.filename_original, '../Leçon 1.MP4')
+        self.assertEqual(
+            media_file.storage_path_original,
+            f'uploads/originals/{self.user.id}/{media_file.id}/{media_file.id}.mp4'
+        )
+        with open(os.path.join(self.media_root, media_file.storage_path_original), 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+    @override_settings(FILE_OFFLOAD_MODE='')
+    def test_fallback_streams_file(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Accel-Redirect', response)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    @override_settings(FILE_OFFLOAD_MODE='')
+    def test_fallback_serves_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-16')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes {len(self.content) - 16}-{len(self.content) - 1}/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-16:])
+
+    @override_settings(FILE_OFFLOAD_MODE='')
+    def test_fallback_rejects_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+
+@override_settings(FILE_OFFLOAD_MODE='')
+class RangeRequestTests(MediaTestCase):
+    """Range requests follow RFC 9110: multipart for several ranges, If-Range, malformed headers ignored."""
+
+    def setUp(self):
+        super().setUp()
+        self.content = bytes(range(256)) * 4
+        self.write_media('uploads/original/lesson.mp4', self.content)
+        self.media_file = self.create_media_file(
+            filesize_bytes=len(self.content),
+            storage_path_original='uploads/original/lesson.mp4',
+        )
+        self.url = reverse('media_files:serve_media_file', args=[self.media_file.id])
+
+    def test_multiple_ranges_are_sent_as_multipart(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9, 100-104')
+
+        self.assertEqual(response.status_code, 206)
+        content_type, _, boundary = response['Content-Type'].partition('; boundary=')
+        self.assertEqual(content_type, 'multipart/byteranges')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Length'], str(len(body)))
+        self.assertEqual(body, (
+            f'--{boundary}\r\nContent-Type: video/mp4\r\nContent-Range: bytes 0-9/1024\r\n\r\n'.encode()
+            + self.content[0:10] + b'\r\n'
+            + f'--{boundary}\r\nContent-Type: video/mp4\r\nContent-Range: bytes 100-104/1024\r\n\r\n'.encode()
+            + self.content[100:105] + b'\r\n'
+            + f'--{boundary}--\r\n'.encode()
+        ))
+
+    def test_overlapping_ranges_are_merged(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=50-60, 0-9, 5-20')
+
+        self.assertEqual(parse_range_header('bytes=50-60, 0-9, 5-20', 1024), [(0, 20), (50, 60)])
+        self.assertEqual(parse_range_header('bytes=0-9, 10-19', 1024), [(0, 19)])
+        self.assertEqual(response.status_code, 206)
+
+    def test_if_range_honours_only_a_matching_validator(self):
+        first = self.client.get(self.url)
+        etag, last_modified = first['ETag'], first['Last-Modified']
+
+        for validator in (etag, last_modified):
+            response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=validator)
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(b''.join(response.streaming_content), self.content[:10])
+
+        # A changed file (or a weak ETag) gets the whole body instead of a stale range
+        for validator in ('"0-0"', f'W/{etag}', 'Mon, 01 Jan 2001 00:00:00 GMT'):
+            response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=validator)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_malformed_ranges_are_ignored(self):
+        too_many = 'bytes=' + ', '.join(f'{i * 10}-{i * 10}' for i in range(MAX_RANGES + 1))
+        for header in ('items=0-9', 'bytes=', 'bytes=a-b', 'bytes=9-0', 'bytes=5', too_many):
+            response = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 200, header)
+            self.assertEqual(response['Content-Length'], str(len(self.content)), header)
+
+    def test_parse_range_header_edge_cases(self):
+        self.assertEqual(parse_range_header('bytes=-2000', 1024), [(0, 1023)])
+        self.assertEqual(parse_range_header('bytes=1000-5000', 1024), [(1000, 1023)])
+        self.assertEqual(parse_range_header('bytes=-0', 1024), [])
+        self.assertEqual(parse_range_header('bytes=2000-, 0-1', 1024), [(0, 1)])
+        # Overlapping duplicates count once against MAX_RANGES
+        self.assertEqual(parse_range_header('bytes=' + ', '.join(['3-3'] * (MAX_RANGES + 1)), 1024), [(3, 3)])
+
+
+@override_settings(FILE_OFFLOAD_MODE='')
+class HLSServingTests(MediaTestCase):
+    """The HLS endpoint serves package files with cache lifetimes matching their mutability."""
+
+    def setUp(self):
+        super().setUp()
+        self.master = b'#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1000000\nv0/index.m3u8\n'
+        self.write_media('uploads/hls/1/lesson/master.m3u8', self.master)
+        self.segment = b'\x47' * 188
+        self.write_media('uploads/hls/1/lesson/v0/seg_00000.ts', self.segment)
+        self.write_media('uploads/hls/1/lesson/notes.txt', b'not part of the package')
+
+        self.media_file = self.create_media_file(storage_path_hls='uploads/hls/1/lesson/master.m3u8')
+
+    def url(self, asset):
+        return reverse('media_files:serve_hls', args=[self.media_file.id, asset])
+
+    def test_master_playlist(self):
+        response = self.client.get(self.url('master.m3u8'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.apple.mpegurl')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=3600')
+        self.assertEqual(b''.join(response.streaming_content), self.master)
+
+    def test_segment_is_immutable(self):
+        response = self.client.get(self.url('v0/seg_00000.ts'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'video/mp2t')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+        self.assertEqual(b''.join(response.streaming_content), self.segment)
+
+    def test_rejects_files_outside_the_package_layout(self):
+        self.assertEqual(self.client.get(self.url('notes.txt')).status_code, 404)
+        self.assertEqual(self.client.get(self.url('v0/../master.m3u8')).status_code, 404)
+
+
+@override_settings(FILE_OFFLOAD_MODE='')
+class PlaybackAudioServingTests(MediaTestCase):
+    """The audio endpoint prefers the compressed playback rendition."""
+
+    def setUp(self):
+        super().setUp()
+        self.pcm = b'RIFF' + bytes(1000)
+        self.write_media('uploads/audio/lesson.wav', self.pcm)
+        self.m4a = bytes(range(200))
+        self.write_media('uploads/playback/lesson.audio.m4a', self.m4a)
+
+        self.media_file = self.create_media_file(
+            filename_original='lesson.mp3',
+            file_type='audio',
+            mime_type='audio/mpeg',
+            storage_path_audio='uploads/audio/lesson.wav',
+            storage_path_audio_playback='uploads/playback/lesson.audio.m4a',
+        )
+        self.url = reverse('media_files:serve_audio_file', args=[self.media_file.id])
+
+    def test_serves_rendition_with_ranges_and_long_cache(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Type'], 'audio/mp4')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=2592000')
+        self.assertEqual(b''.join(response.streaming_content), self.m4a[100:])
+
+    def test_pcm_on_request(self):
+        response = self.client.get(self.url, {'rendition': 'pcm'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'audio/wav')
+        self.assertEqual(b''.join(response.streaming_content), self.pcm)
+
+
+@override_settings(FILE_OFFLOAD_MODE='')
+class TrickplayTests(MediaTestCase):
+    """Thumbnail tracks address the right sprite cell and trickplay files are served."""
+
+    def setUp(self):
+        super().setUp()
+        self.poster = b'\xff\xd8poster'
+        self.write_media('uploads/trickplay/lesson/poster.jpg', self.poster)
+        self.media_file = self.create_media_file(storage_path_trickplay='uploads/trickplay/lesson')
+
+    @override_settings(TRICKPLAY_INTERVAL_SECONDS=10, TRICKPLAY_TILE_COLUMNS=2, TRICKPLAY_TILE_ROWS=2)
+    def test_thumbnails_vtt_cells(self):
+        vtt = TrickplayService.thumbnails_vtt(45.5, sheet_count=2, width=160, height=90)
+        cues = [block.split('\n') for block in vtt.strip().split('\n\n')[1:]]
+
+        self.assertEqual(len(cues), 5)
+        self.assertEqual(cues[0], ['00:00:00.000 --> 00:00:10.000', 'sprite_001.jpg#xywh=0,0,160,90'])
+        self.assertEqual(cues[3], ['00:00:30.000 --> 00:00:40.000', 'sprite_001.jpg#xywh=160,90,160,90'])
+        self.assertEqual(cues[4], ['00:00:40.000 --> 00:00:45.500', 'sprite_002.jpg#xywh=0,0,160,90'])
+
+    def test_serves_poster(self):
+        response = self.client.get(reverse('media_files:serve_trickplay', args=[self.media_file.id, 'poster.jpg']))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=2592000')
+        self.assertEqual(b''.join(response.streaming_content), self.poster)
+
+    def test_rejects_unknown_files(self):
+        response = self.client.get(reverse('media_files:serve_trickplay', args=[self.media_file.id, 'other.jpg']))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class SparseFieldsTests(MediaTestCase):
+    """Media endpoints return only the fields named in `?fields=`."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_file = self.create_media_file(media_streams=[{'codec_type': 'video', 'width': 1920, 'height': 1080}])
+
+    def test_list_fields(self):
+        response = self.client.get(reverse('media_files:media_files_list'), {'fields': 'id,status,is_completed'})
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(results, [{'id': str(self.media_file.id), 'status': 'completed', 'is_completed': True}])
+
+    def test_detail_without_fields_is_complete(self):
+        response = self.client.get(reverse('media_files:media_file_detail', args=[self.media_file.id]))
+
+        self.assertEqual(response.data['user']['username'], 'learner')
+        self.assertEqual(response.data['media_streams'][0]['width'], 1920)
+
+
+class AdmissionTests(MediaTestCase):
+    """Uploads get 429s under load and FFmpeg work waits for a slot."""
+
+    def post_chunk(self, upload_id):
+        return self.client.post(reverse('media_files:upload_chunk'), {
+            'upload_id': str(upload_id),
+            'chunk_number': 0,
+            'total_chunks': 2,
+            'filename': 'lesson.mp3',
+            'file_type': 'audio',
+            'total_size': 2048,
+            'chunk_file': SimpleUploadedFile('blob', bytes(1024)),
+        })
+
+    @override_settings(ADMISSION_MAX_QUEUE_DEPTH=0, ADMISSION_RETRY_AFTER_SECONDS=12)
+    def test_new_upload_rejected_with_retry_after(self):
+        response = self.post_chunk(uuid.uuid4())
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '12')
+        self.assertEqual(response.data['retry_after'], 12)
+
+    def test_uploads_in_flight_are_only_refused_for_disk(self):
+        controller = AdmissionController()
+
+        with override_settings(ADMISSION_MAX_QUEUE_DEPTH=0, ADMISSION_MIN_FREE_DISK_MB=0):
+            self.assertEqual(controller.check_upload(1, is_new_upload=True), (False, 'Processing backlog is full'))
+            self.assertEqual(controller.check_upload(1, is_new_upload=False), (True, None))
+        with override_settings(ADMISSION_MIN_FREE_DISK_MB=10 ** 9):
+            self.assertEqual(controller.check_upload(1, is_new_upload=False), (False, 'Not enough free disk space'))
+
+        self.assertEqual(controller.metrics()['counters']['chunks_rejected_disk'], 1)
+
+    @override_settings(ADMISSION_MAX_CONCURRENT_FFMPEG=1, ADMISSION_MIN_FREE_DISK_MB=0)
+    def test_ffmpeg_slot_waits_for_a_free_slot(self):
+        controller = AdmissionController()
+        entered = threading.Event()
+
+        def worker():
+            with controller.ffmpeg_slot():
+                entered.set()
+
+        with controller.ffmpeg_slot():
+            self.assertFalse(controller.try_reserve_ffmpeg())
+            thread = threading.Thread(target=worker)
+            thread.start()
+            self.assertFalse(entered.wait(0.2))
+        self.assertTrue(entered.wait(5))
+        thread.join()
+
+    @override_settings(ADMISSION_MAX_CONCURRENT_FFMPEG=1, ADMISSION_MIN_FREE_DISK_MB=0)
+    def test_reserved_slot_is_reused_by_nested_work(self):
+        controller = AdmissionController()
+        self.assertTrue(controller.try_reserve_ffmpeg())
+
+        with controller.reserved_ffmpeg():
+            with controller.ffmpeg_slot():
+                self.assertEqual(controller.metrics()['ffmpeg_running'], 1)
+        self.assertEqual(controller.metrics()['ffmpeg_running'], 0)
+
+    def test_metrics_are_staff_only(self):
+        url = reverse('media_files:admission_metrics')
+        self.assertIn(self.client.get(url).status_code, (401, 403))
+
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class MediaProbeTests(MediaTestCase):
+    """ffprobe output is recorded on the media file and WAV uploads are recognised."""
+
+    MP4_PROBE = {
+        'format': {'format_name': 'mov,mp4,m4a,3gp,3g2,mj2', 'duration': '754.25'},
+        'streams': [
+            {'index': 0, 'codec_type': 'video', 'codec_name': 'mjpeg', 'disposition': {'attached_pic': 1}},
+            {'index': 1, 'codec_type': 'video', 'codec_name': 'h264', 'width': 1280, 'height': 720},
+            {
+                'index': 2, 'codec_type': 'audio', 'codec_name': 'aac', 'sample_rate': '48000',
+                'channels': 2, 'channel_layout': 'stereo', 'tags': {'language': 'eng'},
+            },
+        ],
+    }
+
+    def test_record_probe(self):
+        media_file = self.create_media_file()
+        MediaProbeService.record_probe(media_file, self.MP4_PROBE)
+
+        self.assertEqual(media_file.duration_seconds, 754.25)
+        self.assertEqual(media_file.container_format, 'mov')
+        self.assertEqual(media_file.video_codec, 'h264')
+        self.assertEqual(
+            (media_file.audio_codec, media_file.audio_sample_rate, media_file.audio_channels),
+            ('aac', 48000, 2)
+        )
+        self.assertEqual(media_file.media_streams[2]['language'], 'eng')
+        self.assertFalse(media_file.is_whisper_ready_pcm)
+
+    def test_whisper_ready_wav(self):
+        media_file = self.create_media_file(filename_original='lesson.wav', file_type='audio', mime_type='audio/wav')
+        MediaProbeService.record_probe(media_file, {
+            'format': {'format_name': 'wav'},
+            'streams': [{
+                'index': 0, 'codec_type': 'audio', 'codec_name': 'pcm_s16le',
+                'sample_rate': '16000', 'channels': 1, 'duration': '12.5',
+            }],
+        })
+
+        self.assertEqual(media_file.duration_seconds, 12.5)
+        self.assertTrue(media_file.is_whisper_ready_pcm)
+
+    def test_wav_mime_aliases(self):
+        for mime_type in ('audio/wav', 'audio/x-wav', 'audio/wave', 'audio/vnd.wave'):
+            serializer = MediaFileCreateSerializer(data={
+                'filename_original': 'lesson.wav', 'filesize_bytes': 1, 'file_type': 'audio',
+                'mime_type': mime_type, 'language_transcription': 'en',
+            })
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            self.assertEqual(serializer.validated_data['mime_type'], 'audio/wav')
+
+    @override_settings(FFMPEG_MIN_TIMEOUT_SECONDS=300, FFMPEG_TIMEOUT_PER_MEDIA_SECOND=2.0)
+    def test_ffmpeg_timeout_scales_with_duration(self):
+        self.assertEqual(MediaProbeService.ffmpeg_timeout(None), 3600)
+        self.assertEqual(MediaProbeService.ffmpeg_timeout(60), 300)
+        self.assertEqual(MediaProbeService.ffmpeg_timeout(3600), 7200)
+
+
+class FFmpegRunnerTests(MediaTestCase):
+    """The runner throttles progress writes, keeps a stderr tail, and stops on cancel, deletion or timeout."""
+
+    @override_settings(FFMPEG_PROGRESS_UPDATES_PER_SECOND=1)
+    def test_progress_is_throttled(self):
+        media_file = self.create_media_file()
+        cmd = [self.fake_ffmpeg('''
+            for step in range(1, 101):
+                print(f"out_time_us={step * 100000}", flush=True)
+        '''), '-i', 'input.mp4', 'output.wav']
+
+        with CaptureQueriesContext(connection) as queries:
+            result = FFmpegRunner.run(cmd, media_file=media_file, duration_seconds=10)
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.args[1:4], ['-nostats', '-progress', 'pipe:1'])
+        # Start, at most a couple of throttled updates, and completion
+        self.assertLessEqual(len(queries), 4)
+        media_file.refresh_from_db()
+        self.assertEqual(media_file.processing_progress, 100.0)
+
+    @override_settings(FFMPEG_STDERR_TAIL_LINES=2)
+    def test_failure_keeps_stderr_tail(self):
+        cmd = [self.fake_ffmpeg('''
+            for line in range(5):
+                print(f"error {line}", file=sys.stderr)
+            sys.exit(1)
+        '''), '-i', 'input.mp4', 'output.wav']
+
+        result = FFmpegRunner.run(cmd)
+
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.stderr, 'error 3\nerror 4')
+
+    def test_cancel(self):
+        media_file = self.create_media_file()
+        cmd = [self.fake_ffmpeg('''
+            print("out_time_us=0", flush=True)
+            time.sleep(30)
+        '''), '-i', 'input.mp4', 'output.wav']
+
+        timer = threading.Timer(0.5, FFmpegRunner.cancel, args=(media_file.id,))
+        timer.start()
+        started = time.monotonic()
+        result = FFmpegRunner.run(cmd, media_file=media_file, duration_seconds=10)
+        timer.join()
+
+        self.assertTrue(result.cancelled)
+        self.assertLess(time.monotonic() - started, 10)
+
+    def test_stops_when_media_file_is_deleted(self):
+        media_file = self.create_media_file()
+        cmd = [self.fake_ffmpeg('''
+            for step in range(100):
+                print(f"out_time_us={step * 100000}", flush=True)
+                time.sleep(0.1)
+        '''), '-i', 'input.mp4', 'output.wav']
+        MediaFile.objects.filter(id=media_file.id).delete()
+
+        result = FFmpegRunner.run(cmd, media_file=media_file, duration_seconds=10)
+
+        self.assertTrue(result.cancelled)
+
+    def test_timeout(self):
+        cmd = [self.fake_ffmpeg('''
+            time.sleep(30)
+        '''), '-i', 'input.mp4', 'output.wav']
+
+        with self.assertRaises(subprocess.TimeoutExpired):
+            FFmpegRunner.run(cmd, timeout=0.5)
+
+
+class ParallelExtractionTests(MediaTestCase):
+    """Shards are joined sample-exactly, report combined progress, and fail fast."""
+
+    # Writes `-t` seconds of 16kHz samples (1s for the last shard), reporting progress as it goes
+    SHARD_FFMPEG = '''
+        args = sys.argv[1:]
+        seconds = float(args[args.index('-t') + 1]) if '-t' in args else 1.0
+        with open(args[-1], 'wb') as f:
+            f.write(b'\\x01\\x00' * int(round(seconds * 16000)))
+        print(f"out_time_us={int(seconds * 1e6)}", flush=True)
+    '''
+
+    def test_join_pads_and_trims_shards(self):
+        shard_dir = os.path.join(self.media_root, 'shards')
+        shards = [(b'\x01\x00' * 3), (b'\x02\x00' * 6), (b'\x03\x00' * 5)]
+        paths = [self.write_media(f'shards/shard_{i}.pcm', data) for i, data in enumerate(shards)]
+        output_path = os.path.join(shard_dir, 'joined.wav')
+
+        ParallelExtractionService._join_shards(paths, [0, 4, 8, 12], output_path)
+
+        with wave.open(output_path, 'rb') as wav:
+            self.assertEqual((wav.getnchannels(), wav.getsampwidth(), wav.getframerate()), (1, 2, 16000))
+            frames = wav.readframes(wav.getnframes())
+        # Short shard padded with silence, long shard trimmed, last shard kept whole
+        self.assertEqual(frames, b'\x01\x00' * 3 + b'\x00\x00' + b'\x02\x00' * 4 + b'\x03\x00' * 5)
+
+    @override_settings(FFMPEG_PROGRESS_UPDATES_PER_SECOND=1000000)
+    def test_progress_is_combined_across_shards(self):
+        media_file = self.create_media_file()
+        progress = ShardProgress(media_file, 120, 2)
+
+        self.assertTrue(progress.update(0, 30))
+        media_file.refresh_from_db()
+        self.assertEqual(media_file.processing_progress, 25.0)
+
+        self.assertTrue(progress.update(1, 30))
+        media_file.refresh_from_db()
+        self.assertEqual(media_file.processing_progress, 50.0)
+
+        progress.stop()
+        self.assertFalse(progress.update(1, 45))
+
+    def test_extract_joins_all_shards(self):
+        output_path = os.path.join(self.media_root, 'lesson.wav')
+
+        with override_settings(FFMPEG_BINARY=self.fake_ffmpeg(self.SHARD_FFMPEG)):
+            result = ParallelExtractionService.extract('lesson.mp4', output_path, 3.0, 3)
+
+        self.assertEqual(result.returncode, 0)
+        with wave.open(output_path, 'rb') as wav:
+            self.assertEqual(wav.getnframes(), 3 * 16000)
+
+    def test_first_failure_stops_other_shards(self):
+        fake = self.fake_ffmpeg('''
+            args = sys.argv[1:]
+            if args[args.index('-ss') + 1] == '0.000000':
+                print("broken input", file=sys.stderr)
+                sys.exit(1)
+            for _ in range(300):
+                print("out_time_us=0", flush=True)
+                time.sleep(0.1)
+        ''')
+
+        started = time.monotonic()
+        with override_settings(FFMPEG_BINARY=fake):
+            result = ParallelExtractionService.extract('lesson.mp4', os.path.join(self.media_root, 'lesson.wav'), 600.0, 3)
+
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.stderr, 'broken input')
+        self.assertLess(time.monotonic() - started, 10)
+
+    @override_settings(ADMISSION_MAX_CONCURRENT_FFMPEG=3, ADMISSION_MIN_FREE_DISK_MB=0)
+    def test_shards_are_capped_by_free_ffmpeg_slots(self):
+        controller = AdmissionController()
+        self.assertTrue(controller.try_reserve_ffmpeg())
+
+        self.assertEqual(controller.reserve_free_ffmpeg(7), 2)
+        self.assertEqual(controller.reserve_free_ffmpeg(7), 0)
+        controller.release_ffmpeg(2)
+        self.assertEqual(controller.metrics()['ffmpeg_running'], 1)
+
+
+@override_settings(ADMISSION_MIN_FREE_DISK_MB=0, LIVE_EXTRACTION_ENABLED=True)
+class LiveExtractionTests(MediaTestCase):
+    """In-order chunks are piped to FFmpeg while the upload is still arriving."""
+
+    def setUp(self):
+        super().setUp()
+        self.upload_id = uuid.uuid4()
+        self.addCleanup(LiveExtractionService.cancel, self.upload_id)
+
+    def save_chunk(self, chunk_number, content, filename='lesson.mkv'):
+        return FileUploadService.save_chunk(
+            user=self.user,
+            upload_id=self.upload_id,
+            chunk_number=chunk_number,
+            total_chunks=3,
+            filename=filename,
+            file_type='video',
+            total_size=3 * len(content),
+            chunk_file=SimpleUploadedFile('blob', content),
+        )
+
+    def mp4(self, *atom_types):
+        return b''.join(struct.pack('>I4s', 16, atom_type) + bytes(8) for atom_type in atom_types)
+
+    def test_chunks_are_fed_in_order_and_survive_cleanup(self):
+        fake = self.fake_ffmpeg('''
+            data = sys.stdin.buffer.read()
+            with open(sys.argv[-1], 'wb') as f:
+                f.write(data)
+        ''')
+
+        with override_settings(FFMPEG_BINARY=fake):
+            first = self.save_chunk(0, b'a' * 10)
+            session = LiveExtractionService.start_if_streamable(self.upload_id, self.user, first)
+            LiveExtractionService.feed(self.upload_id, self.user)
+            self.save_chunk(2, b'c' * 10)
+            LiveExtractionService.feed(self.upload_id, self.user)
+            self.assertEqual(session.next_chunk, 1)
+            self.save_chunk(1, b'b' * 10)
+
+            self.assertIs(LiveExtractionService.take(self.upload_id, self.user), session)
+            FileUploadService._cleanup_chunks(ChunkUpload.objects.filter(upload_id=self.upload_id))
+
+            self.assertTrue(session.wait(10))
+
+        self.assertEqual(session.output_path.read_bytes(), b'a' * 10 + b'b' * 10 + b'c' * 10)
+
+    def test_idle_session_is_aborted(self):
+        fake = self.fake_ffmpeg('''
+            sys.stdin.buffer.read()
+        ''')
+
+        with override_settings(FFMPEG_BINARY=fake, LIVE_EXTRACTION_IDLE_TIMEOUT_SECONDS=0.2):
+            first = self.save_chunk(0, b'a' * 10)
+            session = LiveExtractionService.start_if_streamable(self.upload_id, self.user, first)
+            self.assertIsNotNone(session)
+
+            deadline = time.monotonic() + 5
+            while session.process.poll() is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+        self.assertTrue(session.failed)
+        self.assertIsNone(LiveExtractionService.take(self.upload_id, self.user))
+
+    @override_settings(ADMISSION_MAX_CONCURRENT_FFMPEG=1, LIVE_EXTRACTION_MAX_SESSIONS=1)
+    def test_sessions_have_their_own_limit(self):
+        fake = self.fake_ffmpeg('''
+            sys.stdin.buffer.read()
+        ''')
+        running = admission_controller.metrics()['ffmpeg_running']
+        other_upload_id = uuid.uuid4()
+        self.addCleanup(LiveExtractionService.cancel, other_upload_id)
+
+        with override_settings(FFMPEG_BINARY=fake):
+            first = self.save_chunk(0, b'a' * 10)
+            session = LiveExtractionService.start_if_streamable(self.upload_id, self.user, first)
+            self.assertIsNotNone(session)
+            # An upload in progress leaves the FFmpeg slots to processing jobs
+            self.assertEqual(admission_controller.metrics()['ffmpeg_running'], running)
+
+            self.assertIsNone(LiveExtractionService.start_if_streamable(other_upload_id, self.user, first))
+
+            LiveExtractionService.cancel(self.upload_id)
+            self.assertIsNotNone(LiveExtractionService.start_if_streamable(other_upload_id, self.user, first))
+
+    def test_mp4_streams_only_with_moov_before_mdat(self):
+        faststart = self.write_media('faststart.mp4', self.mp4(b'ftyp', b'moov', b'mdat'))
+        trailing = self.write_media('trailing.mp4', self.mp4(b'ftyp', b'mdat', b'moov'))
+
+        self.assertTrue(LiveExtractionService.is_streamable('lesson.mp4', faststart))
+        self.assertFalse(LiveExtractionService.is_streamable('lesson.mp4', trailing))
+        self.assertFalse(LiveExtractionService.is_streamable('lesson.mp4', self.write_media('empty.mp4', b'')))
+        self.assertTrue(LiveExtractionService.is_streamable('lesson.webm', trailing))
+        self.assertFalse(LiveExtractionService.is_streamable('lesson.avi', faststart))
+
+    def test_moov_after_mdat_falls_back_to_assembled_file(self):
+        first = self.save_chunk(0, self.mp4(b'ftyp', b'mdat', b'moov'), filename='lesson.mp4')
+
+        self.assertIsNone(LiveExtractionService.start_if_streamable(self.upload_id, self.user, first))
+        self.assertIsNone(LiveExtractionService.take(self.upload_id, self.user))
+
+
+class TransportChunkTests(MediaTestCase):
+    """Transcription uploads are encoded compactly and split to stay under the size limit."""
+
+    def setUp(self):
+        super().setUp()
+        self.audio_path = self.write_media('audio/lesson.wav', bytes(3200))
+        self.work_dir = os.path.join(self.media_root, 'work')
+        self.log_path = os.path.join(self.media_root, 'ffmpeg.log')
+        fake = self.fake_ffmpeg(f'''
+            with open({self.log_path!r}, 'a') as log:
+                log.write(' '.join(sys.argv[1:]) + '\\n')
+            with open(sys.argv[-1], 'wb') as f:
+                f.write(b'chunk')
+        ''')
+        settings_override = override_settings(FFMPEG_BINARY=fake)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def ffmpeg_calls(self):
+        if not os.path.exists(self.log_path):
+            return []
+        with open(self.log_path) as log:
+            return [line.split() for line in log]
+
+    def prepare(self, media_file, **kwargs):
+        return AudioChunkingService.prepare_transport_chunks(
+            media_file, self.audio_path, max_size_mb=25, target_chunk_size_mb=15, work_dir=self.work_dir, **kwargs
+        )
+
+    @override_settings(TRANSCRIPTION_TRANSPORT_FORMAT='wav')
+    def test_wav_under_the_limit_is_sent_as_is(self):
+        chunks = self.prepare(self.create_media_file(duration_seconds=0.1))
+
+        self.assertEqual(chunks, [{'path': self.audio_path, 'start': 0.0, 'duration': 0.1}])
+        self.assertEqual(self.ffmpeg_calls(), [])
+
+    @override_settings(TRANSCRIPTION_TRANSPORT_FORMAT='flac')
+    def test_long_audio_is_split_with_input_seeking(self):
+        chunks = self.prepare(self.create_media_file(duration_seconds=2000))
+
+        # 15MB of FLAC at ~21000 bytes/s is 748s per chunk
+        self.assertEqual([(c['start'], c['duration']) for c in chunks], [(0.0, 748), (748.0, 748), (1496.0, 504)])
+        self.assertEqual([os.path.basename(c['path']) for c in chunks], ['chunk_000.flac', 'chunk_001.flac', 'chunk_002.flac'])
+        calls = self.ffmpeg_calls()
+        self.assertEqual([call[call.index('-ss') + 1] for call in calls], ['0.000', '748.000', '1496.000'])
+        self.assertLess(calls[1].index('-ss'), calls[1].index('-i'))
+        self.assertIn('flac', calls[0])
+
+    @override_settings(TRANSCRIPTION_TRANSPORT_FORMAT='copy')
+    def test_copy_transport_uses_the_source_audio_track(self):
+        media_file = self.create_media_file(
+            duration_seconds=60,
+            audio_codec='aac',
+            storage_path_original='uploads/original/lesson.mp4',
+            media_streams=[{'codec_type': 'audio', 'bit_rate': '128000'}],
+        )
+
+        chunks = self.prepare(media_file)
+
+        self.assertEqual(os.path.basename(chunks[0]['path']), 'chunk_000.m4a')
+        call = self.ffmpeg_calls()[0]
+        self.assertEqual(call[call.index('-i') + 1], os.path.join(self.media_root, 'uploads/original/lesson.mp4'))
+        self.assertEqual(call[call.index('-acodec') + 1], 'copy')
+
+    @override_settings(TRANSCRIPTION_TRANSPORT_FORMAT='copy')
+    def test_compacted_audio_is_never_stream_copied(self):
+        media_file = self.create_media_file(
+            duration_seconds=60,
+            audio_codec='aac',
+            storage_path_original='uploads/original/lesson.mp4',
+            media_streams=[{'codec_type': 'audio', 'bit_rate': '128000'}],
+        )
+
+        chunks = self.prepare(media_file, duration_seconds=40)
+
+        self.assertEqual(chunks, [{'path': chunks[0]['path'], 'start': 0.0, 'duration': 40}])
+        self.assertTrue(chunks[0]['path'].endswith('.flac'))
+        call = self.ffmpeg_calls()[0]
+        self.assertEqual(call[call.index('-i') + 1], self.audio_path)
+
+
+@override_settings(
+    SILENCE_COMPACTION_ENABLED=True,
+    SILENCE_COMPACTION_MIN_SILENCE_SECONDS=2.0,
+    SILENCE_COMPACTION_PADDING_SECONDS=0.3,
+    SILENCE_COMPACTION_THRESHOLD_DB=-45.0,
+    SILENCE_COMPACTION_MIN_SAVINGS=0.05,
+)
+@skipIf(np is None, 'numpy is not installed')
+class SilenceCompactionTests(MediaTestCase):
+    """Long silences are cut down to padding and transcript times are mapped back."""
+
+    FRAME = 480  # 30ms at 16kHz
+
+    def speech(self, frames, amplitude=8000):
+        t = np.arange(frames * self.FRAME) / 16000
+        return (np.sin(2 * np.pi * 220 * t) * amplitude).astype('<i2')
+
+    def silence(self, frames):
+        return np.zeros(frames * self.FRAME, dtype='<i2')
+
+    def test_long_silence_is_cut_to_padding(self):
+        samples = np.concatenate([self.speech(33), self.silence(200), self.speech(33)])
+
+        spans = SilenceCompactionService.speech_spans(samples, 16000)
+
+        padding = 4800
+        self.assertEqual(spans, [(0, 33 * self.FRAME + padding), (233 * self.FRAME - padding, len(samples))])
+
+    def test_short_silence_is_kept(self):
+        samples = np.concatenate([self.speech(100), self.silence(50), self.speech(100)])
+
+        self.assertEqual(SilenceCompactionService.speech_spans(samples, 16000), [(0, len(samples))])
+
+    def test_quiet_speech_is_kept(self):
+        # About -41 dB: above the configured threshold, and the quietest part of the recording
+        quiet = self.speech(200, amplitude=400)
+
+        self.assertEqual(SilenceCompactionService.speech_spans(quiet, 16000), [(0, len(quiet))])
+
+        samples = np.concatenate([self.speech(33), quiet, self.speech(33)])
+        self.assertEqual(SilenceCompactionService.speech_spans(samples, 16000), [(0, len(samples))])
+
+    def test_leading_and_trailing_silence_is_cut_entirely(self):
+        samples = np.concatenate([self.silence(200), self.speech(33), self.silence(200)])
+
+        spans = SilenceCompactionService.speech_spans(samples, 16000)
+
+        self.assertEqual(spans, [(200 * self.FRAME - 4800, 233 * self.FRAME + 4800)])
+
+    def test_compact_writes_kept_spans_and_their_offsets(self):
+        samples = np.concatenate([self.speech(33), self.silence(200), self.speech(33)])
+        audio_path = os.path.join(self.media_root, 'lesson.wav')
+        with wave.open(audio_path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(samples.tobytes())
+        output_path = os.path.join(self.media_root, 'work', 'compacted.wav')
+
+        offset_map, duration = SilenceCompactionService.compact(audio_path, output_path)
+
+        kept = 2 * (33 * self.FRAME + 4800)
+        self.assertAlmostEqual(duration, kept / 16000)
+        with wave.open(output_path, 'rb') as wav:
+            self.assertEqual(wav.getnframes(), kept)
+        self.assertEqual(offset_map.compacted_starts, [0.0, 20640 / 16000])
+        self.assertEqual(offset_map.original_starts, [0.0, 107040 / 16000])
+
+
+class OffsetMapTests(TestCase):
+    """Transcript times from compacted audio are mapped back to the original timeline."""
+
+    def test_remap_result_restores_original_times(self):
+        offset_map = OffsetMap([0.0, 10.0], [0.0, 25.0])
+        result = {
+            'segments': [
+                {'start': 8.0, 'end': 10.0, 'words': [{'word': 'a', 'start': 9.5, 'end': 10.0}]},
+                {'start': 10.0, 'end': 12.25, 'words': [{'word': 'b', 'start': 10.0, 'end': 12.25}, {'word': '42'}]},
+            ],
+            'word_segments': [{'word': 'b', 'start': 11.0, 'end': 12.0}],
+        }
+
+        offset_map.remap_result(result)
+
+        first, second = result['segments']
+        # An end exactly on a cut stays in the span before it
+        self.assertEqual((first['start'], first['end']), (8.0, 10.0))
+        self.assertEqual(first['words'][0], {'word': 'a', 'start': 9.5, 'end': 10.0})
+        self.assertEqual((second['start'], second['end']), (25.0, 27.25))
+        self.assertEqual(second['words'], [{'word': 'b', 'start': 25.0, 'end': 27.25}, {'word': '42'}])
+        self.assertEqual(result['word_segments'], [{'word': 'b', 'start': 26.0, 'end': 27.0}])
+        self.assertEqual(offset_map.remap_result('not a result'), 'not a result')
+
+
+@override_settings(ADMISSION_MAX_CONCURRENT_FFMPEG=4)
+class PCMCacheTests(MediaTestCase):
+    """FLAC audio is decoded into an LRU cache, one file at a time per file."""
+
+    def setUp(self):
+        super().setUp()
+        self.log_path = os.path.join(self.media_root, 'ffmpeg.log')
+        fake = self.fake_ffmpeg(f'''
+            import wave
+            source = sys.argv[sys.argv.index('-i') + 1]
+            with open({self.log_path!r}, 'a') as log:
+                log.write(source + '\\n')
+            if 'broken' in source:
+                sys.exit(1)
+            if 'slow' in source:
+                time.sleep(2)
+            with wave.open(sys.argv[-1], 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(16000)
+                wav.writeframes(bytes(3200))
+        ''')
+        settings_override = override_settings(FFMPEG_BINARY=fake)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def flac_file(self, name='lesson'):
+        media_file = self.create_media_file(storage_path_audio=f'uploads/audio/{name}.flac')
+        self.write_media(media_file.storage_path_audio, b'fLaC')
+        return media_file
+
+    def decodes(self):
+        if not os.path.exists(self.log_path):
+            return 0
+        with open(self.log_path) as log:
+            return len(log.readlines())
+
+    def cache_dir_entries(self):
+        return sorted(os.listdir(os.path.join(self.media_root, 'cache', 'pcm')))
+
+    def test_stored_wav_is_used_directly(self):
+        media_file = self.create_media_file(storage_path_audio='uploads/audio/lesson.wav')
+
+        path = AudioStorageService.pcm_path(media_file)
+
+        self.assertEqual(str(path), os.path.join(self.media_root, 'uploads/audio/lesson.wav'))
+        self.assertEqual(self.decodes(), 0)
+
+    def test_flac_is_decoded_once(self):
+        media_file = self.flac_file()
+
+        first = AudioStorageService.pcm_path(media_file)
+        second = AudioStorageService.pcm_path(media_file)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.decodes(), 1)
+        with wave.open(str(first), 'rb') as wav:
+            self.assertEqual(wav.getnframes(), 1600)
+        self.assertEqual(self.cache_dir_entries(), [f'{media_file.id}.wav'])
+
+    def test_failed_decode_leaves_no_partial_file(self):
+        media_file = self.flac_file('broken')
+
+        with self.assertRaises(RuntimeError):
+            AudioStorageService.pcm_path(media_file)
+
+        self.assertEqual(self.cache_dir_entries(), [])
+
+    def test_decodes_of_different_files_do_not_wait_for_each_other(self):
+        slow, quick = self.flac_file('slow'), self.flac_file('quick')
+        thread = threading.Thread(target=AudioStorageService.pcm_path, args=(slow,))
+        thread.start()
+        self.addCleanup(thread.join)
+        time.sleep(0.3)
+
+        started = time.monotonic()
+        AudioStorageService.pcm_path(quick)
+
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertTrue(thread.is_alive())
+
+    @override_settings(AUDIO_PCM_CACHE_MAX_MB=0)
+    def test_least_recently_used_entries_are_evicted(self):
+        older = self.write_media('cache/pcm/older.wav', bytes(100))
+        os.utime(older, (1, 1))
+        media_file = self.flac_file()
+
+        path = AudioStorageService.pcm_path(media_file)
+
+        self.assertFalse(os.path.exists(older))
+        self.assertTrue(path.exists())
+
+
+
+@skipIf(not WaveformService.available(), 'numpy is not installed')
+@override_settings(WAVEFORM_BASE_SAMPLES_PER_PEAK=4, WAVEFORM_MIN_PEAKS=2)
+class WaveformTests(MediaTestCase):
+    """Peaks are stored as halving zoom levels and served one level at a time."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_file = self.create_media_file(storage_path_audio='uploads/audio/lesson.wav')
+        samples = [0, 256, -512, 1024] + [-2560, 0, 0, 2560] + [768, 768, 768, 768] + [-256, -256, 5120, 0]
+        with wave.open(self.write_media(self.media_file.storage_path_audio, b''), 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(struct.pack('<16h', *samples))
+
+    def test_levels_are_stored_finest_first(self):
+        peaks_path = WaveformService.generate(self.media_file)
+
+        with open(peaks_path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(struct.unpack_from('<4sHHIQ', data), (b'WFPK', 1, 2, 16000, 16))
+        header_size = 20 + 2 * 16
+        self.assertEqual(struct.unpack_from('<IIQIIQ', data, 20), (4, 4, header_size, 8, 2, header_size + 8))
+        self.assertEqual(
+            struct.unpack_from('<12b', data, header_size),
+            (-2, 4, -10, 10, 3, 3, -1, 20) + (-10, 10, -1, 20)
+        )
+
+    def test_read_level_picks_the_coarsest_with_enough_peaks(self):
+        peaks_path = WaveformService.generate(self.media_file)
+
+        coarse = WaveformService.read_level(peaks_path, 2)
+        self.assertEqual(struct.unpack('<III4b', coarse), (16000, 8, 2, -10, 10, -1, 20))
+        fine = WaveformService.read_level(peaks_path, 3)
+        self.assertEqual(struct.unpack('<III', fine[:12]), (16000, 4, 4))
+        # More peaks than the finest level has: the finest level
+        self.assertEqual(WaveformService.read_level(peaks_path, 1000), fine)
+
+    def test_halve_keeps_the_extremes_of_an_odd_tail(self):
+        peaks = np.array([[-1, 1], [-3, 2], [0, 5]], dtype=np.int8)
+
+        self.assertEqual(WaveformService._halve(peaks).tolist(), [[-3, 2], [0, 5]])
+
+    def test_missing_peaks_are_generated_in_the_background(self):
+        url = reverse('media_files:serve_waveform', args=[self.media_file.id])
+
+        response = self.client.get(url, {'peaks': 2})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Retry-After'], str(WaveformService.RETRY_AFTER_SECONDS))
+
+        deadline = time.monotonic() + 5
+        while not os.path.exists(WaveformService.peaks_path(self.media_file)) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        response = self.client.get(url, {'peaks': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, WaveformService.read_level(WaveformService.peaks_path(self.media_file), 2))
+
+
+class AudioClipTests(MediaTestCase):
+    """Clips are sample-exact slices of the audio; FLAC is decoded for the span only."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_file = self.create_media_file(storage_path_audio='uploads/audio/lesson.wav', duration_seconds=1.0)
+        self.samples = struct.pack('<16000h', *range(-8000, 8000))
+        with wave.open(self.write_media(self.media_file.storage_path_audio, b''), 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(self.samples)
+        self.url = reverse('media_files:serve_audio_clip', args=[self.media_file.id])
+
+    def test_wav_clip_is_a_byte_range(self):
+        response = self.client.get(self.url, {'start': 0.25, 'end': 0.5})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'audio/wav')
+        self.assertEqual(response['Content-Length'], str(44 + 8000))
+        self.assertEqual(response['Cache-Control'], 'private, max-age=86400')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(body[:44], AudioClipService.wav_header(8000))
+        self.assertEqual(body[44:], self.samples[8000:16000])
+
+    def test_clip_is_clamped_to_the_audio(self):
+        response = self.client.get(self.url, {'start': 0.9, 'end': 1.5})
+
+        body = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Length'], str(44 + 3200))
+        self.assertEqual(body[44:], self.samples[-3200:])
+
+    def test_segment_clip(self):
+        Transcription.objects.create(
+            media_file=self.media_file,
+            raw_whisperx_output={'segments': [{'start': 0.0, 'end': 0.1, 'text': 'a'}, {'start': 0.5, 'end': 0.75, 'text': 'b'}]}
+        )
+
+        response = self.client.get(self.url, {'segment': 1})
+
+        self.assertEqual(b''.join(response.streaming_content)[44:], self.samples[16000:24000])
+        self.assertEqual(self.client.get(self.url, {'segment': 5}).status_code, 404)
+
+    def test_segment_clip_revalidates_against_the_transcript_version(self):
+        transcription = Transcription.objects.create(
+            media_file=self.media_file,
+            raw_whisperx_output={'segments': [{'start': 0.5, 'end': 0.75, 'text': 'a'}]}
+        )
+
+        response = self.client.get(self.url, {'segment': 0})
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, {'segment': 0}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # An edit moves the segment: the cached clip no longer validates
+        Transcription.objects.filter(id=transcription.id).update(version=transcription.version + 1)
+        response = self.client.get(self.url, {'segment': 0}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_invalid_ranges_are_rejected(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': 'a', 'end': 1}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': 0.5, 'end': 0.5}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': 'nan', 'end': 0.5}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': 0, 'end': 'inf'}).status_code, 400)
+        with override_settings(AUDIO_CLIP_MAX_SECONDS=0.1):
+            self.assertEqual(self.client.get(self.url, {'start': 0, 'end': 0.5}).status_code, 400)
+
+    def test_flac_is_seek_decoded_for_the_span(self):
+        log_path = os.path.join(self.media_root, 'ffmpeg.log')
+        fake = self.fake_ffmpeg(f'''
+            with open({log_path!r}, 'w') as log:
+                log.write(' '.join(sys.argv[1:]))
+            sys.stdout.buffer.write(b'\\x01\\x00' * 100)  # Short of the 4000 samples asked for
+        ''')
+        self.media_file.storage_path_audio = 'uploads/audio/lesson.flac'
+        self.media_file.save()
+        self.write_media(self.media_file.storage_path_audio, b'fLaC')
+
+        with override_settings(FFMPEG_BINARY=fake):
+            response = self.client.get(self.url, {'start': 0.25, 'end': 0.5})
+            body = b''.join(response.streaming_content)
+
+        self.assertEqual(response['Content-Length'], str(44 + 8000))
+        self.assertEqual(body[44:], b'\x01\x00' * 100 + bytes(8000 - 200))
+        with open(log_path) as log:
+            args = log.read().split()
+        self.assertEqual(args[args.index('-ss') + 1], '0.250000')
+        self.assertEqual(args[args.index('-t') + 1], '0.250000')
+        self.assertLess(args.index('-ss'), args.index('-i'))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'cache', 'pcm')))
+
+    def test_codec_opus(self):
+        fake = self.fake_ffmpeg('''
+            assert 'libopus' in sys.argv
+            sys.stdout.buffer.write(b'OggS')
+        ''')
+
+        with override_settings(FFMPEG_BINARY=fake):
+            response = self.client.get(self.url, {'start': 0, 'end': 0.5, 'codec': 'opus'})
+            body = b''.join(response.streaming_content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'audio/ogg')
+        self.assertEqual(body, b'OggS')
+
+
+@override_settings(PLAYBACK_REMUX_MODE='faststart', FILE_OFFLOAD_MODE='')
+class PlaybackRenditionTests(MediaTestCase):
+    """Browser-compatible videos that would stream poorly are remuxed, and the remux is preferred."""
+
+    def atoms(self, *atom_types):
+        return b''.join(struct.pack('>I4s', 16, atom_type) + bytes(8) for atom_type in atom_types)
+
+    def video(self, name, content, **fields):
+        self.write_media(f'uploads/original/{name}', content)
+        values = {'video_codec': 'h264', 'audio_codec': 'aac', 'storage_path_original': f'uploads/original/{name}'}
+        values.update(fields)
+        return self.create_media_file(**values)
+
+    def test_needs_remux(self):
+        trailing_moov = self.atoms(b'ftyp', b'mdat', b'moov')
+
+        self.assertTrue(PlaybackRenditionService.needs_remux(self.video('a.mp4', trailing_moov)))
+        self.assertTrue(PlaybackRenditionService.needs_remux(self.video('b.mkv', b'')))
+        self.assertFalse(PlaybackRenditionService.needs_remux(self.video('c.mp4', self.atoms(b'ftyp', b'moov', b'mdat'))))
+        self.assertFalse(PlaybackRenditionService.needs_remux(self.video('d.webm', b'')))
+        # Re-encoding is never done here
+        self.assertFalse(PlaybackRenditionService.needs_remux(self.video('e.mp4', trailing_moov, video_codec='hevc')))
+        self.assertFalse(PlaybackRenditionService.needs_remux(self.video('f.mp4', trailing_moov, audio_codec='pcm_s16le')))
+        self.assertTrue(PlaybackRenditionService.needs_remux(self.video('g.mp4', trailing_moov, audio_codec=None)))
+        self.assertFalse(PlaybackRenditionService.needs_remux(self.video('h.mp4', trailing_moov, file_type='audio')))
+        with override_settings(PLAYBACK_REMUX_MODE=''):
+            self.assertFalse(PlaybackRenditionService.needs_remux(self.video('i.mp4', trailing_moov)))
+
+    def test_playback_rendition_is_served_when_present(self):
+        media_file = self.video('lesson.mkv', b'original', filename_original='lesson.mkv', mime_type='video/x-matroska')
+        url = reverse('media_files:serve_media_file', args=[media_file.id])
+
+        media_file.storage_path_playback = 'uploads/playback/lesson.mp4'
+        media_file.save()
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b'original')
+        self.assertEqual(response['Content-Type'], 'video/x-matroska')
+
+        self.write_media('uploads/playback/lesson.mp4', b'remuxed')
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b'remuxed')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="lesson.mp4"')
+
+    def test_delete_stops_a_running_remux(self):
+        media_file = self.video('lesson.mkv', b'original')
+        fake = self.fake_ffmpeg('''
+            with open(sys.argv[-1], 'wb') as f:
+                f.write(b'partial')
+            for _ in range(300):
+                print("out_time_us=0", flush=True)
+                time.sleep(0.1)
+        ''')
+
+        with override_settings(FFMPEG_BINARY=fake):
+            thread = threading.Thread(target=PlaybackRenditionService._remux, args=(media_file,))
+            thread.start()
+            time.sleep(0.5)
+            response = self.client.delete(reverse('media_files:media_file_detail', args=[media_file.id]))
+            thread.join(timeout=10)
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(thread.is_alive())
+        output_dir = os.path.join(self.media_root, 'uploads', 'playback', str(self.user.id), str(media_file.id))
+        self.assertEqual(os.listdir(output_dir), [])
+
+
+@override_settings(HLS_LOW_RENDITION=True, ADMISSION_MAX_CONCURRENT_FFMPEG=2, ADMISSION_MIN_FREE_DISK_MB=0)
+class HLSPackagingTests(MediaTestCase):
+    """The re-encoded low rendition takes a second FFmpeg slot, and is skipped without one."""
+
+    def setUp(self):
+        super().setUp()
+        self.write_media('uploads/original/lesson.mp4', b'video')
+        self.media_file = self.create_media_file(
+            storage_path_original='uploads/original/lesson.mp4', video_codec='h264', audio_codec='aac'
+        )
+        self.log_path = os.path.join(self.media_root, 'ffmpeg.log')
+        fake = self.fake_ffmpeg(f'''
+            import os
+            with open({self.log_path!r}, 'w') as log:
+                log.write(' '.join(sys.argv[1:]))
+            package_dir = os.path.dirname(os.path.dirname(sys.argv[-1]))
+            with open(os.path.join(package_dir, 'master.m3u8'), 'w') as f:
+                f.write('#EXTM3U\\n')
+        ''')
+        settings_override = override_settings(FFMPEG_BINARY=fake)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def package(self):
+        running = admission_controller.metrics()['ffmpeg_running']
+        HLSRenditionService._package(self.media_file)
+        self.assertEqual(admission_controller.metrics()['ffmpeg_running'], running)
+        self.media_file.refresh_from_db()
+        self.assertTrue(self.media_file.storage_path_hls.endswith('master.m3u8'))
+        with open(self.log_path) as log:
+            return log.read().split()
+
+    def test_low_rendition_with_a_free_slot(self):
+        args = self.package()
+
+        self.assertIn('-c:v:1', args)
+        self.assertEqual(args[args.index('-c:v:1') + 1], 'libx264')
+        self.assertEqual(args[args.index('-c:v:0') + 1], 'copy')
+
+    def test_no_low_rendition_without_a_free_slot(self):
+        self.assertTrue(admission_controller.try_reserve_ffmpeg())
+        try:
+            args = self.package()
+        finally:
+            admission_controller.release_ffmpeg()
+
+        self.assertNotIn('-c:v:1', args)
+        self.assertNotIn('libx264', args)
+        self.assertEqual(args[args.index('-var_stream_map') + 1], 'v:0,a:0')
+
+    def test_cancel_stops_packaging(self):
+        fake = self.fake_ffmpeg('''
+            time.sleep(30)
+        ''')
+
+        with override_settings(FFMPEG_BINARY=fake):
+            thread = threading.Thread(target=HLSRenditionService._package, args=(self.media_file,))
+            thread.start()
+            deadline = time.monotonic() + 5
+            while not FFmpegRunner.cancel(self.media_file.id) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            thread.join(timeout=10)
+
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(HLSRenditionService.output_dir(self.media_file).with_name(f"{self.media_file.id}.partial").exists())
+        self.media_file.refresh_from_db()
+        self.assertFalse(self.media_file.storage_path_hls)
@@ -0,0 +1,151 @@
+import os
+import math
+import shutil
+import logging
+import threading
+from pathlib import Path
+from django.conf import settings
+from .models import MediaFile
+from .admission import admission_controller
+from .ffmpeg import FFmpegRunner
+from .services import MediaProbeService
+
+logger = logging.getLogger(__name__)
+
+POSTER_NAME = 'poster.jpg'
+THUMBNAILS_NAME = 'thumbnails.vtt'
+SPRITE_PATTERN = 'sprite_%03d.jpg'
+
+
+class TrickplayService:
+    """
+    Service for scrubbing previews and poster frames of videos.
+
+    One FFmpeg pass over the keyframes only (`-skip_frame nokey`, so most of
+    the video is never decoded) writes a poster frame and sprite sheets of
+    TRICKPLAY_TILE_COLUMNS x TRICKPLAY_TILE_ROWS thumbnails, one every
+    TRICKPLAY_INTERVAL_SECONDS. A WebVTT track maps each interval to its
+    cell (`sprite_001.jpg#xywh=x,y,w,h`), the convention players use for
+    thumbnail tracks. Files live in uploads/trickplay/<user>/<id>/.
+    """
+
+    @staticmethod
+    def prepare_async(media_file):
+        """Generate the poster and thumbnails in the background for videos."""
+        if not settings.TRICKPLAY_ENABLED or media_file.file_type != 'video' or not media_file.video_codec:
+            return
+
+        thread = threading.Thread(
+            target=TrickplayService.generate,
+            args=(media_file,)
+        )
+        thread.daemon = True
+        thread.start()
+
+    @staticmethod
+    def output_dir(media_file):
+        return Path(settings.MEDIA_ROOT) / 'uploads' / 'trickplay' / str(media_file.user.id) / str(media_file.id)
+
+    @staticmethod
+    def thumbnail_size(media_file):
+        """Thumbnail width and height (even, for the JPEG encoder) keeping the video's aspect ratio."""
+        width = settings.TRICKPLAY_THUMB_WIDTH
+        for stream in media_file.media_streams or []:
+            if stream.get('codec_type') == 'video' and stream.get('width') and stream.get('height'):
+                height = round(width * stream['height'] / stream['width'] / 2) * 2
+                return width, max(height, 2)
+        return width, round(width * 9 / 16 / 2) * 2
+
+    @staticmethod
+    def generate_command(media_file, input_path, output_dir):
+        width, height = TrickplayService.thumbnail_size(media_file)
+        # Skip intros and fades to black
+        poster_time = min((media_file.duration_seconds or 0) * 0.1, 30)
+
+        filter_graph = (
+            '[0:v:0]split=2[poster][thumbs];'
+            f"[poster]select='gte(t,{poster_time:.3f})',scale={settings.TRICKPLAY_POSTER_WIDTH}:-2[p];"
+            f'[thumbs]fps=1/{settings.TRICKPLAY_INTERVAL_SECONDS},scale={width}:{height},'
+            f'tile={settings.TRICKPLAY_TILE_COLUMNS}x{settings.TRICKPLAY_TILE_ROWS}[t]'
+        )
+        return [
+            settings.FFMPEG_BINARY,
+            '-y',
+            '-skip_frame', 'nokey',  # Decode keyframes only
+            '-i', str(input_path),
+            '-filter_complex', filter_graph,
+            '-map', '[p]', '-frames:v', '1', '-q:v', '3',
+            str(output_dir / POSTER_NAME),
+            '-map', '[t]', '-q:v', '5',
+            str(output_dir / SPRITE_PATTERN)
+        ]
+
+    @staticmethod
+    def thumbnails_vtt(duration_seconds, sheet_count, width, height):
+        """WebVTT track pointing each interval at its cell of the sprite sheets."""
+        interval = settings.TRICKPLAY_INTERVAL_SECONDS
+        columns = settings.TRICKPLAY_TILE_COLUMNS
+        per_sheet = columns * settings.TRICKPLAY_TILE_ROWS
+        count = min(math.ceil(duration_seconds / interval), sheet_count * per_sheet)
+
+        lines = ['WEBVTT', '']
+        for i in range(count):
+            start = i * interval
+            end = min(start + interval, duration_seconds)
+            sheet, cell = divmod(i, per_sheet)
+            x = (cell % columns) * width
+            y = (cell // columns) * height
+            lines.append(f"{_vtt_timestamp(start)} --> {_vtt_timestamp(end)}")
+            lines.append(f"{SPRITE_PATTERN % (sheet + 1)}#xywh={x},{y},{width},{height}")
+            lines.append('')
+        return '\n'.join(lines)
+
+    @staticmethod
+    def generate(media_file):
+        input_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
+        output_dir = TrickplayService.output_dir(media_file)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        output_dir.mkdir(parents=True)
+
+        cmd = TrickplayService.generate_command(media_file, input_path, output_dir)
+        logger.info(f"Generating trickplay for {media_file.id}: {' '.join(cmd)}")
+
+        try:
+            with admission_controller.ffmpeg_slot():
+                result = FFmpegRunner.run(cmd, timeout=MediaProbeService.ffmpeg_timeout(media_file.duration_seconds))
+
+            sheet_count = len(list(output_dir.glob('sprite_*.jpg')))
+            if result.returncode != 0 or not sheet_count:
+                logger.warning(f"Trickplay generation failed for {media_file.id}: {result.stderr}")
+                shutil.rmtree(output_dir, ignore_errors=True)
+                return
+
+            width, height = TrickplayService.thumbnail_size(media_file)
+            vtt = TrickplayService.thumbnails_vtt(media_file.duration_seconds or 0, sheet_count, width, height)
+            (output_dir / THUMBNAILS_NAME).write_text(vtt, encoding='utf-8')
+
+            relative_path = os.path.relpath(output_dir, settings.MEDIA_ROOT)
+            # Set on the shared instance too, so later saves by the pipeline keep it
+            media_file.storage_path_trickplay = relative_path
+            if not MediaFile.objects.filter(id=media_file.id).update(storage_path_trickplay=relative_path):
+                # Deleted while we were generating
+                shutil.rmtree(output_dir, ignore_errors=True)
+                return
+
+            logger.info(f"Trickplay ready for {media_file.id}: {sheet_count} sprite sheet(s)")
+
+        except Exception as e:
+            logger.warning(f"Error generating trickplay for {media_file.id}: {str(e)}")
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    @staticmethod
+    def remove(media_file):
+        shutil.rmtree(TrickplayService.output_dir(media_file), ignore_errors=True)
+
+
+def _vtt_timestamp(seconds):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
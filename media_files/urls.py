@@ -10,9 +10,16 @@ urlpatterns = [
     
     # File serving
     path('<uuid:file_id>/serve/', views.serve_media_file, name='serve_media_file'),
+    path('<uuid:file_id>/hls/<path:asset>', views.serve_hls, name='serve_hls'),
+    path('<uuid:file_id>/trickplay/<str:asset>', views.serve_trickplay, name='serve_trickplay'),
     path('<uuid:file_id>/audio/', views.serve_audio_file, name='serve_audio_file'),
+    path('<uuid:file_id>/clip/', views.serve_audio_clip, name='serve_audio_clip'),
+    path('<uuid:file_id>/waveform/', views.serve_waveform, name='serve_waveform'),
     
     # Chunked upload
     path('upload/chunk/', views.upload_chunk, name='upload_chunk'),
     path('upload/<uuid:upload_id>/cancel/', views.cancel_upload, name='cancel_upload'),
+
+    # Monitoring
+    path('admission/metrics/', views.admission_metrics, name='admission_metrics'),
 ]
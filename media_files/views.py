@@ -1,8 +1,12 @@
 import os
+import re
+import math
 import uuid
+import wave
 import logging
+from pathlib import Path
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse, Http404
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.conf import settings
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
@@ -12,12 +16,25 @@ from .models import MediaFile, ChunkUpload
 from .serializers import (
     MediaFileSerializer,
     MediaFileCreateSerializer,
-    ChunkUploadCreateSerializer
+    ChunkUploadCreateSerializer,
+    requested_fields
 )
-from .services import FileUploadService, AudioProcessingService
+from .services import FileUploadService, AudioProcessingService, AudioClipService, PlaybackRenditionService, HLSRenditionService, PlaybackAudioService
+from .admission import admission_controller
+from .ffmpeg import FFmpegRunner
+from .live_extraction import LiveExtractionService
+from .waveform import WaveformService
+from .trickplay import TrickplayService
+from .streaming import file_response
 
 logger = logging.getLogger(__name__)
 
+# Files inside an HLS package: the master playlist, and per-rendition playlists and segments
+HLS_ASSET_PATTERN = re.compile(r'(master\.m3u8|v\d+/index\.m3u8|v\d+/seg_\d+\.ts)')
+
+# Files of the trickplay directory
+TRICKPLAY_ASSET_PATTERN = re.compile(r'(poster\.jpg|sprite_\d+\.jpg|thumbnails\.vtt)')
+
 
 class MediaFilePagination(PageNumberPagination):
     page_size = 20
@@ -35,6 +52,13 @@ def media_files_list(request):
         # For testing without authentication, get all media files
         media_files = MediaFile.objects.all()
 
+        # Only join the owner and load the stream list when they are returned
+        fields = requested_fields(request)
+        if fields is None or 'user' in fields:
+            media_files = media_files.select_related('user')
+        if fields is not None and 'media_streams' not in fields:
+            media_files = media_files.defer('media_streams')
+
         # Filter by status if provided
         status_filter = request.query_params.get('status')
         if status_filter:
@@ -49,10 +73,10 @@ def media_files_list(request):
         page = paginator.paginate_queryset(media_files, request)
 
         if page is not None:
-            serializer = MediaFileSerializer(page, many=True)
+            serializer = MediaFileSerializer(page, many=True, fields=fields)
             return paginator.get_paginated_response(serializer.data)
 
-        serializer = MediaFileSerializer(media_files, many=True)
+        serializer = MediaFileSerializer(media_files, many=True, fields=fields)
         return Response(serializer.data)
 
     elif request.method == 'POST':
@@ -86,10 +110,15 @@ def media_file_detail(request, file_id):
     media_file = get_object_or_404(MediaFile, id=file_id)
 
     if request.method == 'GET':
-        serializer = MediaFileSerializer(media_file)
+        serializer = MediaFileSerializer(media_file, fields=requested_fields(request))
         return Response(serializer.data)
 
     elif request.method == 'DELETE':
+        # Drop any queued transcription job and stop running FFmpeg work
+        from transcriptions.scheduler import transcription_scheduler
+        transcription_scheduler.cancel(media_file.id)
+        FFmpegRunner.cancel(media_file.id)
+
         # Delete associated files
         FileUploadService.cleanup_media_file(media_file)
         media_file.delete()
@@ -117,6 +146,24 @@ def upload_chunk(request):
                 defaults={'email': 'test@example.com'}
             )
 
+            # Apply backpressure before writing anything to disk
+            is_new_upload = not ChunkUpload.objects.filter(
+                upload_id=serializer.validated_data['upload_id'],
+                user=user
+            ).exists()
+            admitted, reason = admission_controller.check_upload(
+                serializer.validated_data['total_size'],
+                is_new_upload
+            )
+            if not admitted:
+                retry_after = settings.ADMISSION_RETRY_AFTER_SECONDS
+                response = Response(
+                    {'error': reason, 'retry_after': retry_after},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS
+                )
+                response['Retry-After'] = str(retry_after)
+                return response
+
             chunk_upload = FileUploadService.save_chunk(
                 user=user,
                 **serializer.validated_data
@@ -126,6 +173,11 @@ def upload_chunk(request):
             upload_id = serializer.validated_data['upload_id']
             total_chunks = serializer.validated_data['total_chunks']
 
+            # Decode in-order chunks while the rest of the upload is arriving
+            if chunk_upload.chunk_number == 0:
+                LiveExtractionService.start_if_streamable(upload_id, user, chunk_upload)
+            LiveExtractionService.feed(upload_id, user)
+
             uploaded_chunks = ChunkUpload.objects.filter(
                 upload_id=upload_id,
                 user=user
@@ -141,6 +193,9 @@ def upload_chunk(request):
 
             # If all chunks uploaded, trigger assembly
             if uploaded_chunks == total_chunks:
+                # Push the last bytes to the live extraction before chunks are cleaned up
+                live_session = LiveExtractionService.take(upload_id, user)
+
                 try:
                     media_file = FileUploadService.assemble_chunks(
                         upload_id=upload_id,
@@ -148,14 +203,18 @@ def upload_chunk(request):
                     )
                     response_data['media_file_id'] = str(media_file.id)
 
-                    # Start audio processing if it's a video file
-                    if media_file.file_type == 'video':
-                        AudioProcessingService.extract_audio_async(media_file)
+                    PlaybackRenditionService.prepare_async(media_file)
+                    HLSRenditionService.prepare_async(media_file)
+                    TrickplayService.prepare_async(media_file)
+
+                    if live_session:
+                        AudioProcessingService.adopt_live_extraction_async(media_file, live_session)
                     else:
-                        # For audio files, convert to required format
-                        AudioProcessingService.convert_audio_async(media_file)
+                        AudioProcessingService.start_processing(media_file)
 
                 except Exception as e:
+                    if live_session:
+                        LiveExtractionService.discard(live_session)
                     logger.error(f"Error assembling chunks: {str(e)}")
                     response_data['assembly_error'] = str(e)
 
@@ -175,7 +234,8 @@ def upload_chunk(request):
 @permission_classes([permissions.AllowAny])  # Temporarily allow any for testing
 def serve_media_file(request, file_id):
     """
-    Serve the original media file for playback.
+    Serve the media file for playback: the fast-start remux when one
+    exists, otherwise the original.
     """
     # For testing without authentication, get any media file with this ID
     media_file = get_object_or_404(MediaFile, id=file_id)
@@ -184,65 +244,114 @@ def serve_media_file(request, file_id):
         raise Http404("Media file not found")
 
     file_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_original)
+    content_type = media_file.mime_type
+    filename = media_file.filename_original
+
+    if media_file.storage_path_playback:
+        playback_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_playback)
+        if os.path.exists(playback_path):
+            file_path = playback_path
+            content_type = 'video/mp4'
+            filename = f"{Path(media_file.filename_original).stem}.mp4"
 
     if not os.path.exists(file_path):
         raise Http404("Media file not found on disk")
 
     try:
-        # Support range requests for video streaming
-        file_size = os.path.getsize(file_path)
-
-        # Check if this is a range request
-        range_header = request.META.get('HTTP_RANGE')
-        if range_header:
-            # Parse range header (e.g., "bytes=0-1023")
-            range_match = range_header.replace('bytes=', '').split('-')
-            start = int(range_match[0]) if range_match[0] else 0
-            end = int(range_match[1]) if range_match[1] else file_size - 1
-
-            # Ensure end doesn't exceed file size
-            end = min(end, file_size - 1)
-            content_length = end - start + 1
-
-            # Create partial content response
-            with open(file_path, 'rb') as f:
-                f.seek(start)
-                data = f.read(content_length)
-
-            from django.http import HttpResponse
-            response = HttpResponse(
-                data,
-                status=206,  # Partial Content
-                content_type=media_file.mime_type
-            )
-            response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
-            response['Accept-Ranges'] = 'bytes'
-            response['Content-Length'] = str(content_length)
-            response['Content-Disposition'] = f'inline; filename="{media_file.filename_original}"'
-            return response
-        else:
-            # Regular full file response
-            response = FileResponse(
-                open(file_path, 'rb'),
-                content_type=media_file.mime_type
-            )
-            response['Accept-Ranges'] = 'bytes'
-            response['Content-Length'] = str(file_size)
-            response['Content-Disposition'] = f'inline; filename="{media_file.filename_original}"'
-            return response
+        # Served by the front proxy when offload is enabled, else streamed in blocks
+        return file_response(request, file_path, content_type, filename=filename)
     except IOError:
         raise Http404("Error reading media file")
 
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])  # Temporarily allow any for testing
+def serve_hls(request, file_id, asset):
+    """
+    Serve a file of the HLS package: `master.m3u8`, then the rendition
+    playlists and segments it references by relative URL.
+    """
+    media_file = get_object_or_404(MediaFile, id=file_id)
+
+    if not media_file.storage_path_hls or not HLS_ASSET_PATTERN.fullmatch(asset):
+        raise Http404("HLS rendition not found")
+
+    package_dir = os.path.dirname(os.path.join(settings.MEDIA_ROOT, media_file.storage_path_hls))
+    file_path = os.path.join(package_dir, asset)
+
+    if not os.path.exists(file_path):
+        raise Http404("HLS file not found on disk")
+
+    if asset.endswith('.ts'):
+        content_type = 'video/mp2t'
+        # Segments are never rewritten, so the browser may keep them for good;
+        # they are a user's media, so shared caches may not
+        cache_control = 'private, max-age=31536000, immutable'
+    else:
+        content_type = 'application/vnd.apple.mpegurl'
+        cache_control = 'private, max-age=3600'
+
+    try:
+        response = file_response(request, file_path, content_type)
+    except IOError:
+        raise Http404("Error reading HLS file")
+    response['Cache-Control'] = cache_control
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])  # Temporarily allow any for testing
+def serve_trickplay(request, file_id, asset):
+    """
+    Serve the poster frame (`poster.jpg`), the WebVTT thumbnails track
+    (`thumbnails.vtt`) or a sprite sheet it references.
+    """
+    media_file = get_object_or_404(MediaFile, id=file_id)
+
+    if not media_file.storage_path_trickplay or not TRICKPLAY_ASSET_PATTERN.fullmatch(asset):
+        raise Http404("Thumbnails not found")
+
+    file_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_trickplay, asset)
+
+    if not os.path.exists(file_path):
+        raise Http404("Thumbnail file not found on disk")
+
+    try:
+        response = file_response(request, file_path, 'text/vtt' if asset.endswith('.vtt') else 'image/jpeg')
+    except IOError:
+        raise Http404("Error reading thumbnail file")
+    # Frames of a user's video: browsers may keep them, shared caches may not
+    response['Cache-Control'] = 'private, max-age=2592000'
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])  # Temporarily allow any for testing
 def serve_audio_file(request, file_id):
     """
-    Serve the extracted/converted audio file.
+    Serve the audio for listening: the compressed playback rendition when
+    one exists, otherwise (or with `?rendition=pcm`) the stored 16kHz audio.
     """
     # For testing without authentication, get any media file with this ID
     media_file = get_object_or_404(MediaFile, id=file_id)
 
+    if media_file.storage_path_audio_playback and request.GET.get('rendition') != 'pcm':
+        file_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_audio_playback)
+        if os.path.exists(file_path):
+            try:
+                response = file_response(
+                    request,
+                    file_path,
+                    PlaybackAudioService.content_type(file_path),
+                    filename=f"audio_{media_file.id}{Path(file_path).suffix}"
+                )
+            except IOError:
+                raise Http404("Error reading audio file")
+            # Written once and never changed; revalidation goes through the ETag.
+            # private: a user's media must not be stored by shared caches
+            response['Cache-Control'] = 'private, max-age=2592000'
+            return response
+
     if not media_file.storage_path_audio:
         raise Http404("Audio file not found")
 
@@ -252,16 +361,145 @@ def serve_audio_file(request, file_id):
         raise Http404("Audio file not found on disk")
 
     try:
-        response = FileResponse(
-            open(file_path, 'rb'),
-            content_type='audio/wav'
+        extension = Path(file_path).suffix.lstrip('.').lower() or 'wav'
+        return file_response(
+            request,
+            file_path,
+            'audio/flac' if extension == 'flac' else 'audio/wav',
+            filename=f"audio_{media_file.id}.{extension}"
         )
-        response['Content-Disposition'] = f'inline; filename="audio_{media_file.id}.wav"'
-        return response
     except IOError:
         raise Http404("Error reading audio file")
 
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])  # Temporarily allow any for testing
+def serve_audio_clip(request, file_id):
+    """
+    Serve the audio of one transcript segment (`?segment=<index>`) or time
+    range (`?start=<s>&end=<s>`) as 16kHz WAV, or Ogg/Opus with `?codec=opus`.
+
+    Segment bounds move when the transcript is edited, so segment clips carry
+    an ETag with the transcription version and are revalidated on every use.
+    """
+    media_file = get_object_or_404(MediaFile, id=file_id)
+
+    if not media_file.storage_path_audio:
+        raise Http404("Audio file not found")
+
+    # `codec`, not `format`: DRF reserves ?format= for content negotiation
+    opus = request.GET.get('codec') == 'opus'
+    etag = None
+    try:
+        if 'segment' in request.GET:
+            index = int(request.GET['segment'])
+            bounds = AudioClipService.segment_bounds(media_file, index)
+            if bounds is None or None in bounds:
+                raise Http404("Segment not found")
+            start, end = bounds
+            etag = f'"{media_file.id}-s{index}-v{media_file.transcription.version}{"-opus" if opus else ""}"'
+        else:
+            start = float(request.GET['start'])
+            end = float(request.GET['end'])
+    except (KeyError, ValueError):
+        return Response(
+            {'error': 'Provide segment, or start and end in seconds'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if not (math.isfinite(start) and math.isfinite(end)) or end <= start or end - start > settings.AUDIO_CLIP_MAX_SECONDS:
+        return Response(
+            {'error': f'Clips must be between 0 and {settings.AUDIO_CLIP_MAX_SECONDS} seconds long'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if etag and etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    try:
+        audio_path, first_sample, sample_count = AudioClipService.span(media_file, start, end)
+        if opus:
+            chunks = AudioClipService.stream_opus(audio_path, first_sample, sample_count)
+        else:
+            chunks = AudioClipService.stream_wav(audio_path, first_sample, sample_count)
+    except (IOError, ValueError, wave.Error) as e:
+        logger.error(f"Error preparing clip for {file_id}: {str(e)}")
+        raise Http404("Error reading audio file")
+
+    if opus:
+        response = StreamingHttpResponse(chunks, content_type='audio/ogg')
+        extension = 'ogg'
+    else:
+        response = StreamingHttpResponse(chunks, content_type='audio/wav')
+        response['Content-Length'] = str(44 + sample_count * AudioClipService.SAMPLE_WIDTH)
+        extension = 'wav'
+
+    response['Content-Disposition'] = f'inline; filename="clip_{media_file.id}_{start:.2f}-{end:.2f}.{extension}"'
+    if etag:
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+    else:
+        response['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])  # Temporarily allow any for testing
+def serve_waveform(request, file_id):
+    """
+    Serve one zoom level of the precomputed waveform peaks.
+
+    `?peaks=N` selects the coarsest level with at least N peaks; the body is
+    a 12-byte header (sample rate, samples per peak, peak count as uint32 LE)
+    followed by int8 min/max pairs. Answers 202 with Retry-After while the
+    peaks of an older file are still being generated.
+    """
+    media_file = get_object_or_404(MediaFile, id=file_id)
+
+    if not media_file.storage_path_audio:
+        raise Http404("Audio file not found")
+
+    try:
+        min_peaks = max(1, int(request.GET.get('peaks', 2000)))
+    except ValueError:
+        return Response(
+            {'error': 'peaks must be an integer'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    peaks_path = WaveformService.peaks_path(media_file)
+    if not os.path.exists(peaks_path):
+        if not WaveformService.available():
+            raise Http404("Waveform not available")
+        # Files processed before waveforms existed are filled in off the request
+        WaveformService.generate_async(media_file)
+        response = Response({'status': 'generating'}, status=status.HTTP_202_ACCEPTED)
+        response['Retry-After'] = str(WaveformService.RETRY_AFTER_SECONDS)
+        return response
+
+    try:
+        data = WaveformService.read_level(peaks_path, min_peaks)
+    except (IOError, ValueError):
+        raise Http404("Error reading waveform")
+
+    response = HttpResponse(data, content_type='application/octet-stream')
+    response['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def admission_metrics(request):
+    """
+    Report admission control load, thresholds and counters (staff only:
+    they describe the worker's disk and queues).
+    """
+    return Response(admission_controller.metrics())
+
+
 @api_view(['DELETE'])
 @permission_classes([permissions.IsAuthenticated])
 def cancel_upload(request, upload_id):
@@ -288,6 +526,9 @@ def cancel_upload(request, upload_id):
             status=status.HTTP_404_NOT_FOUND
         )
 
+    # Stop any extraction that was running alongside the upload
+    LiveExtractionService.cancel(upload_uuid)
+
     # Cleanup chunk files
     for chunk in chunks:
         if chunk.chunk_file and os.path.exists(chunk.chunk_file.path):
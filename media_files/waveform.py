@@ -0,0 +1,180 @@
+import os
+import wave
+import struct
+import logging
+import threading
+from django.conf import settings
+from .services import AudioStorageService
+
+try:
+    import numpy as np
+except ImportError:  # Peaks are not generated without numpy
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Media file ids whose peaks are being generated in the background
+_generating = set()
+_generating_lock = threading.Lock()
+
+# File layout (little-endian):
+#   header:  magic 'WFPK', u16 version, u16 level count, u32 sample rate, u64 total samples
+#   levels:  per level u32 samples per peak, u32 peak count, u64 byte offset of its data
+#   data:    per level int8 (min, max) pairs, finest level first
+MAGIC = b'WFPK'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIQ')
+LEVEL = struct.Struct('<IIQ')
+
+# Header of a single level as served to the client:
+#   u32 sample rate, u32 samples per peak, u32 peak count, then int8 (min, max) pairs
+RESPONSE_HEADER = struct.Struct('<III')
+
+
+class WaveformService:
+    """
+    Service for precomputed waveform overviews.
+
+    Min/max peaks are computed once from the 16kHz PCM (memory-mapped) at
+    WAVEFORM_BASE_SAMPLES_PER_PEAK, and each coarser zoom level halves the
+    previous one, down to about WAVEFORM_MIN_PEAKS peaks. All levels are
+    stored next to the audio as <id>.peaks; a player asks for the level
+    closest to the number of pixels it has to fill.
+    """
+
+    BLOCK_PEAKS = 4096  # Base-level peaks computed per block of the memory map
+    RETRY_AFTER_SECONDS = 5  # Suggested poll interval while peaks are generated on demand
+
+    @staticmethod
+    def peaks_path(media_file):
+        audio_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_audio)
+        return os.path.splitext(audio_path)[0] + '.peaks'
+
+    @staticmethod
+    def generate(media_file):
+        """Compute and store all zoom levels. Returns the peaks path, or None if unavailable."""
+        if np is None:
+            logger.info("numpy is not installed, skipping waveform peaks")
+            return None
+        if not media_file.storage_path_audio:
+            return None
+
+        pcm_path = str(AudioStorageService.pcm_path(media_file))
+        with wave.open(pcm_path, 'rb') as wav:
+            params = wav.getparams()
+        if params.sampwidth != 2 or params.nchannels != 1:
+            logger.info(f"Waveform peaks need 16-bit mono audio, skipping {media_file.id}")
+            return None
+
+        samples = np.memmap(
+            pcm_path, dtype='<i2', mode='r',
+            offset=AudioStorageService.pcm_data_offset(pcm_path), shape=(params.nframes,)
+        )
+
+        levels = [(settings.WAVEFORM_BASE_SAMPLES_PER_PEAK, WaveformService._base_peaks(samples))]
+        while len(levels[-1][1]) >= 2 * settings.WAVEFORM_MIN_PEAKS:
+            samples_per_peak, peaks = levels[-1]
+            levels.append((samples_per_peak * 2, WaveformService._halve(peaks)))
+
+        peaks_path = WaveformService.peaks_path(media_file)
+        partial_path = peaks_path + '.partial'
+        offset = HEADER.size + LEVEL.size * len(levels)
+
+        with open(partial_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(levels), params.framerate, params.nframes))
+            for samples_per_peak, peaks in levels:
+                f.write(LEVEL.pack(samples_per_peak, len(peaks), offset))
+                offset += peaks.nbytes
+            for _, peaks in levels:
+                f.write(peaks.tobytes())
+        os.replace(partial_path, peaks_path)
+
+        logger.info(
+            f"Stored waveform peaks for {media_file.id}: {len(levels)} levels, "
+            f"{os.path.getsize(peaks_path) / 1024:.0f}KB"
+        )
+        return peaks_path
+
+    @staticmethod
+    def available():
+        return np is not None
+
+    @staticmethod
+    def generate_async(media_file):
+        """
+        Generate the peaks in the background, e.g. for files processed before
+        waveforms existed. Does nothing if a generation is already running.
+        """
+        with _generating_lock:
+            if media_file.id in _generating:
+                return
+            _generating.add(media_file.id)
+
+        thread = threading.Thread(
+            target=WaveformService._generate_in_background,
+            args=(media_file,)
+        )
+        thread.daemon = True
+        thread.start()
+
+    @staticmethod
+    def _generate_in_background(media_file):
+        try:
+            WaveformService.generate(media_file)
+        except Exception as e:
+            logger.error(f"Error generating waveform peaks for {media_file.id}: {str(e)}")
+        finally:
+            with _generating_lock:
+                _generating.discard(media_file.id)
+
+    @staticmethod
+    def read_level(peaks_path, min_peaks):
+        """
+        Bytes of the coarsest level with at least `min_peaks` peaks (or the
+        finest level if none has that many), prefixed with RESPONSE_HEADER.
+        """
+        with open(peaks_path, 'rb') as f:
+            magic, version, level_count, sample_rate, _ = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Unsupported waveform file {peaks_path}")
+
+            levels = [LEVEL.unpack(f.read(LEVEL.size)) for _ in range(level_count)]
+            chosen = levels[0]
+            for level in levels:
+                if level[1] >= min_peaks:
+                    chosen = level
+
+            samples_per_peak, peak_count, offset = chosen
+            f.seek(offset)
+            data = f.read(peak_count * 2)
+
+        return RESPONSE_HEADER.pack(sample_rate, samples_per_peak, peak_count) + data
+
+    @staticmethod
+    def _base_peaks(samples):
+        """int8 (min, max) pairs over consecutive windows, computed block by block."""
+        window = settings.WAVEFORM_BASE_SAMPLES_PER_PEAK
+        peak_count = -(-len(samples) // window)
+        peaks = np.empty((peak_count, 2), dtype=np.int8)
+
+        full = len(samples) // window
+        block = WaveformService.BLOCK_PEAKS
+        for start in range(0, full, block):
+            end = min(start + block, full)
+            frames = np.asarray(samples[start * window:end * window]).reshape(end - start, window)
+            peaks[start:end, 0] = frames.min(axis=1) >> 8
+            peaks[start:end, 1] = frames.max(axis=1) >> 8
+
+        if full < peak_count:
+            tail = np.asarray(samples[full * window:])
+            peaks[full] = (tail.min() >> 8, tail.max() >> 8)
+
+        return peaks
+
+    @staticmethod
+    def _halve(peaks):
+        """Merge neighbouring peak pairs into the next zoom level."""
+        if len(peaks) % 2:
+            peaks = np.concatenate((peaks, peaks[-1:]))
+        pairs = peaks.reshape(-1, 2, 2)
+        return np.stack((pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)), axis=1)
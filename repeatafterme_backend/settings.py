@@ -186,6 +186,7 @@ CORS_EXPOSE_HEADERS = [
     'accept-ranges',
     'content-length',
     'content-type',
+    'retry-after',
 ]
 
 # File upload settings
@@ -199,6 +200,94 @@ HUGGINGFACE_ACCESS_TOKEN = config('HUGGINGFACE_ACCESS_TOKEN', default='')
 
 # FFmpeg settings
 FFMPEG_BINARY = config('FFMPEG_BINARY', default='ffmpeg')
+FFPROBE_BINARY = config('FFPROBE_BINARY', default='ffprobe')
+FFMPEG_MIN_TIMEOUT_SECONDS = 300
+FFMPEG_TIMEOUT_PER_MEDIA_SECOND = 0.5  # Used to scale timeouts once duration is known
+FFMPEG_PROGRESS_UPDATES_PER_SECOND = 2  # Throttle for processing_progress writes
+FFMPEG_STDERR_TAIL_LINES = 50  # Lines of FFmpeg stderr kept for error messages
+
+# Parallel (time-sharded) audio extraction for long videos
+AUDIO_EXTRACTION_SHARDS = config('AUDIO_EXTRACTION_SHARDS', default=0, cast=int)  # 0 = one per CPU core
+AUDIO_PARALLEL_EXTRACTION_MIN_SECONDS = config('AUDIO_PARALLEL_EXTRACTION_MIN_SECONDS', default=600, cast=int)
+
+# Extracted audio at rest: 'flac' (lossless, about half the size) or 'wav'
+AUDIO_STORAGE_FORMAT = config('AUDIO_STORAGE_FORMAT', default='flac')
+AUDIO_PCM_CACHE_MAX_MB = config('AUDIO_PCM_CACHE_MAX_MB', default=2048, cast=int)  # Decoded WAVs in MEDIA_ROOT/cache/pcm
+
+# Waveform overview peaks (requires numpy)
+WAVEFORM_BASE_SAMPLES_PER_PEAK = 256  # Finest zoom level: 62.5 peaks per second at 16kHz
+WAVEFORM_MIN_PEAKS = 512  # Coarser levels are added until about this many peaks remain
+
+# Per-segment audio clips
+AUDIO_CLIP_MAX_SECONDS = config('AUDIO_CLIP_MAX_SECONDS', default=300, cast=int)
+AUDIO_CLIP_OPUS_BITRATE = config('AUDIO_CLIP_OPUS_BITRATE', default=32, cast=int)  # kbps, speech
+
+# File serving offload: '' (Django streams files), 'nginx' (X-Accel-Redirect) or 'sendfile' (X-Sendfile)
+FILE_OFFLOAD_MODE = config('FILE_OFFLOAD_MODE', default='')
+FILE_OFFLOAD_INTERNAL_PREFIX = config('FILE_OFFLOAD_INTERNAL_PREFIX', default='/protected-media/')  # nginx internal location aliasing MEDIA_ROOT
+
+# Live extraction: decode streamable uploads while chunks are still arriving
+LIVE_EXTRACTION_ENABLED = config('LIVE_EXTRACTION_ENABLED', default=True, cast=bool)
+LIVE_EXTRACTION_IDLE_TIMEOUT_SECONDS = 600
+# Sessions at once; each holds an FFmpeg process for the whole upload, mostly idle on the network
+LIVE_EXTRACTION_MAX_SESSIONS = config('LIVE_EXTRACTION_MAX_SESSIONS', default=4, cast=int)
+
+# Stream-copy remux of videos into a browser-friendly playback MP4: 'faststart', 'fragmented' or '' (off)
+PLAYBACK_REMUX_MODE = config('PLAYBACK_REMUX_MODE', default='faststart')
+
+# HLS packaging of long videos: segments are immutable and served with long cache lifetimes
+HLS_ENABLED = config('HLS_ENABLED', default=False, cast=bool)
+HLS_MIN_DURATION_SECONDS = config('HLS_MIN_DURATION_SECONDS', default=600, cast=int)  # Shorter videos play fine progressively
+HLS_SEGMENT_SECONDS = 6
+HLS_LOW_RENDITION = config('HLS_LOW_RENDITION', default=False, cast=bool)  # Add a re-encoded 360p rendition for slow links
+HLS_LOW_VIDEO_BITRATE = config('HLS_LOW_VIDEO_BITRATE', default=600, cast=int)  # kbps
+HLS_LOW_AUDIO_BITRATE = config('HLS_LOW_AUDIO_BITRATE', default=64, cast=int)  # kbps
+
+# Audio-only playback rendition served by the audio endpoint: 'aac', 'opus' or '' (off)
+PLAYBACK_AUDIO_CODEC = config('PLAYBACK_AUDIO_CODEC', default='aac')
+PLAYBACK_AUDIO_BITRATE = config('PLAYBACK_AUDIO_BITRATE', default=64, cast=int)  # kbps
+
+# Poster frame and scrubbing thumbnails for videos
+TRICKPLAY_ENABLED = config('TRICKPLAY_ENABLED', default=True, cast=bool)
+TRICKPLAY_INTERVAL_SECONDS = config('TRICKPLAY_INTERVAL_SECONDS', default=10, cast=int)
+TRICKPLAY_THUMB_WIDTH = 160
+TRICKPLAY_TILE_COLUMNS = 10
+TRICKPLAY_TILE_ROWS = 10
+TRICKPLAY_POSTER_WIDTH = 640
+
+# Transcription scheduling
+TRANSCRIPTION_MAX_CONCURRENT_JOBS = config('TRANSCRIPTION_MAX_CONCURRENT_JOBS', default=4, cast=int)
+TRANSCRIPTION_MAX_CONCURRENT_PER_USER = config('TRANSCRIPTION_MAX_CONCURRENT_PER_USER', default=1, cast=int)
+TRANSCRIPTION_DEFAULT_USER_WEIGHT = config('TRANSCRIPTION_DEFAULT_USER_WEIGHT', default=1.0, cast=float)
+TRANSCRIPTION_USER_WEIGHTS = {}  # e.g. {'1': 2.0} to give user 1 twice the share
+TRANSCRIPTION_AGING_RATE = config('TRANSCRIPTION_AGING_RATE', default=1.0, cast=float)  # audio seconds of priority gained per second waited
+TRANSCRIPTION_SECONDS_PER_AUDIO_SECOND = config('TRANSCRIPTION_SECONDS_PER_AUDIO_SECOND', default=0.15, cast=float)
+TRANSCRIPTION_JOB_OVERHEAD_SECONDS = config('TRANSCRIPTION_JOB_OVERHEAD_SECONDS', default=30, cast=int)
+
+# Encoding of the audio uploaded to Replicate: 'wav', 'flac' (lossless, ~half size),
+# 'opus', or 'copy' (stream-copy the source track when it is already compressed)
+TRANSCRIPTION_TRANSPORT_FORMAT = config('TRANSCRIPTION_TRANSPORT_FORMAT', default='flac')
+TRANSCRIPTION_TRANSPORT_OPUS_BITRATE = config('TRANSCRIPTION_TRANSPORT_OPUS_BITRATE', default=96, cast=int)  # kbps
+
+# Keep the raw WhisperX response next to the segment/word tables (cold storage for reprocessing)
+TRANSCRIPTION_STORE_RAW_OUTPUT = config('TRANSCRIPTION_STORE_RAW_OUTPUT', default=True, cast=bool)
+TRANSCRIPTION_RAW_OUTPUT_DB_MAX_BYTES = 1000000  # Larger outputs are written compressed to a file
+TRANSCRIPTION_RAW_OUTPUT_COMPRESSION = config('TRANSCRIPTION_RAW_OUTPUT_COMPRESSION', default='zstd')  # 'zstd' (requires zstandard, else gzip) or 'gzip'
+TRANSCRIPT_WINDOW_MAX_SEGMENTS = 500  # Per request to the windowed segments endpoint
+SUBTITLE_CACHE_MAX_MB = config('SUBTITLE_CACHE_MAX_MB', default=512, cast=int)  # Subtitle formats rendered on request, evicted least recently used first
+
+# Silence compaction before transcription (requires numpy)
+SILENCE_COMPACTION_ENABLED = config('SILENCE_COMPACTION_ENABLED', default=True, cast=bool)
+SILENCE_COMPACTION_MIN_SILENCE_SECONDS = config('SILENCE_COMPACTION_MIN_SILENCE_SECONDS', default=2.0, cast=float)
+SILENCE_COMPACTION_PADDING_SECONDS = config('SILENCE_COMPACTION_PADDING_SECONDS', default=0.3, cast=float)
+SILENCE_COMPACTION_THRESHOLD_DB = config('SILENCE_COMPACTION_THRESHOLD_DB', default=-45.0, cast=float)
+SILENCE_COMPACTION_MIN_SAVINGS = config('SILENCE_COMPACTION_MIN_SAVINGS', default=0.05, cast=float)  # Fraction of duration
+
+# Admission control (backpressure on uploads and audio processing)
+ADMISSION_MAX_QUEUE_DEPTH = config('ADMISSION_MAX_QUEUE_DEPTH', default=50, cast=int)
+ADMISSION_MIN_FREE_DISK_MB = config('ADMISSION_MIN_FREE_DISK_MB', default=2048, cast=int)
+ADMISSION_MAX_CONCURRENT_FFMPEG = config('ADMISSION_MAX_CONCURRENT_FFMPEG', default=2, cast=int)
+ADMISSION_RETRY_AFTER_SECONDS = config('ADMISSION_RETRY_AFTER_SECONDS', default=30, cast=int)
 
 # Logging
 LOGGING = {
@@ -0,0 +1,167 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from django.conf import settings
+from .rendering import SubtitleRenderer, FILENAMES
+from .transcript_store import TranscriptStore
+
+logger = logging.getLogger(__name__)
+
+# Guards the subtitle cache directory (installs, eviction) and _render_locks
+_subtitle_cache_lock = threading.Lock()
+# One lock per (transcription, format) being rendered
+_render_locks = {}
+
+# Formats that do not use word timings, rendered without loading the words
+SEGMENT_ONLY_FORMATS = {'vtt', 'srt'}
+
+# Transcription fields of the files written eagerly before formats were rendered on request
+LEGACY_PATH_FIELDS = {
+    'vtt': 'vtt_file_path',
+    'word_vtt': 'word_level_vtt_file_path',
+    'srt': 'srt_file_path',
+    'txt': 'txt_file_path',
+    'word_timings': 'word_timings_file_path',
+}
+
+
+class SubtitleArtifactCache:
+    """
+    Subtitle formats rendered on first request from the segment and word
+    tables, kept in MEDIA_ROOT/cache/subtitles/<transcription>/v<version>/.
+
+    Edits bump Transcription.version, so a render is never served for a
+    transcript it was not made from; `invalidate` then removes the older
+    versions. The cache is trimmed least-recently-used first to
+    SUBTITLE_CACHE_MAX_MB.
+    """
+
+    @staticmethod
+    def cache_root():
+        return Path(settings.MEDIA_ROOT) / 'cache' / 'subtitles'
+
+    @staticmethod
+    def cache_dir(transcription):
+        return SubtitleArtifactCache.cache_root() / str(transcription.id)
+
+    @staticmethod
+    def path(transcription, file_type):
+        """
+        Path of `file_type` (as in rendering.FILENAMES) for the transcription's
+        current version, rendering it first if needed. None if there is no
+        transcript to render from.
+        """
+        cache_path = SubtitleArtifactCache.cache_dir(transcription) / f"v{transcription.version}" / FILENAMES[file_type]
+        render_key = (transcription.id, file_type)
+
+        with _subtitle_cache_lock:
+            if SubtitleArtifactCache._touch(cache_path):
+                return cache_path
+            render_lock = _render_locks.setdefault(render_key, threading.Lock())
+
+        # Only requests for this render wait on it
+        with render_lock:
+            try:
+                with _subtitle_cache_lock:
+                    if SubtitleArtifactCache._touch(cache_path):
+                        return cache_path
+
+                if not TranscriptStore.ensure_index(transcription):
+                    return None
+
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                # Unique name, skipped by eviction, so neither another worker
+                # process nor a trim can touch it mid-render
+                with tempfile.NamedTemporaryFile(
+                    prefix=f"{cache_path.name}_", suffix='.partial', dir=cache_path.parent, delete=False
+                ) as partial:
+                    partial_path = Path(partial.name)
+                try:
+                    output = TranscriptStore.output(transcription, words=file_type not in SEGMENT_ONLY_FORMATS)
+                    SubtitleRenderer.render(output, {file_type: partial_path})
+                except BaseException:
+                    partial_path.unlink(missing_ok=True)
+                    raise
+
+                with _subtitle_cache_lock:
+                    os.replace(partial_path, cache_path)
+                    SubtitleArtifactCache._trim_cache(keep=cache_path)
+                logger.info(f"Rendered {file_type} v{transcription.version} of transcription {transcription.id}")
+                return cache_path
+            finally:
+                with _subtitle_cache_lock:
+                    _render_locks.pop(render_key, None)
+
+    @staticmethod
+    def invalidate(transcription):
+        """
+        Remove renders of earlier versions and any eagerly written files
+        (their fields are cleared, not saved). Call after bumping the version.
+        """
+        current = f"v{transcription.version}"
+        cache_dir = SubtitleArtifactCache.cache_dir(transcription)
+        with _subtitle_cache_lock:
+            if cache_dir.exists():
+                for version_dir in cache_dir.iterdir():
+                    if version_dir.name != current:
+                        shutil.rmtree(version_dir, ignore_errors=True)
+
+        for field in LEGACY_PATH_FIELDS.values():
+            relative_path = getattr(transcription, field)
+            if relative_path:
+                try:
+                    os.remove(os.path.join(settings.MEDIA_ROOT, relative_path))
+                except FileNotFoundError:
+                    pass
+                setattr(transcription, field, None)
+
+    @staticmethod
+    def remove(transcription):
+        with _subtitle_cache_lock:
+            shutil.rmtree(SubtitleArtifactCache.cache_dir(transcription), ignore_errors=True)
+
+    @staticmethod
+    def _touch(cache_path):
+        """Mark a render as recently used; False if it is not cached."""
+        try:
+            os.utime(cache_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _trim_cache(keep):
+        """Delete least recently used renders until the cache fits its budget."""
+        max_bytes = settings.SUBTITLE_CACHE_MAX_MB * 1024 * 1024
+
+        entries = []
+        for path in SubtitleArtifactCache.cache_root().glob('*/v*/*'):
+            if path.suffix == '.partial':
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                logger.info(f"Evicted {path.parent.parent.name}/{path.parent.name}/{path.name} from the subtitle cache")
+            except FileNotFoundError:
+                continue
+            # Drop emptied version and transcription directories
+            for directory in (path.parent, path.parent.parent):
+                try:
+                    directory.rmdir()
+                except OSError:
+                    break
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from transcriptions.models import Transcription
+from transcriptions.transcript_store import TranscriptStore
+
+
+class Command(BaseCommand):
+    help = 'Build the segment and word tables for transcriptions stored only as raw WhisperX output'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--transcription-id',
+            type=str,
+            help='Backfill a specific transcription ID',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild even if the transcription is already indexed',
+        )
+
+    def handle(self, *args, **options):
+        transcription_id = options.get('transcription_id')
+        force = options.get('force', False)
+
+        if transcription_id:
+            transcriptions = Transcription.objects.filter(id=transcription_id)
+            if not transcriptions.exists():
+                self.stdout.write(
+                    self.style.ERROR(f'Transcription with ID {transcription_id} not found')
+                )
+                return
+        else:
+            transcriptions = Transcription.objects.all()
+
+        total = transcriptions.count()
+        indexed = 0
+        self.stdout.write(f'Found {total} transcriptions to check')
+
+        for i, transcription in enumerate(transcriptions.iterator(), 1):
+            if TranscriptStore.has_index(transcription) and not force:
+                continue
+
+            try:
+                if TranscriptStore.backfill(transcription):
+                    indexed += 1
+                    self.stdout.write(
+                        f'  {i}/{total}: indexed {transcription.segment_count} segments, '
+                        f'{transcription.word_count} words for {transcription.id}'
+                    )
+                else:
+                    self.stdout.write(
+                        self.style.WARNING(f'  {i}/{total}: no raw WhisperX output for {transcription.id}')
+                    )
+            except Exception as e:
+                self.stdout.write(
+                    self.style.ERROR(f'  {i}/{total}: error indexing {transcription.id}: {e}')
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed} transcription(s)')
+        )
@@ -0,0 +1,180 @@
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from transcriptions.rendering import SubtitleRenderer, FILENAMES
+
+WORDS_PER_MINUTE = 150
+WORDS_PER_SEGMENT = 12
+DEFAULT_SIZES = '1000,100000,1000000'
+VOCABULARY = [
+    'the', 'a', 'and', 'to', 'of', 'you', 'it', 'in', 'that', 'we', 'is', 'going',
+    'practice', 'listen', 'repeat', 'sentence', 'today', 'really', 'English', 'question',
+]
+
+def synthetic_transcript(word_total, seed=0):
+    """A WhisperX-shaped output of `word_total` words of speech, with word timings and two speakers."""
+    rng = random.Random(seed)
+    word_seconds = 60 / WORDS_PER_MINUTE
+
+    segments = []
+    time_cursor = 0.0
+    for first_word in range(0, word_total, WORDS_PER_SEGMENT):
+        speaker = f"SPEAKER_{(first_word // (WORDS_PER_SEGMENT * 5)) % 2:02d}"
+        words = []
+        for _ in range(min(WORDS_PER_SEGMENT, word_total - first_word)):
+            duration = word_seconds * rng.uniform(0.6, 0.95)
+            words.append({
+                'word': rng.choice(VOCABULARY),
+                'start': round(time_cursor, 3),
+                'end': round(time_cursor + duration, 3),
+                'score': round(rng.uniform(0.5, 1.0), 3),
+                'speaker': speaker,
+            })
+            time_cursor += word_seconds
+        segments.append({
+            'start': words[0]['start'],
+            'end': words[-1]['end'],
+            'text': ' ' + ' '.join(word['word'] for word in words),
+            'speaker': speaker,
+            'words': words,
+        })
+        # Pause between sentences
+        time_cursor += rng.uniform(0.2, 1.0)
+
+    return {'segments': segments}
+
+
+def render_separately(whisperx_output, directory):
+    """Every format in a pass of its own, as the subtitle cache renders them on request."""
+    for name, filename in FILENAMES.items():
+        SubtitleRenderer.render(whisperx_output, {name: directory / filename})
+
+
+def render_single_pass(whisperx_output, directory):
+    SubtitleRenderer.render(whisperx_output, {name: directory / filename for name, filename in FILENAMES.items()})
+
+
+class Command(BaseCommand):
+    help = (
+        'Time each subtitle format, and all of them in one pass, on synthetic transcripts, '
+        'optionally failing on regressions against saved results'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--words',
+            type=str,
+            default=DEFAULT_SIZES,
+            help=f'Comma-separated transcript sizes in words (default {DEFAULT_SIZES})',
+        )
+        parser.add_argument(
+            '--hours',
+            type=float,
+            help='Benchmark a single transcript of this many hours of speech instead',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per case; the fastest is reported (default 3)',
+        )
+        parser.add_argument(
+            '--save',
+            type=str,
+            help='Write the timings to this JSON file',
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            help='Fail if any case is slower than in this JSON file (from --save) beyond the tolerance',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Allowed slowdown against --compare as a fraction (default 0.25)',
+        )
+
+    def handle(self, *args, **options):
+        if options['hours']:
+            sizes = [int(options['hours'] * 60 * WORDS_PER_MINUTE)]
+        else:
+            try:
+                sizes = [int(size) for size in options['words'].split(',') if size.strip()]
+            except ValueError:
+                raise CommandError(f"Invalid --words: {options['words']}")
+        repeat = max(options['repeat'], 1)
+
+        results = {}
+        for size in sizes:
+            results[str(size)] = self.benchmark(size, repeat)
+
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Saved timings to {options['save']}")
+
+        if options['compare']:
+            self.compare(results, options['compare'], options['tolerance'])
+
+    def benchmark(self, size, repeat):
+        whisperx_output = synthetic_transcript(size)
+        self.stdout.write(f"{size} words ({len(whisperx_output['segments'])} segments):")
+
+        cases = {
+            name: (lambda directory, name=name, filename=filename:
+                   SubtitleRenderer.render(whisperx_output, {name: directory / filename}))
+            for name, filename in FILENAMES.items()
+        }
+        cases['separate'] = lambda directory: render_separately(whisperx_output, directory)
+        cases['single_pass'] = lambda directory: render_single_pass(whisperx_output, directory)
+
+        timings = {}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            directories = {}
+            for name, run in cases.items():
+                directory = Path(temp_dir) / name
+                directory.mkdir()
+                directories[name] = directory
+
+                best = None
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    run(directory)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[name] = best
+                self.stdout.write(f"  {name:<14} {best:9.4f}s  {best / size * 1e6:8.2f} us/word")
+
+            mismatched = [
+                filename for filename in FILENAMES.values()
+                if (directories['separate'] / filename).read_bytes() != (directories['single_pass'] / filename).read_bytes()
+            ]
+
+        self.stdout.write(
+            f"  All formats in one pass take {timings['single_pass'] / timings['separate']:.2f}x "
+            f"the time of rendering them separately"
+        )
+        if mismatched:
+            self.stdout.write(
+                self.style.WARNING(f"  Single-pass output differs from separate renders for: {', '.join(mismatched)}")
+            )
+        return timings
+
+    def compare(self, results, baseline_path, tolerance):
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+        regressions = []
+        for size, timings in results.items():
+            for name, elapsed in timings.items():
+                previous = baseline.get(size, {}).get(name)
+                if previous and elapsed > previous * (1 + tolerance):
+                    regressions.append(f"{name} at {size} words: {previous:.4f}s -> {elapsed:.4f}s")
+
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
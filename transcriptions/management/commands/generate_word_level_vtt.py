@@ -5,6 +5,7 @@ from django.core.management.base import BaseCommand
 from django.conf import settings
 from transcriptions.models import Transcription
 from transcriptions.subtitle_generators import WordLevelVTTGenerator
+from transcriptions.transcript_store import TranscriptStore
 
 
 class Command(BaseCommand):
@@ -62,18 +63,13 @@ class Command(BaseCommand):
         # Get WhisperX output
         whisperx_output = None
         
-        if transcription.raw_whisperx_output:
-            whisperx_output = transcription.raw_whisperx_output
-        elif transcription.raw_whisperx_output_path:
-            try:
-                full_path = os.path.join(settings.MEDIA_ROOT, transcription.raw_whisperx_output_path)
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    whisperx_output = json.load(f)
-            except (IOError, json.JSONDecodeError) as e:
-                self.stdout.write(
-                    self.style.ERROR(f'  Error loading raw output for {transcription.id}: {e}')
-                )
-                return
+        try:
+            whisperx_output = TranscriptStore.raw_output(transcription)
+        except (IOError, json.JSONDecodeError) as e:
+            self.stdout.write(
+                self.style.ERROR(f'  Error loading raw output for {transcription.id}: {e}')
+            )
+            return
 
         if not whisperx_output:
             self.stdout.write(
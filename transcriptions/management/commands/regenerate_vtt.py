@@ -1,11 +1,11 @@
 import os
-import json
 import logging
 from pathlib import Path
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from transcriptions.models import Transcription
 from transcriptions.subtitle_generators import VTTGenerator
+from transcriptions.transcript_store import TranscriptStore
 
 logger = logging.getLogger(__name__)
 
@@ -93,16 +93,15 @@ class Command(BaseCommand):
                 media_dir.mkdir(parents=True, exist_ok=True)
                 vtt_path = media_dir / 'subtitles.vtt'
         elif transcription.raw_whisperx_output_path:
-            # Load from file
-            json_path = Path(settings.MEDIA_ROOT) / transcription.raw_whisperx_output_path
-            if not json_path.exists():
-                raise Exception(f'JSON file not found: {json_path}')
+            # Load from the (compressed) file
+            raw_path = Path(settings.MEDIA_ROOT) / transcription.raw_whisperx_output_path
+            if not raw_path.exists():
+                raise Exception(f'Raw output file not found: {raw_path}')
 
-            with open(json_path, 'r', encoding='utf-8') as f:
-                whisperx_output = json.load(f)
+            whisperx_output = TranscriptStore.raw_output(transcription)
 
-            # VTT file should be in same directory as JSON
-            vtt_path = json_path.parent / 'subtitles.vtt'
+            # VTT file should be in same directory as the raw output
+            vtt_path = raw_path.parent / 'subtitles.vtt'
         else:
             raise Exception('No WhisperX output data found')
 
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcriptions', '0002_transcription_word_level_vtt_file_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('start', models.FloatField()),
+                ('end', models.FloatField()),
+                ('text', models.TextField(blank=True)),
+                ('speaker', models.CharField(blank=True, max_length=50, null=True)),
+                ('transcription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='transcriptions.transcription')),
+            ],
+            options={
+                'ordering': ['transcription', 'index'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TranscriptWord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('word', models.CharField(max_length=255)),
+                ('start', models.FloatField(blank=True, null=True)),
+                ('end', models.FloatField(blank=True, null=True)),
+                ('score', models.FloatField(blank=True, null=True)),
+                ('speaker', models.CharField(blank=True, max_length=50, null=True)),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='words', to='transcriptions.transcriptsegment')),
+                ('transcription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='words', to='transcriptions.transcription')),
+            ],
+            options={
+                'ordering': ['transcription', 'index'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='transcriptsegment',
+            index=models.Index(fields=['transcription', 'start'], name='transcripti_transcr_f44230_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transcriptsegment',
+            index=models.Index(fields=['transcription', 'end'], name='transcripti_transcr_487b36_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='transcriptsegment',
+            constraint=models.UniqueConstraint(fields=('transcription', 'index'), name='unique_segment_index'),
+        ),
+        migrations.AddIndex(
+            model_name='transcriptword',
+            index=models.Index(fields=['transcription', 'start'], name='transcripti_transcr_d31549_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='transcriptword',
+            constraint=models.UniqueConstraint(fields=('transcription', 'index'), name='unique_word_index'),
+        ),
+    ]
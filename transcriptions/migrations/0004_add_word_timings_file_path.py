@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcriptions', '0003_add_segment_and_word_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcription',
+            name='word_timings_file_path',
+            field=models.CharField(blank=True, help_text='Gzip-compressed binary word timings for client-side highlighting', max_length=512, null=True),
+        ),
+    ]
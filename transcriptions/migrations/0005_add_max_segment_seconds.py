@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcriptions', '0004_add_word_timings_file_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcription',
+            name='max_segment_seconds',
+            field=models.FloatField(blank=True, help_text='Longest segment, bounding time lookups to an index range scan', null=True),
+        ),
+    ]
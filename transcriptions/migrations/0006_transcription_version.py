@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcriptions', '0005_add_max_segment_seconds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcription',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Incremented on every edit; keys the rendered subtitle cache'),
+        ),
+    ]
@@ -26,6 +26,12 @@ class Transcription(models.Model):
     word_level_vtt_file_path = models.CharField(max_length=512, null=True, blank=True)
     srt_file_path = models.CharField(max_length=512, null=True, blank=True)
     txt_file_path = models.CharField(max_length=512, null=True, blank=True)
+    word_timings_file_path = models.CharField(
+        max_length=512,
+        null=True,
+        blank=True,
+        help_text="Gzip-compressed binary word timings for client-side highlighting"
+    )
 
     # Raw WhisperX output storage
     raw_whisperx_output_path = models.CharField(
@@ -46,6 +52,15 @@ class Transcription(models.Model):
     word_count = models.IntegerField(null=True, blank=True)
     segment_count = models.IntegerField(null=True, blank=True)
     speaker_count = models.IntegerField(null=True, blank=True)
+    version = models.PositiveIntegerField(
+        default=1,
+        help_text="Incremented on every edit; keys the rendered subtitle cache"
+    )
+    max_segment_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Longest segment, bounding time lookups to an index range scan"
+    )
 
     class Meta:
         indexes = [
@@ -58,25 +73,97 @@ class Transcription(models.Model):
 
     @property
     def has_vtt(self):
-        """Check if VTT file exists."""
-        return bool(self.vtt_file_path)
+        """Check if VTT subtitles are available (rendered on request from the segments)."""
+        return bool(self.vtt_file_path) or self.segment_count is not None
 
     @property
     def has_word_level_vtt(self):
-        """Check if word-level VTT file exists."""
-        return bool(self.word_level_vtt_file_path)
+        """Check if word-level VTT subtitles are available."""
+        return bool(self.word_level_vtt_file_path) or self.segment_count is not None
 
     @property
     def has_srt(self):
-        """Check if SRT file exists."""
-        return bool(self.srt_file_path)
+        """Check if SRT subtitles are available."""
+        return bool(self.srt_file_path) or self.segment_count is not None
 
     @property
     def has_txt(self):
-        """Check if TXT file exists."""
-        return bool(self.txt_file_path)
+        """Check if the TXT transcript is available."""
+        return bool(self.txt_file_path) or self.segment_count is not None
 
     @property
     def has_raw_output(self):
         """Check if raw WhisperX output is available."""
-        return bool(self.raw_whisperx_output or self.raw_whisperx_output_path)
+        if self.raw_whisperx_output_path:
+            return True
+        if 'raw_whisperx_output' in self.get_deferred_fields():
+            # Ask the database rather than loading the JSON
+            return Transcription.objects.filter(pk=self.pk, raw_whisperx_output__isnull=False).exists()
+        return bool(self.raw_whisperx_output)
+
+
+class TranscriptSegment(models.Model):
+    """
+    One transcript segment, indexed by position and time so single-segment
+    reads and time-range queries don't parse the raw WhisperX output.
+    """
+
+    transcription = models.ForeignKey(
+        Transcription,
+        on_delete=models.CASCADE,
+        related_name='segments'
+    )
+    index = models.PositiveIntegerField()
+    start = models.FloatField()
+    end = models.FloatField()
+    text = models.TextField(blank=True)
+    speaker = models.CharField(max_length=50, null=True, blank=True)
+
+    class Meta:
+        ordering = ['transcription', 'index']
+        constraints = [
+            models.UniqueConstraint(fields=['transcription', 'index'], name='unique_segment_index'),
+        ]
+        indexes = [
+            models.Index(fields=['transcription', 'start']),
+            models.Index(fields=['transcription', 'end']),
+        ]
+
+    def __str__(self):
+        return f"Segment {self.index} of {self.transcription_id}"
+
+
+class TranscriptWord(models.Model):
+    """
+    One word with its timing. `index` runs across the whole transcript;
+    words without alignment have no start/end.
+    """
+
+    transcription = models.ForeignKey(
+        Transcription,
+        on_delete=models.CASCADE,
+        related_name='words'
+    )
+    segment = models.ForeignKey(
+        TranscriptSegment,
+        on_delete=models.CASCADE,
+        related_name='words'
+    )
+    index = models.PositiveIntegerField()
+    word = models.CharField(max_length=255)
+    start = models.FloatField(null=True, blank=True)
+    end = models.FloatField(null=True, blank=True)
+    score = models.FloatField(null=True, blank=True)
+    speaker = models.CharField(max_length=50, null=True, blank=True)
+
+    class Meta:
+        ordering = ['transcription', 'index']
+        constraints = [
+            models.UniqueConstraint(fields=['transcription', 'index'], name='unique_word_index'),
+        ]
+        indexes = [
+            models.Index(fields=['transcription', 'start']),
+        ]
+
+    def __str__(self):
+        return f"Word {self.index} of {self.transcription_id}"
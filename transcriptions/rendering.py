@@ -0,0 +1,290 @@
+from .subtitle_generators import WordTimingsGenerator, WordTimingsEncoder
+from .timestamps import format_timestamp, format_timestamps
+
+BUFFER_CHARS = 1 << 16  # Text buffered per writer between file writes
+CUE_BATCH = 4096  # Word-level cues whose times are formatted together
+
+# Formats and the file each is stored as in a transcription's directory
+FILENAMES = {
+    'vtt': 'subtitles.vtt',
+    'word_vtt': 'word_level_subtitles.vtt',
+    'srt': 'subtitles.srt',
+    'txt': 'transcript.txt',
+    'word_timings': 'word_timings.bin.gz',
+}
+
+
+class TranscriptStats:
+    """Segment, word and speaker counts gathered one segment at a time."""
+
+    def __init__(self):
+        self.segment_count = 0
+        self.word_count = 0
+        self.speakers = set()
+        self.max_segment_seconds = 0.0
+
+    def add(self, segment):
+        self.segment_count += 1
+        if segment.get('words'):
+            self.word_count += len(segment['words'])
+        else:
+            # Fallback: estimate from text
+            self.word_count += len(segment.get('text', '').split())
+        if segment.get('speaker'):
+            self.speakers.add(segment['speaker'])
+        self.max_segment_seconds = max(
+            self.max_segment_seconds,
+            float(segment.get('end') or 0) - float(segment.get('start') or 0)
+        )
+
+    @property
+    def speaker_count(self):
+        return len(self.speakers) if self.speakers else 1
+
+
+class SubtitleRenderer:
+    """
+    Renders subtitle formats from a WhisperX output; the only implementation
+    of each format, which the generators in subtitle_generators.py wrap.
+
+    One walk over the segments feeds every requested format writer, with
+    each segment's text and timestamps worked out once, and gathers the
+    statistics on the way. Writers buffer their output and write it out in
+    large chunks.
+    """
+
+    @staticmethod
+    def render(whisperx_output, outputs):
+        """
+        Write each format in `outputs` ({format: path}, formats as in
+        FILENAMES) and return the TranscriptStats.
+        """
+        unknown = set(outputs) - set(WRITERS)
+        if unknown:
+            raise ValueError(f"Unknown subtitle format(s): {', '.join(sorted(unknown))}")
+
+        valid = isinstance(whisperx_output, dict) and 'segments' in whisperx_output
+        segments = whisperx_output['segments'] if valid else []
+        stats = TranscriptStats()
+
+        writers = [WRITERS[name](path) for name, path in outputs.items()]
+        # Word-level formats time their own cues: skip formatting segment times for them alone
+        timed = any(writer.timestamps for writer in writers)
+        try:
+            if valid:
+                for writer in writers:
+                    writer.begin()
+
+            for segment in segments:
+                stats.add(segment)
+
+                text = segment['text'].strip() if 'text' in segment else ''
+                start = format_timestamp(segment['start']) if timed and 'start' in segment else None
+                end = format_timestamp(segment['end']) if timed and 'end' in segment else None
+                for writer in writers:
+                    writer.segment(segment, text, start, end)
+
+            if valid:
+                for writer in writers:
+                    writer.end(stats)
+        finally:
+            for writer in writers:
+                writer.close()
+
+        return stats
+
+
+class _TextWriter:
+    """Buffered text output for one format."""
+
+    timestamps = False  # Whether segment() uses the formatted segment times
+
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= BUFFER_CHARS:
+            self.flush()
+
+    def flush(self):
+        self.file.write(''.join(self.parts))
+        self.parts = []
+        self.size = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def begin(self):
+        pass
+
+    def segment(self, segment, text, start, end):
+        pass
+
+    def end(self, stats):
+        pass
+
+
+class _VTTWriter(_TextWriter):
+    """WebVTT with one cue per segment."""
+
+    timestamps = True
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.cue_id = 1
+        self.write("WEBVTT\n\n")
+
+    def segment(self, segment, text, start, end):
+        if start is None or end is None or 'text' not in segment or not text:
+            return
+        speaker_label = f"<v {segment['speaker']}>" if 'speaker' in segment else ""
+        self.write(f"{self.cue_id}\n{start} --> {end}\n{speaker_label}{text}\n\n")
+        self.cue_id += 1
+
+
+class _WordVTTWriter(_TextWriter):
+    """
+    WebVTT with one cue per word, falling back to the segment for segments
+    without word timings. Cue times are formatted CUE_BATCH cues at a time
+    with format_timestamps.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.cue_id = 1
+        self.times = []
+        self.texts = []
+        self.write("WEBVTT\n\n")
+
+    def segment(self, segment, text, start, end):
+        speaker_label = f"<v {segment['speaker']}>" if 'speaker' in segment else ""
+
+        if segment.get('words'):
+            for word_data in segment['words']:
+                if 'start' in word_data and 'end' in word_data and 'word' in word_data:
+                    word_text = word_data['word'].strip()
+                    if word_text:
+                        self.times.append(word_data['start'])
+                        self.times.append(word_data['end'])
+                        self.texts.append(f"{speaker_label}<c.word-highlight>{word_text}</c>")
+        elif 'start' in segment and 'end' in segment and 'text' in segment and text:
+            self.times.append(segment['start'])
+            self.times.append(segment['end'])
+            self.texts.append(f"{speaker_label}{text}")
+
+        if len(self.texts) >= CUE_BATCH:
+            self.write_cues()
+
+    def write_cues(self):
+        stamps = format_timestamps(self.times)
+        first_id = self.cue_id
+        self.write(''.join(
+            f"{first_id + i}\n{stamps[2 * i]} --> {stamps[2 * i + 1]}\n{text}\n\n"
+            for i, text in enumerate(self.texts)
+        ))
+        self.cue_id += len(self.texts)
+        self.times = []
+        self.texts = []
+
+    def close(self):
+        self.write_cues()
+        super().close()
+
+
+class _SRTWriter(_TextWriter):
+    """SubRip: the VTT timestamps with a comma before the milliseconds."""
+
+    timestamps = True
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.subtitle_id = 1
+
+    def segment(self, segment, text, start, end):
+        if start is None or end is None or 'text' not in segment or not text:
+            return
+        if 'speaker' in segment:
+            text = f"[{segment['speaker']}] {text}"
+        self.write(f"{self.subtitle_id}\n{start[:-4]},{start[-3:]} --> {end[:-4]},{end[-3:]}\n{text}\n\n")
+        self.subtitle_id += 1
+
+
+class _TXTWriter(_TextWriter):
+    """Plain text by speaker, with the metadata taken from the statistics."""
+
+    timestamps = True
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.current_speaker = None
+
+    def begin(self):
+        self.write("TRANSCRIPT\n" + "=" * 50 + "\n\n")
+
+    def segment(self, segment, text, start, end):
+        if 'text' not in segment or not text:
+            return
+
+        # Handle speaker changes
+        speaker = segment.get('speaker', 'Unknown')
+        if speaker != self.current_speaker:
+            if self.current_speaker is not None:
+                self.write("\n")
+            self.write(f"{speaker}:\n")
+            self.current_speaker = speaker
+
+        if start is not None:
+            # HH:MM:SS of the VTT timestamp
+            self.write(f"[{start[:-4]}] {text}\n")
+        else:
+            self.write(f"{text}\n")
+
+    def end(self, stats):
+        self.write(
+            "\n" + "=" * 50 + "\n"
+            "METADATA\n"
+            + "=" * 50 + "\n"
+            f"Segments: {stats.segment_count}\n"
+            f"Words: {stats.word_count}\n"
+            f"Speakers: {stats.speaker_count}\n"
+        )
+        if stats.speakers:
+            self.write(f"Speaker list: {', '.join(sorted(stats.speakers))}\n")
+
+
+class _WordTimingsWriter:
+    """Gzip-compressed binary word timings, in the WordTimingsGenerator layout."""
+
+    timestamps = False
+
+    def __init__(self, path):
+        self.path = path
+        self.encoder = WordTimingsEncoder()
+
+    def begin(self):
+        pass
+
+    def segment(self, segment, text, start, end):
+        self.encoder.add_segment(segment)
+
+    def end(self, stats):
+        pass
+
+    def close(self):
+        data = WordTimingsGenerator.compress(self.encoder.to_bytes())
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+
+WRITERS = {
+    'vtt': _VTTWriter,
+    'word_vtt': _WordVTTWriter,
+    'srt': _SRTWriter,
+    'txt': _TXTWriter,
+    'word_timings': _WordTimingsWriter,
+}
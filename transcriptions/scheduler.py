@@ -0,0 +1,325 @@
+import os
+import logging
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Queue estimates are reused until the queue changes or they are this old
+PLAN_MAX_AGE_SECONDS = 30
+
+
+class TranscriptionScheduler:
+    """
+    In-process scheduler that sits in front of TranscriptionService.
+
+    Jobs are admitted under a global concurrency limit and a per-user quota.
+    Across users, jobs are ordered by weighted fair queuing: every user has a
+    virtual finish tag that advances by the cost (audio seconds) of each job
+    they start, divided by the user's weight, so a user with a large backlog
+    cannot starve everyone else. Within a user's own queue, shorter media is
+    started first, with an aging term so long files are not postponed forever.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # user_id -> list of queued jobs
+        self._running = {}  # media_file_id -> running job
+        self._finish_tags = {}  # user_id -> virtual finish tag
+        self._virtual_time = 0.0
+        self._sequence = 0
+        self._plan = None  # media_file_id -> (position, seconds until start), see _queue_plan
+        self._plan_time = None
+
+    # Public API
+
+    def submit(self, media_file, target):
+        """
+        Queue a transcription job for the media file.
+
+        `target` is called with the media file in a worker thread once the
+        scheduler decides the job may start.
+        """
+        media_file_id = str(media_file.id)
+
+        with self._lock:
+            if media_file_id in self._running or self._find_pending(media_file_id):
+                logger.info(f"Transcription for {media_file_id} is already scheduled")
+                return
+
+            self._sequence += 1
+            cost = self._job_cost(media_file)
+            job = {
+                'media_file_id': media_file_id,
+                'media_file': media_file,
+                'user_id': media_file.user_id,
+                'cost': cost,
+                'target': target,
+                'sequence': self._sequence,
+                'submitted_at': time.monotonic(),
+                'started_at': None,
+            }
+            self._pending.setdefault(media_file.user_id, []).append(job)
+            self._plan = None
+
+            logger.info(
+                f"Queued transcription for {media_file_id} "
+                f"(user {media_file.user_id}, cost {cost:.0f}s, queue depth {self._queue_depth()})"
+            )
+
+        self._dispatch()
+
+    def cancel(self, media_file_id):
+        """Remove a queued job, e.g. when its media file is deleted."""
+        media_file_id = str(media_file_id)
+
+        with self._lock:
+            for user_id, jobs in list(self._pending.items()):
+                remaining = [job for job in jobs if job['media_file_id'] != media_file_id]
+                if len(remaining) != len(jobs):
+                    if remaining:
+                        self._pending[user_id] = remaining
+                    else:
+                        del self._pending[user_id]
+                    self._plan = None
+                    logger.info(f"Removed queued transcription for {media_file_id}")
+                    return True
+
+        return False
+
+    def queue_depth(self):
+        """Number of jobs waiting to start."""
+        with self._lock:
+            return self._queue_depth()
+
+    def running_count(self):
+        """Number of jobs currently transcribing."""
+        with self._lock:
+            return len(self._running)
+
+    def queue_status(self, media_file_id):
+        """
+        Return queue position and estimated start for a queued job,
+        or None if the job is not waiting in the queue.
+        """
+        media_file_id = str(media_file_id)
+
+        with self._lock:
+            if not self._find_pending(media_file_id):
+                return None
+            plan, age = self._queue_plan()
+            queue_length = self._queue_depth()
+
+        if media_file_id not in plan:
+            return None
+
+        position, start_in = plan[media_file_id]
+        start_in = int(round(max(0.0, start_in - age)))
+        return {
+            'queue_position': position,
+            'queue_length': queue_length,
+            'estimated_start_seconds': start_in,
+            'estimated_start_time': (timezone.now() + timedelta(seconds=start_in)).isoformat(),
+        }
+
+    # Dispatching
+
+    def _dispatch(self):
+        """Start as many queued jobs as the quotas allow."""
+        to_start = []
+
+        with self._lock:
+            running_per_user = self._running_per_user()
+
+            while len(self._running) < settings.TRANSCRIPTION_MAX_CONCURRENT_JOBS:
+                job = self._select_next(
+                    self._pending, self._finish_tags, running_per_user, time.monotonic()
+                )
+                if job is None:
+                    break
+
+                self._take(job, self._pending, self._finish_tags)
+                job['started_at'] = time.monotonic()
+                self._running[job['media_file_id']] = job
+                running_per_user[job['user_id']] = running_per_user.get(job['user_id'], 0) + 1
+                to_start.append(job)
+                self._plan = None
+
+        for job in to_start:
+            logger.info(f"Starting scheduled transcription for {job['media_file_id']}")
+            thread = threading.Thread(target=self._run, args=(job,))
+            thread.daemon = True
+            thread.start()
+
+    def _run(self, job):
+        """Worker thread body: run the job and release its slot."""
+        from media_files.models import MediaFile
+
+        try:
+            if not MediaFile.objects.filter(id=job['media_file_id']).exists():
+                logger.info(f"Skipping transcription for deleted media file {job['media_file_id']}")
+                return
+            job['target'](job['media_file'])
+        except Exception as e:
+            logger.error(f"Scheduled transcription for {job['media_file_id']} crashed: {str(e)}")
+        finally:
+            with self._lock:
+                self._running.pop(job['media_file_id'], None)
+                self._plan = None
+            self._dispatch()
+
+    # Selection policy
+
+    def _select_next(self, pending, finish_tags, running_per_user, now):
+        """Pick the queued job with the smallest virtual finish tag."""
+        best_job = None
+        best_tag = None
+
+        for user_id, jobs in pending.items():
+            if not jobs:
+                continue
+            if running_per_user.get(user_id, 0) >= settings.TRANSCRIPTION_MAX_CONCURRENT_PER_USER:
+                continue
+
+            head = min(jobs, key=lambda job: self._priority_key(job, now))
+            start_tag = max(finish_tags.get(user_id, 0.0), self._virtual_time)
+            tag = start_tag + head['cost'] / self._user_weight(user_id)
+
+            if best_tag is None or (tag, head['sequence']) < (best_tag, best_job['sequence']):
+                best_job = head
+                best_tag = tag
+
+        return best_job
+
+    def _take(self, job, pending, finish_tags):
+        """Remove a job from the queue and advance the virtual clocks."""
+        user_id = job['user_id']
+        start_tag = max(finish_tags.get(user_id, 0.0), self._virtual_time)
+        finish_tags[user_id] = start_tag + job['cost'] / self._user_weight(user_id)
+        self._virtual_time = start_tag
+
+        pending[user_id].remove(job)
+        if not pending[user_id]:
+            del pending[user_id]
+
+    @staticmethod
+    def _priority_key(job, now):
+        """Shortest media first, with waiting time slowly closing the gap."""
+        waited = now - job['submitted_at']
+        return (job['cost'] - waited * settings.TRANSCRIPTION_AGING_RATE, job['sequence'])
+
+    @staticmethod
+    def _user_weight(user_id):
+        weights = settings.TRANSCRIPTION_USER_WEIGHTS
+        return float(weights.get(str(user_id), settings.TRANSCRIPTION_DEFAULT_USER_WEIGHT))
+
+    @staticmethod
+    def _job_cost(media_file):
+        """Cost of a job in seconds of audio."""
+        if media_file.duration_seconds:
+            duration = media_file.duration_seconds
+        else:
+            # Fall back to the 16kHz mono WAV size (~32KB per second)
+            duration = 0
+            if media_file.storage_path_audio and media_file.storage_path_audio.endswith('.wav'):
+                audio_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_audio)
+                if os.path.exists(audio_path):
+                    duration = os.path.getsize(audio_path) / (16000 * 2)
+
+        return max(30.0, float(duration))
+
+    @staticmethod
+    def estimate_processing_seconds(cost):
+        """Expected wall-clock time to transcribe `cost` seconds of audio."""
+        return (
+            settings.TRANSCRIPTION_JOB_OVERHEAD_SECONDS
+            + cost * settings.TRANSCRIPTION_SECONDS_PER_AUDIO_SECOND
+        )
+
+    # Helpers (callers hold the lock)
+
+    def _queue_depth(self):
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    def _running_per_user(self):
+        counts = {}
+        for job in self._running.values():
+            counts[job['user_id']] = counts.get(job['user_id'], 0) + 1
+        return counts
+
+    def _find_pending(self, media_file_id):
+        for jobs in self._pending.values():
+            for job in jobs:
+                if job['media_file_id'] == media_file_id:
+                    return job
+        return None
+
+    def _queue_plan(self):
+        """
+        The simulated dispatch order as {media_file_id: (position, seconds
+        until start)} and its age in seconds. Simulating replays the whole
+        queue, so the result is kept until the queue changes (or
+        PLAN_MAX_AGE_SECONDS pass) rather than redone on every status poll.
+        """
+        now = time.monotonic()
+        if self._plan is None or now - self._plan_time > PLAN_MAX_AGE_SECONDS:
+            self._plan = {
+                job['media_file_id']: (position, start_in)
+                for position, (job, start_in) in enumerate(self._simulate(), 1)
+            }
+            self._plan_time = now
+        return self._plan, now - self._plan_time
+
+    def _simulate(self):
+        """
+        Replay the scheduling policy on a copy of the current state and
+        return [(job, seconds_until_start), ...] in dispatch order.
+        """
+        now = time.monotonic()
+        pending = {user_id: list(jobs) for user_id, jobs in self._pending.items()}
+        finish_tags = dict(self._finish_tags)
+        saved_virtual_time = self._virtual_time
+
+        # (finish_offset, user_id) for every occupied slot
+        slots = []
+        for job in self._running.values():
+            elapsed = now - job['started_at']
+            remaining = max(0.0, self.estimate_processing_seconds(job['cost']) - elapsed)
+            slots.append((remaining, job['user_id']))
+
+        plan = []
+        clock = 0.0
+
+        try:
+            while pending:
+                running_per_user = {}
+                for _, user_id in slots:
+                    running_per_user[user_id] = running_per_user.get(user_id, 0) + 1
+
+                job = None
+                if len(slots) < settings.TRANSCRIPTION_MAX_CONCURRENT_JOBS:
+                    job = self._select_next(pending, finish_tags, running_per_user, now + clock)
+
+                if job is not None:
+                    self._take(job, pending, finish_tags)
+                    plan.append((job, clock))
+                    slots.append((clock + self.estimate_processing_seconds(job['cost']), job['user_id']))
+                    continue
+
+                if not slots:
+                    break
+
+                # Advance to the next job completion
+                slots.sort(key=lambda slot: slot[0])
+                finished_at, _ = slots.pop(0)
+                clock = max(clock, finished_at)
+        finally:
+            self._virtual_time = saved_virtual_time
+
+        return plan
+
+
+transcription_scheduler = TranscriptionScheduler()
@@ -1,10 +1,10 @@
 from rest_framework import serializers
 from .models import Transcription
-from media_files.serializers import MediaFileSerializer
+from media_files.serializers import MediaFileSerializer, SparseFieldsetMixin
 
 
-class TranscriptionSerializer(serializers.ModelSerializer):
-    """Serializer for Transcription model."""
+class TranscriptionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Serializer for Transcription model. The raw output is left to TranscriptionDetailSerializer."""
     
     media_file = MediaFileSerializer(read_only=True)
     has_vtt = serializers.ReadOnlyField()
@@ -16,14 +16,13 @@ class TranscriptionSerializer(serializers.ModelSerializer):
         model = Transcription
         fields = [
             'id', 'media_file', 'completed_date', 'vtt_file_path', 'word_level_vtt_file_path',
-            'srt_file_path', 'txt_file_path', 'raw_whisperx_output_path',
-            'raw_whisperx_output', 'word_count', 'segment_count',
-            'speaker_count', 'has_vtt', 'has_word_level_vtt', 'has_srt', 'has_txt', 'has_raw_output'
+            'srt_file_path', 'txt_file_path', 'word_timings_file_path', 'raw_whisperx_output_path',
+            'word_count', 'segment_count', 'speaker_count', 'version', 'has_vtt', 'has_word_level_vtt', 'has_srt', 'has_txt', 'has_raw_output'
         ]
         read_only_fields = [
             'id', 'completed_date', 'vtt_file_path', 'word_level_vtt_file_path', 'srt_file_path',
-            'txt_file_path', 'raw_whisperx_output_path', 'raw_whisperx_output',
-            'word_count', 'segment_count', 'speaker_count'
+            'txt_file_path', 'word_timings_file_path', 'raw_whisperx_output_path',
+            'word_count', 'segment_count', 'speaker_count', 'version'
         ]
 
 
@@ -32,6 +31,7 @@ class TranscriptionDetailSerializer(TranscriptionSerializer):
     
     class Meta(TranscriptionSerializer.Meta):
         fields = TranscriptionSerializer.Meta.fields + ['raw_whisperx_output']
+        read_only_fields = TranscriptionSerializer.Meta.read_only_fields + ['raw_whisperx_output']
 
 
 class SubtitleFileSerializer(serializers.Serializer):
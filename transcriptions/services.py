@@ -1,13 +1,12 @@
 import os
-import json
 import logging
-import threading
 import time
 from pathlib import Path
 from django.conf import settings
 import replicate
 from .models import Transcription
-from .subtitle_generators import VTTGenerator, WordLevelVTTGenerator, SRTGenerator, TXTGenerator
+from .scheduler import transcription_scheduler
+from .transcript_store import TranscriptStore
 
 logger = logging.getLogger(__name__)
 
@@ -18,34 +17,58 @@ class TranscriptionService:
     @staticmethod
     def start_transcription_async(media_file):
         """
-        Start transcription process asynchronously.
+        Queue transcription; the scheduler starts it when the user's quota
+        and the global concurrency limit allow.
         """
-        thread = threading.Thread(
-            target=TranscriptionService._process_transcription,
-            args=(media_file,)
-        )
-        thread.daemon = True
-        thread.start()
+        transcription_scheduler.submit(media_file, TranscriptionService._process_transcription)
 
     @staticmethod
     def _process_transcription(media_file):
         """
         Process transcription using Replicate API.
+        Transport chunks and compacted audio live only for the duration of the job.
         """
+        from media_files.services import AudioStorageService
+
+        with AudioStorageService.transient_dir(media_file) as work_dir:
+            TranscriptionService._transcribe(media_file, work_dir)
+
+    @staticmethod
+    def _transcribe(media_file, work_dir):
         try:
-            # Get audio file path
-            audio_path = os.path.join(settings.MEDIA_ROOT, media_file.storage_path_audio)
+            # Import AudioChunkingService
+            from media_files.services import AudioChunkingService, AudioStorageService
+            from media_files.silence import SilenceCompactionService
+
+            # 16kHz mono WAV, decoded from the stored FLAC if needed
+            audio_path = str(AudioStorageService.pcm_path(media_file))
             file_size = os.path.getsize(audio_path)
             file_size_mb = file_size / (1024 * 1024)
 
             logger.info(f"Processing audio file: {file_size_mb:.2f}MB")
 
-            # Import AudioChunkingService
-            from media_files.services import AudioChunkingService
+            # Cut long silences so we don't pay to transcribe them; the offset
+            # map restores the original timeline afterwards
+            offset_map = None
+            compacted_duration = None
+            compacted_path = Path(work_dir) / 'compacted.wav'
+            try:
+                compaction = SilenceCompactionService.compact(audio_path, compacted_path)
+            except Exception as e:
+                logger.warning(f"Silence compaction failed for {media_file.id}, using full audio: {str(e)}")
+                compaction = None
+            if compaction:
+                offset_map, compacted_duration = compaction
+                audio_path = str(compacted_path)
 
             # Split audio into chunks if needed (100MB Replicate limit)
-            # Use ultra-conservative chunking (25MB threshold, 15MB chunks) for maximum reliability
-            chunk_paths = AudioChunkingService.split_audio_with_smaller_chunks(audio_path, max_size_mb=25)
+            # Use ultra-conservative chunking (25MB threshold, 15MB chunks) for maximum reliability;
+            # chunks are encoded in the compact transport format, so each holds more audio
+            chunks = AudioChunkingService.prepare_transport_chunks(
+                media_file, audio_path, max_size_mb=25, target_chunk_size_mb=15,
+                duration_seconds=compacted_duration, work_dir=work_dir
+            )
+            chunk_paths = [chunk['path'] for chunk in chunks]
 
             if len(chunk_paths) > 1:
                 logger.info(f"Audio file split into {len(chunk_paths)} chunks")
@@ -63,11 +86,11 @@ class TranscriptionService:
 
             # Process chunks sequentially
             all_chunk_results = []
-            chunk_start_times = []
 
             client = replicate.Client(api_token=settings.REPLICATE_API_TOKEN)
 
-            for i, chunk_path in enumerate(chunk_paths):
+            for i, chunk in enumerate(chunks):
+                chunk_path = chunk['path']
                 logger.info(f"Processing chunk {i+1}/{len(chunk_paths)}: {chunk_path}")
 
                 # Check if chunk file exists
@@ -77,17 +100,8 @@ class TranscriptionService:
                 chunk_size_mb = os.path.getsize(chunk_path) / (1024 * 1024)
                 logger.info(f"Chunk {i+1} size: {chunk_size_mb:.2f}MB")
 
-                # Calculate start time for this chunk (for later alignment)
-                if i == 0:
-                    chunk_start_time = 0.0
-                else:
-                    # Estimate chunk duration based on file size
-                    # 16kHz mono WAV: ~32KB per second
-                    prev_chunk_size = os.path.getsize(chunk_paths[i-1])
-                    prev_duration = prev_chunk_size / (16000 * 2)  # 2 bytes per sample
-                    chunk_start_time = chunk_start_times[-1] + prev_duration
-
-                chunk_start_times.append(chunk_start_time)
+                # Start time of this chunk in the full audio (for later alignment)
+                chunk_start_time = chunk['start']
 
                 try:
                     # Process chunk with Replicate API
@@ -171,6 +185,9 @@ class TranscriptionService:
 
             logger.info(f"Successfully processed all {len(chunk_paths)} chunks for {media_file.id}")
 
+            if offset_map is not None:
+                offset_map.remap_result(combined_result)
+
             # Process the combined result
             TranscriptionService._process_transcription_result(media_file, combined_result)
 
@@ -346,7 +363,8 @@ class TranscriptionService:
     @staticmethod
     def _process_transcription_result(media_file, whisperx_output):
         """
-        Process successful transcription result and generate subtitle files.
+        Process successful transcription result. Subtitle files are rendered
+        on request (see SubtitleArtifactCache).
         """
         try:
             # Create transcription record
@@ -358,55 +376,12 @@ class TranscriptionService:
             transcription_dir = Path(settings.MEDIA_ROOT) / 'transcriptions' / str(media_file.user.id) / str(media_file.id)
             transcription_dir.mkdir(parents=True, exist_ok=True)
 
-            # Store raw WhisperX output
-            if isinstance(whisperx_output, dict) and len(json.dumps(whisperx_output)) < 1000000:  # 1MB limit
-                transcription.raw_whisperx_output = whisperx_output
-            else:
-                # Store in file if too large
-                raw_output_path = transcription_dir / 'raw_whisperx_output.json'
-                with open(raw_output_path, 'w', encoding='utf-8') as f:
-                    json.dump(whisperx_output, f, indent=2, ensure_ascii=False)
-
-                relative_path = os.path.relpath(raw_output_path, settings.MEDIA_ROOT)
-                transcription.raw_whisperx_output_path = relative_path
-
-            # Generate subtitle files
-            vtt_path = TranscriptionService._generate_vtt(transcription_dir, whisperx_output)
-            word_level_vtt_path = TranscriptionService._generate_word_level_vtt(transcription_dir, whisperx_output)
-            srt_path = TranscriptionService._generate_srt(transcription_dir, whisperx_output)
-            txt_path = TranscriptionService._generate_txt(transcription_dir, whisperx_output)
-
-            # Update transcription record with file paths
-            if vtt_path:
-                transcription.vtt_file_path = os.path.relpath(vtt_path, settings.MEDIA_ROOT)
-            if word_level_vtt_path:
-                transcription.word_level_vtt_file_path = os.path.relpath(word_level_vtt_path, settings.MEDIA_ROOT)
-            if srt_path:
-                transcription.srt_file_path = os.path.relpath(srt_path, settings.MEDIA_ROOT)
-            if txt_path:
-                transcription.txt_file_path = os.path.relpath(txt_path, settings.MEDIA_ROOT)
-
-            # Extract metadata
-            if isinstance(whisperx_output, dict):
-                segments = whisperx_output.get('segments', [])
-                transcription.segment_count = len(segments)
-
-                # Count words
-                word_count = 0
-                for segment in segments:
-                    if 'words' in segment:
-                        word_count += len(segment['words'])
-                    else:
-                        # Fallback: estimate from text
-                        word_count += len(segment.get('text', '').split())
-                transcription.word_count = word_count
+            # Store raw WhisperX output (cold storage; reads go through the segment and word tables)
+            if settings.TRANSCRIPTION_STORE_RAW_OUTPUT:
+                TranscriptStore.store_raw_output(transcription, whisperx_output, transcription_dir)
 
-                # Count speakers
-                speakers = set()
-                for segment in segments:
-                    if 'speaker' in segment:
-                        speakers.add(segment['speaker'])
-                transcription.speaker_count = len(speakers) if speakers else 1
+            # Index segments and words, and extract metadata
+            TranscriptStore.save(transcription, whisperx_output)
 
             transcription.save()
 
@@ -421,47 +396,3 @@ class TranscriptionService:
             media_file.error_message = f"Error processing transcription result: {str(e)}"
             media_file.save()
             logger.error(f"Error processing transcription result for {media_file.id}: {str(e)}")
-
-    @staticmethod
-    def _generate_vtt(output_dir, whisperx_output):
-        """Generate VTT subtitle file."""
-        try:
-            vtt_path = output_dir / 'subtitles.vtt'
-            VTTGenerator.generate(whisperx_output, vtt_path)
-            return vtt_path
-        except Exception as e:
-            logger.error(f"Error generating VTT: {str(e)}")
-            return None
-
-    @staticmethod
-    def _generate_word_level_vtt(output_dir, whisperx_output):
-        """Generate word-level VTT subtitle file for word highlighting."""
-        try:
-            word_vtt_path = output_dir / 'word_level_subtitles.vtt'
-            WordLevelVTTGenerator.generate(whisperx_output, word_vtt_path)
-            return word_vtt_path
-        except Exception as e:
-            logger.error(f"Error generating word-level VTT: {str(e)}")
-            return None
-
-    @staticmethod
-    def _generate_srt(output_dir, whisperx_output):
-        """Generate SRT subtitle file."""
-        try:
-            srt_path = output_dir / 'subtitles.srt'
-            SRTGenerator.generate(whisperx_output, srt_path)
-            return srt_path
-        except Exception as e:
-            logger.error(f"Error generating SRT: {str(e)}")
-            return None
-
-    @staticmethod
-    def _generate_txt(output_dir, whisperx_output):
-        """Generate TXT transcript file."""
-        try:
-            txt_path = output_dir / 'transcript.txt'
-            TXTGenerator.generate(whisperx_output, txt_path)
-            return txt_path
-        except Exception as e:
-            logger.error(f"Error generating TXT: {str(e)}")
-            return None
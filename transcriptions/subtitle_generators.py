@@ -1,4 +1,13 @@
-from datetime import timedelta
+import sys
+import gzip
+import struct
+from array import array
+
+
+def _render(file_type, whisperx_output, output_path):
+    # Imported here: the renderer takes the word timings format from this module
+    from .rendering import SubtitleRenderer
+    SubtitleRenderer.render(whisperx_output, {file_type: output_path})
 
 
 class VTTGenerator:
@@ -10,44 +19,7 @@ class VTTGenerator:
         Generate VTT file from WhisperX output using segment-level timing.
         This creates proper subtitles that work well with video players.
         """
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("WEBVTT\n\n")
-
-            if not isinstance(whisperx_output, dict) or 'segments' not in whisperx_output:
-                return
-
-            segments = whisperx_output['segments']
-            cue_id = 1
-
-            for segment in segments:
-                # Use segment-level timing for proper subtitle display
-                if 'start' in segment and 'end' in segment and 'text' in segment:
-                    start_time = VTTGenerator._format_timestamp(segment['start'])
-                    end_time = VTTGenerator._format_timestamp(segment['end'])
-                    text = segment['text'].strip()
-
-                    if text:
-                        # Add speaker label if available
-                        speaker_label = ""
-                        if 'speaker' in segment:
-                            speaker_label = f"<v {segment['speaker']}>"
-
-                        f.write(f"{cue_id}\n")
-                        f.write(f"{start_time} --> {end_time}\n")
-                        f.write(f"{speaker_label}{text}\n\n")
-                        cue_id += 1
-    
-    @staticmethod
-    def _format_timestamp(seconds):
-        """Format timestamp for VTT format (HH:MM:SS.mmm)."""
-        td = timedelta(seconds=seconds)
-        total_seconds = int(td.total_seconds())
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        secs = total_seconds % 60
-        milliseconds = int((seconds - total_seconds) * 1000)
-        
-        return f"{hours:02d}:{minutes:02d}:{secs:02d}.{milliseconds:03d}"
+        _render('vtt', whisperx_output, output_path)
 
 
 class WordLevelVTTGenerator:
@@ -59,181 +31,136 @@ class WordLevelVTTGenerator:
         Generate VTT file from WhisperX output with word-level timing.
         This is used for advanced ESL features like word-by-word highlighting.
         """
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("WEBVTT\n\n")
-
-            if not isinstance(whisperx_output, dict) or 'segments' not in whisperx_output:
-                return
-
-            segments = whisperx_output['segments']
-            cue_id = 1
-
-            for segment in segments:
-                if 'words' in segment and segment['words']:
-                    # Generate word-level cues for precise highlighting
-                    for word_data in segment['words']:
-                        if 'start' in word_data and 'end' in word_data and 'word' in word_data:
-                            start_time = WordLevelVTTGenerator._format_timestamp(word_data['start'])
-                            end_time = WordLevelVTTGenerator._format_timestamp(word_data['end'])
-                            word_text = word_data['word'].strip()
-
-                            if word_text:
-                                # Add speaker label if available
-                                speaker_label = ""
-                                if 'speaker' in segment:
-                                    speaker_label = f"<v {segment['speaker']}>"
-
-                                f.write(f"{cue_id}\n")
-                                f.write(f"{start_time} --> {end_time}\n")
-                                f.write(f"{speaker_label}<c.word-highlight>{word_text}</c>\n\n")
-                                cue_id += 1
-                else:
-                    # Fallback: segment-level cues
-                    if 'start' in segment and 'end' in segment and 'text' in segment:
-                        start_time = WordLevelVTTGenerator._format_timestamp(segment['start'])
-                        end_time = WordLevelVTTGenerator._format_timestamp(segment['end'])
-                        text = segment['text'].strip()
-
-                        if text:
-                            speaker_label = ""
-                            if 'speaker' in segment:
-                                speaker_label = f"<v {segment['speaker']}>"
-
-                            f.write(f"{cue_id}\n")
-                            f.write(f"{start_time} --> {end_time}\n")
-                            f.write(f"{speaker_label}{text}\n\n")
-                            cue_id += 1
-
-    @staticmethod
-    def _format_timestamp(seconds):
-        """Format timestamp for VTT format (HH:MM:SS.mmm)."""
-        td = timedelta(seconds=seconds)
-        total_seconds = int(td.total_seconds())
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        secs = total_seconds % 60
-        milliseconds = int((seconds - total_seconds) * 1000)
-
-        return f"{hours:02d}:{minutes:02d}:{secs:02d}.{milliseconds:03d}"
+        _render('word_vtt', whisperx_output, output_path)
 
 
 class SRTGenerator:
     """Generator for SubRip (SRT) subtitle files."""
-    
+
     @staticmethod
     def generate(whisperx_output, output_path):
         """
         Generate SRT file from WhisperX output.
         """
-        with open(output_path, 'w', encoding='utf-8') as f:
-            if not isinstance(whisperx_output, dict) or 'segments' not in whisperx_output:
-                return
-            
-            segments = whisperx_output['segments']
-            subtitle_id = 1
-            
-            for segment in segments:
-                if 'start' in segment and 'end' in segment and 'text' in segment:
-                    start_time = SRTGenerator._format_timestamp(segment['start'])
-                    end_time = SRTGenerator._format_timestamp(segment['end'])
-                    text = segment['text'].strip()
-                    
-                    if text:
-                        # Add speaker label if available
-                        if 'speaker' in segment:
-                            text = f"[{segment['speaker']}] {text}"
-                        
-                        f.write(f"{subtitle_id}\n")
-                        f.write(f"{start_time} --> {end_time}\n")
-                        f.write(f"{text}\n\n")
-                        subtitle_id += 1
-    
-    @staticmethod
-    def _format_timestamp(seconds):
-        """Format timestamp for SRT format (HH:MM:SS,mmm)."""
-        td = timedelta(seconds=seconds)
-        total_seconds = int(td.total_seconds())
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        secs = total_seconds % 60
-        milliseconds = int((seconds - total_seconds) * 1000)
-        
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+        _render('srt', whisperx_output, output_path)
 
 
 class TXTGenerator:
     """Generator for plain text transcript files."""
-    
+
     @staticmethod
     def generate(whisperx_output, output_path):
         """
         Generate TXT file from WhisperX output.
         """
-        with open(output_path, 'w', encoding='utf-8') as f:
-            if not isinstance(whisperx_output, dict) or 'segments' not in whisperx_output:
-                return
-            
-            segments = whisperx_output['segments']
-            
-            f.write("TRANSCRIPT\n")
-            f.write("=" * 50 + "\n\n")
-            
-            current_speaker = None
-            
-            for segment in segments:
-                if 'text' in segment:
-                    text = segment['text'].strip()
-                    
-                    if text:
-                        # Handle speaker changes
-                        speaker = segment.get('speaker', 'Unknown')
-                        if speaker != current_speaker:
-                            if current_speaker is not None:
-                                f.write("\n")
-                            f.write(f"{speaker}:\n")
-                            current_speaker = speaker
-                        
-                        # Add timestamp if available
-                        if 'start' in segment:
-                            timestamp = TXTGenerator._format_timestamp(segment['start'])
-                            f.write(f"[{timestamp}] ")
-                        
-                        f.write(f"{text}\n")
-            
-            # Add metadata section
-            f.write("\n" + "=" * 50 + "\n")
-            f.write("METADATA\n")
-            f.write("=" * 50 + "\n")
-            
-            # Count segments and words
-            segment_count = len(segments)
-            word_count = 0
-            speakers = set()
-            
-            for segment in segments:
-                if 'words' in segment:
-                    word_count += len(segment['words'])
-                else:
-                    # Fallback: estimate from text
-                    word_count += len(segment.get('text', '').split())
-                
-                if 'speaker' in segment:
-                    speakers.add(segment['speaker'])
-            
-            f.write(f"Segments: {segment_count}\n")
-            f.write(f"Words: {word_count}\n")
-            f.write(f"Speakers: {len(speakers) if speakers else 1}\n")
-            
-            if speakers:
-                f.write(f"Speaker list: {', '.join(sorted(speakers))}\n")
-    
+        _render('txt', whisperx_output, output_path)
+
+
+class WordTimingsGenerator:
+    """
+    Generator for the compact binary word timings used for client-side highlighting.
+
+    Layout (little-endian, every array 4-byte aligned so the client can view
+    it in place as a typed array):
+        header:  magic 'WTIM', u16 version, u16 flags, u32 word count (n),
+                 u32 segment count (m), u32 text byte length
+        f32 word start[n], f32 word end[n], u32 word text offset[n + 1],
+        f32 segment start[m], f32 segment end[m], u32 segment first word[m + 1],
+        UTF-8 text of all words back to back.
+
+    Starts are non-decreasing, so the word at time t is a binary search over
+    the start array. To keep them so, a word starting before the previous
+    word's end (overlapping alignments) is stored as starting at that end,
+    and an end before its start is raised to the start; the stored times are
+    for highlighting, not the transcript's exact alignment. Words without
+    alignment inherit the previous word's end.
+    The file is stored gzip-compressed (deterministically, for stable ETags).
+    """
+
+    MAGIC = b'WTIM'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHHIII')
+    COMPRESS_LEVEL = 6  # Level 9 takes twice as long for files about 0.5% smaller
+
+    @staticmethod
+    def encode(whisperx_output):
+        segments = whisperx_output.get('segments', []) if isinstance(whisperx_output, dict) else []
+
+        encoder = WordTimingsEncoder()
+        for segment in segments:
+            encoder.add_segment(segment)
+        return encoder.to_bytes()
+
+    @staticmethod
+    def generate(whisperx_output, output_path):
+        """Write the gzip-compressed word timings for a WhisperX output."""
+        _render('word_timings', whisperx_output, output_path)
+
     @staticmethod
-    def _format_timestamp(seconds):
-        """Format timestamp for TXT format (HH:MM:SS)."""
-        td = timedelta(seconds=seconds)
-        total_seconds = int(td.total_seconds())
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        secs = total_seconds % 60
-        
-        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    def compress(data):
+        return gzip.compress(data, compresslevel=WordTimingsGenerator.COMPRESS_LEVEL, mtime=0)
+
+
+class WordTimingsEncoder:
+    """Builds the WordTimingsGenerator layout one segment at a time."""
+
+    def __init__(self):
+        self.word_starts = array('f')
+        self.word_ends = array('f')
+        self.text_offsets = array('I', [0])
+        self.segment_starts = array('f')
+        self.segment_ends = array('f')
+        self.segment_first_word = array('I')
+        self.text = bytearray()
+        self.last_time = 0.0
+
+    def add_segment(self, segment):
+        segment_start = float(segment.get('start') or self.last_time)
+        self.segment_first_word.append(len(self.word_starts))
+        self.segment_starts.append(segment_start)
+        self.segment_ends.append(float(segment.get('end') or segment_start))
+        last_time = max(self.last_time, segment_start)
+
+        word_starts_append = self.word_starts.append
+        word_ends_append = self.word_ends.append
+        text_offsets_append = self.text_offsets.append
+        text = self.text
+        for word in segment.get('words') or ():
+            word_text = word.get('word')
+            if not word_text:
+                continue
+            start = word.get('start')
+            end = word.get('end')
+            start = max(float(start), last_time) if start is not None else last_time
+            if end is not None:
+                end = max(float(end), start)
+                last_time = end
+            else:
+                end = last_time = start
+            word_starts_append(start)
+            word_ends_append(end)
+            text += word_text.strip().encode('utf-8')
+            text_offsets_append(len(text))
+
+        self.last_time = last_time
+
+    def to_bytes(self):
+        segment_first_word = array('I', self.segment_first_word)
+        segment_first_word.append(len(self.word_starts))
+        text_length = len(self.text)
+        # Pad the text so the encoded size stays a multiple of 4
+        text = bytes(self.text) + b'\0' * (-text_length % 4)
+
+        body = [
+            self.word_starts, self.word_ends, self.text_offsets,
+            self.segment_starts, self.segment_ends, segment_first_word
+        ]
+        if sys.byteorder == 'big':
+            body = [array(values.typecode, values) for values in body]
+            for values in body:
+                values.byteswap()
+
+        return WordTimingsGenerator.HEADER.pack(
+            WordTimingsGenerator.MAGIC, WordTimingsGenerator.VERSION, 0,
+            len(self.word_starts), len(self.segment_starts), text_length
+        ) + b''.join(values.tobytes() for values in body) + text
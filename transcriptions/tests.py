@@ -1,3 +1,644 @@
-from django.test import TestCase
+import os
+import copy
+import gzip
+import shutil
+import struct
+import tempfile
+import time
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from media_files.testing import MediaTestCase
+from .models import Transcription, TranscriptSegment
+from .transcript_store import TranscriptStore
+from .subtitle_generators import (
+    VTTGenerator, WordLevelVTTGenerator, SRTGenerator, TXTGenerator, WordTimingsGenerator
+)
+from .rendering import SubtitleRenderer, FILENAMES
+from .artifacts import SubtitleArtifactCache
+from .scheduler import TranscriptionScheduler
+from .timestamps import format_timestamp, format_timestamps, format_clock
 
-# Create your tests here.
+
+class SubtitleOffloadTests(MediaTestCase):
+    """Subtitle views hand the bytes to the front proxy when offload is enabled."""
+
+    def setUp(self):
+        super().setUp()
+        self.vtt = b'WEBVTT\n\n00:00:00.000 --> 00:00:01.000\nHello\n'
+        self.write_media('transcriptions/lesson.vtt', self.vtt)
+        self.media_file = self.create_media_file()
+        Transcription.objects.create(media_file=self.media_file, vtt_file_path='transcriptions/lesson.vtt')
+
+    @override_settings(FILE_OFFLOAD_MODE='nginx', FILE_OFFLOAD_INTERNAL_PREFIX='/protected-media/')
+    def test_download_returns_accel_redirect(self):
+        url = reverse('transcriptions:download_subtitle_file', args=[self.media_file.id, 'vtt'])
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/transcriptions/lesson.vtt')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="lesson.mp4_vtt.vtt"')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(FILE_OFFLOAD_MODE='')
+    def test_serve_streams_without_offload(self):
+        url = reverse('transcriptions:serve_subtitle_file', args=[self.media_file.id, 'vtt'])
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/vtt')
+        self.assertEqual(response['Content-Disposition'], 'inline')
+        self.assertEqual(b''.join(response.streaming_content), self.vtt)
+
+
+class TranscriptStoreTests(MediaTestCase):
+    """Segments and words are indexed in their own tables and rebuilt from them."""
+
+    OUTPUT = {
+        'segments': [
+            {
+                'start': 0.0, 'end': 2.0, 'text': ' Hello there', 'speaker': 'SPEAKER_00',
+                'words': [
+                    {'word': 'Hello', 'start': 0.0, 'end': 0.8, 'score': 0.9},
+                    {'word': 'there', 'start': 0.9, 'end': 2.0, 'score': 0.8},
+                ],
+            },
+            {'start': 5.0, 'end': 7.5, 'text': 'General Kenobi', 'speaker': 'SPEAKER_01'},
+            {
+                'start': 8.0, 'end': 9.0, 'text': 'Bold one',
+                'words': [{'word': 'Bold'}, {'word': 'one', 'start': 8.5, 'end': 9.0}],
+            },
+        ]
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.transcription = Transcription.objects.create(media_file=self.create_media_file())
+
+    def test_save_indexes_segments_words_and_counts(self):
+        TranscriptStore.save(self.transcription, self.OUTPUT)
+
+        self.assertEqual(self.transcription.segments.count(), 3)
+        self.assertEqual(list(self.transcription.words.values_list('index', 'word')), [
+            (0, 'Hello'), (1, 'there'), (2, 'Bold'), (3, 'one')
+        ])
+        self.assertEqual(self.transcription.words.get(index=2).segment.index, 2)
+        self.assertEqual(self.transcription.segment_count, 3)
+        self.assertEqual(self.transcription.word_count, 6)
+        self.assertEqual(self.transcription.speaker_count, 2)
+
+    def test_save_replaces_previous_rows(self):
+        TranscriptStore.save(self.transcription, self.OUTPUT)
+        TranscriptStore.save(self.transcription, {'segments': self.OUTPUT['segments'][1:2]})
+
+        self.assertEqual(TranscriptSegment.objects.filter(transcription=self.transcription).count(), 1)
+        self.assertFalse(self.transcription.words.exists())
+
+    def edited(self, index, **fields):
+        output = copy.deepcopy(self.OUTPUT)
+        output['segments'][index].update(fields)
+        return output
+
+    def word_rows(self):
+        return list(self.transcription.words.order_by('index').values_list('id', 'index', 'word', 'segment__index'))
+
+    def test_single_segment_edit_writes_only_that_segment(self):
+        TranscriptStore.save(self.transcription, self.OUTPUT)
+        before = self.word_rows()
+
+        output = self.edited(1, text='General Kenobi!')
+        with CaptureQueriesContext(connection) as queries:
+            TranscriptStore.save(self.transcription, output)
+
+        writes = [
+            q['sql'].split()[0] for q in queries.captured_queries
+            if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')
+        ]
+        self.assertEqual(writes, ['UPDATE'])
+        self.assertEqual(self.word_rows(), before)
+        self.assertEqual(self.transcription.segments.get(index=1).text, 'General Kenobi!')
+
+    def test_word_edit_renumbers_later_words(self):
+        TranscriptStore.save(self.transcription, self.OUTPUT)
+        bold_id = self.transcription.words.get(word='Bold').id
+
+        words = [{'word': 'Hello', 'start': 0.0, 'end': 0.5}, {'word': 'over', 'start': 0.5, 'end': 0.9},
+                 {'word': 'there', 'start': 0.9, 'end': 2.0}]
+        TranscriptStore.save(self.transcription, self.edited(0, words=words))
+
+        self.assertEqual([(index, word, segment) for _, index, word, segment in self.word_rows()], [
+            (0, 'Hello', 0), (1, 'over', 0), (2, 'there', 0), (3, 'Bold', 2), (4, 'one', 2)
+        ])
+        # Words of untouched segments keep their rows
+        self.assertEqual(self.transcription.words.get(word='Bold').id, bold_id)
+
+    def test_save_grows_and_shrinks_the_transcript(self):
+        TranscriptStore.save(self.transcription, {'segments': self.OUTPUT['segments'][:1]})
+        TranscriptStore.save(self.transcription, self.OUTPUT)
+
+        self.assertEqual(TranscriptStore.output(self.transcription)['segments'][2]['words'][1]['word'], 'one')
+        self.assertEqual([index for _, index, _, _ in self.word_rows()], [0, 1, 2, 3])
+
+        TranscriptStore.save(self.transcription, {'segments': self.OUTPUT['segments'][1:]})
+
+        self.assertEqual(
+            list(self.transcription.segments.values_list('index', 'text')), [(0, 'General Kenobi'), (1, 'Bold one')]
+        )
+        self.assertEqual([(index, word, segment) for _, index, word, segment in self.word_rows()], [
+            (0, 'Bold', 1), (1, 'one', 1)
+        ])
+
+    def test_segments_between(self):
+        TranscriptStore.save(self.transcription, self.OUTPUT)
+
+        found = TranscriptStore.segments_between(self.transcription, 1.5, 6.0)
+        self.assertEqual([segment.index for segment in found], [0, 1])
+
+    @override_settings(TRANSCRIPTION_RAW_OUTPUT_DB_MAX_BYTES=100, TRANSCRIPTION_RAW_OUTPUT_COMPRESSION='gzip')
+    def test_large_raw_output_is_compressed_to_a_file(self):
+        directory = os.path.join(self.media_root, 'transcriptions')
+        os.makedirs(directory)
+
+        TranscriptStore.store_raw_output(self.transcription, self.OUTPUT, directory)
+        self.assertIsNone(self.transcription.raw_whisperx_output)
+        self.assertEqual(self.transcription.raw_whisperx_output_path, 'transcriptions/raw_whisperx_output.json.gz')
+        self.assertEqual(TranscriptStore.raw_output(self.transcription), self.OUTPUT)
+
+        # Small enough for the JSONField: the file is dropped
+        with override_settings(TRANSCRIPTION_RAW_OUTPUT_DB_MAX_BYTES=1000000):
+            TranscriptStore.store_raw_output(self.transcription, self.OUTPUT, directory)
+        self.assertEqual(self.transcription.raw_whisperx_output, self.OUTPUT)
+        self.assertIsNone(self.transcription.raw_whisperx_output_path)
+        self.assertEqual(os.listdir(directory), [])
+
+    def test_output_round_trip(self):
+        TranscriptStore.save(self.transcription, self.OUTPUT)
+
+        segments = TranscriptStore.output(self.transcription)['segments']
+        self.assertEqual(segments[0]['text'], 'Hello there')
+        self.assertEqual(segments[0]['words'][1], {
+            'word': 'there', 'start': 0.9, 'end': 2.0, 'score': 0.8, 'speaker': 'SPEAKER_00'
+        })
+        self.assertNotIn('words', segments[1])
+        self.assertEqual(segments[2]['words'][0], {'word': 'Bold'})
+
+
+class WordTimingsTests(MediaTestCase):
+    """Binary word timings are laid out as documented and revalidate by ETag."""
+
+    OUTPUT = {
+        'segments': [
+            {
+                'start': 0.0, 'end': 2.0, 'text': 'Hello there',
+                'words': [
+                    {'word': 'Hello', 'start': 0.0, 'end': 0.75},
+                    {'word': ' théré', 'start': 1.0, 'end': 2.0},
+                ],
+            },
+            {'start': 3.0, 'end': 4.0, 'text': 'Unaligned', 'words': [{'word': 'Unaligned'}]},
+        ]
+    }
+
+    def test_encode_layout(self):
+        data = WordTimingsGenerator.encode(self.OUTPUT)
+        magic, version, _, words, segments, text_length = struct.unpack_from('<4sHHIII', data)
+
+        self.assertEqual((magic, version, words, segments), (b'WTIM', 1, 3, 2))
+        self.assertEqual(len(data) % 4, 0)
+        offset = 20
+        self.assertEqual(struct.unpack_from('<3f', data, offset), (0.0, 1.0, 3.0))
+        offset += 12
+        self.assertEqual(struct.unpack_from('<3f', data, offset), (0.75, 2.0, 3.0))
+        offset += 12
+        text_offsets = struct.unpack_from('<4I', data, offset)
+        offset += 16 + 8 + 8
+        self.assertEqual(struct.unpack_from('<3I', data, offset), (0, 2, 3))
+        offset += 12
+        text = data[offset:offset + text_length]
+        self.assertEqual(text[text_offsets[1]:text_offsets[2]].decode('utf-8'), 'théré')
+
+    def test_view_serves_gzip_and_revalidates(self):
+        media_file = self.create_media_file()
+        Transcription.objects.create(media_file=media_file, raw_whisperx_output=self.OUTPUT)
+        url = reverse('transcriptions:serve_word_timings', args=[media_file.id])
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), WordTimingsGenerator.encode(self.OUTPUT))
+
+        revalidated = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_view_etag_differs_per_encoding(self):
+        media_file = self.create_media_file()
+        Transcription.objects.create(media_file=media_file, raw_whisperx_output=self.OUTPUT)
+        url = reverse('transcriptions:serve_word_timings', args=[media_file.id])
+
+        encoded = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        identity = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0, br')
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertEqual(identity.content, WordTimingsGenerator.encode(self.OUTPUT))
+        self.assertNotEqual(encoded['ETag'], identity['ETag'])
+
+        # The gzip validator does not revalidate the identity body
+        mismatched = self.client.get(url, HTTP_IF_NONE_MATCH=encoded['ETag'])
+        self.assertEqual(mismatched.status_code, 200)
+        self.assertEqual(mismatched.content, identity.content)
+
+
+class TimestampTests(TestCase):
+    """Timestamps are rounded to whole milliseconds once, then split exactly."""
+
+    def test_rounds_instead_of_truncating(self):
+        # 1.001 - 1 is 0.000999..., which truncation turned into .000
+        self.assertEqual(format_timestamp(1.001), '00:00:01.001')
+        self.assertEqual(format_timestamp(1.9999999), '00:00:02.000')
+        self.assertEqual(format_timestamp(3725.2504), '01:02:05.250')
+
+    def test_formats(self):
+        self.assertEqual(format_timestamp(59.5, ','), '00:00:59,500')
+        self.assertEqual(format_clock(3599.9996), '01:00:00')
+        self.assertEqual(format_timestamp(360000), '100:00:00.000')
+        self.assertEqual(format_timestamp(-0.2), '00:00:00.000')
+
+    def test_array_matches_scalar(self):
+        values = [0, 0.0005, 1.001, 1.9999999, 59.9995, 3725.2504, 360000.25, -3]
+        self.assertEqual(format_timestamps(values, ','), [format_timestamp(value, ',') for value in values])
+
+
+class SubtitleRendererTests(TestCase):
+    """Each format is written by the renderer, alone or with others in one pass."""
+
+    OUTPUT = {
+        'segments': TranscriptStoreTests.OUTPUT['segments'] + [
+            {'start': 3725.25, 'end': 3727.5, 'text': 'An hour in', 'speaker': 'SPEAKER_00'},
+            {'text': 'No timing at all'},
+            {'start': 3730.0, 'end': 3731.0, 'text': '   '},
+        ]
+    }
+
+    EXPECTED = {
+        'vtt': (
+            'WEBVTT\n\n'
+            '1\n00:00:00.000 --> 00:00:02.000\n<v SPEAKER_00>Hello there\n\n'
+            '2\n00:00:05.000 --> 00:00:07.500\n<v SPEAKER_01>General Kenobi\n\n'
+            '3\n00:00:08.000 --> 00:00:09.000\nBold one\n\n'
+            '4\n01:02:05.250 --> 01:02:07.500\n<v SPEAKER_00>An hour in\n\n'
+        ),
+        'word_vtt': (
+            'WEBVTT\n\n'
+            '1\n00:00:00.000 --> 00:00:00.800\n<v SPEAKER_00><c.word-highlight>Hello</c>\n\n'
+            '2\n00:00:00.900 --> 00:00:02.000\n<v SPEAKER_00><c.word-highlight>there</c>\n\n'
+            '3\n00:00:05.000 --> 00:00:07.500\n<v SPEAKER_01>General Kenobi\n\n'
+            '4\n00:00:08.500 --> 00:00:09.000\n<c.word-highlight>one</c>\n\n'
+            '5\n01:02:05.250 --> 01:02:07.500\n<v SPEAKER_00>An hour in\n\n'
+        ),
+        'srt': (
+            '1\n00:00:00,000 --> 00:00:02,000\n[SPEAKER_00] Hello there\n\n'
+            '2\n00:00:05,000 --> 00:00:07,500\n[SPEAKER_01] General Kenobi\n\n'
+            '3\n00:00:08,000 --> 00:00:09,000\nBold one\n\n'
+            '4\n01:02:05,250 --> 01:02:07,500\n[SPEAKER_00] An hour in\n\n'
+        ),
+        'txt': (
+            'TRANSCRIPT\n' + '=' * 50 + '\n\n'
+            'SPEAKER_00:\n[00:00:00] Hello there\n\n'
+            'SPEAKER_01:\n[00:00:05] General Kenobi\n\n'
+            'Unknown:\n[00:00:08] Bold one\n\n'
+            'SPEAKER_00:\n[01:02:05] An hour in\n\n'
+            'Unknown:\nNo timing at all\n'
+            '\n' + '=' * 50 + '\nMETADATA\n' + '=' * 50 + '\n'
+            'Segments: 6\nWords: 13\nSpeakers: 2\nSpeaker list: SPEAKER_00, SPEAKER_01\n'
+        ),
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def read(self, name):
+        with open(os.path.join(self.directory, FILENAMES[name]), 'rb') as f:
+            return f.read()
+
+    def test_formats(self):
+        for name, generator in (
+            ('vtt', VTTGenerator), ('word_vtt', WordLevelVTTGenerator), ('srt', SRTGenerator), ('txt', TXTGenerator),
+        ):
+            generator.generate(self.OUTPUT, os.path.join(self.directory, FILENAMES[name]))
+            self.assertEqual(self.read(name).decode('utf-8'), self.EXPECTED[name], name)
+
+        WordTimingsGenerator.generate(self.OUTPUT, os.path.join(self.directory, FILENAMES['word_timings']))
+        self.assertEqual(gzip.decompress(self.read('word_timings')), WordTimingsGenerator.encode(self.OUTPUT))
+
+    def test_one_pass_writes_the_same_files(self):
+        stats = SubtitleRenderer.render(
+            self.OUTPUT, {name: os.path.join(self.directory, filename) for name, filename in FILENAMES.items()}
+        )
+
+        for name, expected in self.EXPECTED.items():
+            self.assertEqual(self.read(name).decode('utf-8'), expected, name)
+        self.assertEqual(gzip.decompress(self.read('word_timings')), WordTimingsGenerator.encode(self.OUTPUT))
+        self.assertEqual(stats.segment_count, 6)
+        self.assertEqual(stats.word_count, 13)
+        self.assertEqual(stats.speaker_count, 2)
+
+    def test_without_segments(self):
+        SubtitleRenderer.render({}, {name: os.path.join(self.directory, filename) for name, filename in FILENAMES.items()})
+
+        self.assertEqual(self.read('vtt'), b'WEBVTT\n\n')
+        self.assertEqual(self.read('word_vtt'), b'WEBVTT\n\n')
+        self.assertEqual(self.read('srt'), b'')
+        self.assertEqual(self.read('txt'), b'')
+
+    def test_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            SubtitleRenderer.render(self.OUTPUT, {'ass': os.path.join(self.directory, 'subtitles.ass')})
+
+
+class TranscriptWindowTests(MediaTestCase):
+    """Windowed segment fetches and time lookups go through the segment tables."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_file = self.create_media_file()
+        # Not indexed yet: the first request builds the tables from the raw output
+        Transcription.objects.create(media_file=self.media_file, raw_whisperx_output=TranscriptStoreTests.OUTPUT)
+
+    def test_time_window(self):
+        url = reverse('transcriptions:transcription_segments', args=[self.media_file.id])
+        response = self.client.get(url, {'start': 1.5, 'end': 6})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['segment_count'], 3)
+        self.assertEqual([segment['index'] for segment in response.data['segments']], [0, 1])
+        self.assertNotIn('words', response.data['segments'][0])
+
+    def test_non_finite_times_are_rejected(self):
+        segments_url = reverse('transcriptions:transcription_segments', args=[self.media_file.id])
+        at_url = reverse('transcriptions:transcription_at', args=[self.media_file.id])
+
+        self.assertEqual(self.client.get(segments_url, {'start': 'nan'}).status_code, 400)
+        self.assertEqual(self.client.get(segments_url, {'start': 0, 'end': 'nan'}).status_code, 400)
+        self.assertEqual(self.client.get(segments_url, {'start': 0, 'end': 'inf'}).status_code, 400)
+        self.assertEqual(self.client.get(at_url, {'t': 'nan'}).status_code, 400)
+
+        # Without an end, the window runs to the end of the transcript
+        response = self.client.get(segments_url, {'start': 1.5})
+        self.assertEqual([segment['index'] for segment in response.data['segments']], [0, 1, 2])
+
+    def test_index_window_with_words(self):
+        url = reverse('transcriptions:transcription_segments', args=[self.media_file.id])
+        response = self.client.get(url, {'from_index': 2, 'to_index': 10, 'words': 'true'})
+
+        self.assertEqual([segment['index'] for segment in response.data['segments']], [2])
+        self.assertEqual([word['word'] for word in response.data['segments'][0]['words']], ['Bold', 'one'])
+
+    def test_lookup_at_time(self):
+        url = reverse('transcriptions:transcription_at', args=[self.media_file.id])
+
+        response = self.client.get(url, {'t': 1.0})
+        self.assertEqual(response.data['segment']['index'], 0)
+        self.assertEqual(response.data['word']['word'], 'there')
+
+        response = self.client.get(url, {'t': 3.0})
+        self.assertIsNone(response.data['segment'])
+        self.assertIsNone(response.data['word'])
+
+    def test_empty_transcript_is_indexed_once(self):
+        media_file = self.create_media_file()
+        Transcription.objects.create(media_file=media_file, raw_whisperx_output={'segments': []})
+        url = reverse('transcriptions:transcription_segments', args=[media_file.id])
+
+        response = self.client.get(url, {'start': 0, 'end': 60})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['segments'], [])
+
+        # Indexed now: the read path does not rebuild the tables again
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'start': 0, 'end': 60})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries if q['sql'].startswith(('DELETE', 'INSERT', 'UPDATE'))])
+
+
+class TranscriptionPayloadTests(MediaTestCase):
+    """Raw output is opt-in, `?fields=` narrows responses and status polls stay small."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_file = self.create_media_file()
+        Transcription.objects.create(
+            media_file=self.media_file,
+            vtt_file_path='transcriptions/lesson.vtt',
+            raw_whisperx_output=TranscriptStoreTests.OUTPUT,
+            word_count=6,
+        )
+
+    def test_raw_output_is_opt_in(self):
+        url = reverse('transcriptions:transcription_detail', args=[self.media_file.id])
+
+        response = self.client.get(url)
+        self.assertNotIn('raw_whisperx_output', response.data)
+        self.assertTrue(response.data['has_raw_output'])
+        self.assertEqual(response.data['media_file']['user']['username'], 'learner')
+
+        response = self.client.get(url, {'include_raw': 'true'})
+        self.assertEqual(response.data['raw_whisperx_output'], TranscriptStoreTests.OUTPUT)
+
+    def test_sparse_fields(self):
+        url = reverse('transcriptions:transcription_detail', args=[self.media_file.id])
+        response = self.client.get(url, {'fields': 'id,has_vtt,word_count,unknown'})
+
+        self.assertEqual(set(response.data), {'id', 'has_vtt', 'word_count'})
+
+    def test_status_loads_only_summary_columns(self):
+        url = reverse('transcriptions:transcription_status', args=[self.media_file.id])
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'fields': 'status,is_completed,has_vtt,word_count'})
+
+        self.assertEqual(response.data, {'status': 'completed', 'is_completed': True, 'has_vtt': True, 'word_count': 6})
+
+
+@override_settings(FILE_OFFLOAD_MODE='')
+class SubtitleArtifactCacheTests(MediaTestCase):
+    """Subtitle formats are rendered on first request, reused, and invalidated by edits."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_file = self.create_media_file()
+        self.transcription = Transcription.objects.create(media_file=self.media_file)
+        TranscriptStore.save(self.transcription, TranscriptStoreTests.OUTPUT)
+        self.transcription.save()
+
+    def serve(self, file_type):
+        url = reverse('transcriptions:serve_subtitle_file', args=[self.media_file.id, file_type])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_renders_on_first_request_and_reuses(self):
+        self.assertTrue(self.transcription.has_srt)
+        cache_path = SubtitleArtifactCache.cache_dir(self.transcription) / 'v1' / FILENAMES['srt']
+        self.assertFalse(cache_path.exists())
+
+        expected = os.path.join(self.media_root, 'expected.srt')
+        SRTGenerator.generate(TranscriptStore.output(self.transcription), expected)
+        with open(expected, 'rb') as f:
+            self.assertEqual(self.serve('srt'), f.read())
+        self.assertTrue(cache_path.exists())
+
+        cache_path.write_bytes(b'cached')
+        self.assertEqual(self.serve('srt'), b'cached')
+
+    def test_edit_bumps_version_and_invalidates(self):
+        self.serve('vtt')
+        url = reverse('transcriptions:update_transcription_segments', args=[self.media_file.id])
+        response = self.client.put(
+            url,
+            {'segments': [{'start': 0.0, 'end': 1.5, 'text': 'Edited line'}]},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.transcription.refresh_from_db()
+        self.assertEqual(self.transcription.version, 2)
+        self.assertFalse((SubtitleArtifactCache.cache_dir(self.transcription) / 'v1').exists())
+        self.assertIn(b'Edited line', self.serve('vtt'))
+
+    @override_settings(SUBTITLE_CACHE_MAX_MB=0)
+    def test_evicts_least_recently_used(self):
+        version_dir = SubtitleArtifactCache.cache_dir(self.transcription) / 'v1'
+        self.serve('vtt')
+        self.serve('srt')
+
+        self.assertFalse((version_dir / FILENAMES['vtt']).exists())
+        self.assertTrue((version_dir / FILENAMES['srt']).exists())
+
+    def test_render_leaves_other_partial_files_alone(self):
+        # Another worker process mid-render of the same format
+        version_dir = SubtitleArtifactCache.cache_dir(self.transcription) / 'v1'
+        version_dir.mkdir(parents=True)
+        other_partial = version_dir / (FILENAMES['vtt'] + '.partial')
+        other_partial.write_bytes(b'half a render')
+
+        self.assertIn(b'WEBVTT', self.serve('vtt'))
+        self.assertEqual(other_partial.read_bytes(), b'half a render')
+        self.assertEqual(sorted(path.name for path in version_dir.iterdir()), sorted([FILENAMES['vtt'], other_partial.name]))
+
+    def test_failed_edit_changes_nothing(self):
+        self.serve('vtt')
+        url = reverse('transcriptions:update_transcription_segments', args=[self.media_file.id])
+
+        with mock.patch.object(SubtitleArtifactCache, 'invalidate', side_effect=OSError('disk gone')):
+            response = self.client.put(
+                url,
+                {'segments': [{'start': 0.0, 'end': 1.5, 'text': 'Edited line'}]},
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 500)
+
+        # The tables are unchanged under the version whose renders are cached
+        self.transcription.refresh_from_db()
+        self.assertEqual(self.transcription.version, 1)
+        self.assertEqual(self.transcription.segments.count(), 3)
+        self.assertNotIn(b'Edited line', self.serve('vtt'))
+
+    def test_concurrent_edits_each_bump_version(self):
+        save = TranscriptStore.save
+
+        def save_during_other_edit(transcription, output):
+            save(transcription, output)
+            # Another edit of the same transcript commits meanwhile
+            Transcription.objects.filter(id=transcription.id).update(version=F('version') + 1)
+
+        url = reverse('transcriptions:update_transcription_segments', args=[self.media_file.id])
+        with mock.patch.object(TranscriptStore, 'save', side_effect=save_during_other_edit):
+            response = self.client.put(
+                url,
+                {'segments': [{'start': 0.0, 'end': 1.5, 'text': 'Edited line'}]},
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+        self.transcription.refresh_from_db()
+        self.assertEqual(self.transcription.version, 3)
+        self.assertEqual(self.transcription.segment_count, 1)
+        self.assertIn(b'Edited line', self.serve('vtt'))
+
+
+
+@override_settings(
+    TRANSCRIPTION_MAX_CONCURRENT_JOBS=1,
+    TRANSCRIPTION_MAX_CONCURRENT_PER_USER=1,
+    TRANSCRIPTION_AGING_RATE=0.0,
+    TRANSCRIPTION_JOB_OVERHEAD_SECONDS=10,
+    TRANSCRIPTION_SECONDS_PER_AUDIO_SECOND=0.5,
+)
+class TranscriptionSchedulerTests(MediaTestCase):
+    """Queued jobs are ordered by weighted fair queuing under the quotas, with start estimates."""
+
+    def setUp(self):
+        super().setUp()
+        self.scheduler = TranscriptionScheduler()
+        self.other_user = get_user_model().objects.create_user(username='other', password='secret')
+
+    def occupy_slot(self, user, cost):
+        """A job of `user` that has just started, so nothing queued is dispatched."""
+        self.scheduler._running[f'running-{len(self.scheduler._running)}'] = {
+            'user_id': user.id, 'cost': cost, 'started_at': time.monotonic(),
+        }
+
+    def submit(self, user, duration):
+        media_file = self.create_media_file(user=user, duration_seconds=duration)
+        self.scheduler.submit(media_file, lambda media_file: None)
+        return media_file
+
+    def positions(self, *media_files):
+        return [self.scheduler.queue_status(media_file.id)['queue_position'] for media_file in media_files]
+
+    def test_users_take_turns(self):
+        self.occupy_slot(self.user, 100)
+        first, second, third = (self.submit(self.user, 600) for _ in range(3))
+        other = self.submit(self.other_user, 600)
+
+        self.assertEqual(self.positions(first, other, second, third), [1, 2, 3, 4])
+
+    def test_shorter_media_first_within_a_user(self):
+        self.occupy_slot(self.other_user, 100)
+        long_file = self.submit(self.user, 3600)
+        short_file = self.submit(self.user, 60)
+
+        self.assertEqual(self.positions(short_file, long_file), [1, 2])
+
+    @override_settings(TRANSCRIPTION_MAX_CONCURRENT_JOBS=2)
+    def test_per_user_quota(self):
+        self.occupy_slot(self.user, 300)  # Done in 160s
+        self.occupy_slot(get_user_model().objects.create_user(username='third', password='secret'), 100)  # 60s
+        own = self.submit(self.user, 60)
+        other = self.submit(self.other_user, 60)
+
+        # The slot freed at 60s goes to the other user; the user's own job waits for their running one
+        self.assertEqual(self.positions(other, own), [1, 2])
+        self.assertAlmostEqual(self.scheduler.queue_status(other.id)['estimated_start_seconds'], 60, delta=1)
+        self.assertAlmostEqual(self.scheduler.queue_status(own.id)['estimated_start_seconds'], 160, delta=1)
+
+    def test_estimates_are_cached_until_the_queue_changes(self):
+        self.occupy_slot(self.other_user, 100)
+        first = self.submit(self.user, 60)
+        second = self.submit(self.user, 120)
+
+        # The running job needs 10 + 100 * 0.5 seconds, then `first` 10 + 60 * 0.5
+        self.assertAlmostEqual(self.scheduler.queue_status(first.id)['estimated_start_seconds'], 60, delta=1)
+        self.assertAlmostEqual(self.scheduler.queue_status(second.id)['estimated_start_seconds'], 100, delta=1)
+        plan = self.scheduler._plan
+        self.scheduler.queue_status(first.id)
+        self.assertIs(self.scheduler._plan, plan)
+
+        self.scheduler.cancel(first.id)
+        self.assertIsNone(self.scheduler.queue_status(first.id))
+        self.assertAlmostEqual(self.scheduler.queue_status(second.id)['estimated_start_seconds'], 60, delta=1)
+        self.assertIsNot(self.scheduler._plan, plan)
@@ -0,0 +1,60 @@
+"""
+Subtitle timestamp formatting on integer milliseconds.
+
+Times are rounded to the nearest millisecond once and then split with
+integer arithmetic, so float error cannot shift a cue by a millisecond
+(1.9999999 is 00:00:02.000, not 00:00:01.999). Negative times clamp to zero.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # format_timestamps falls back to one call per value
+    np = None
+
+# Zero-padded digits, looked up rather than formatted
+_TWO_DIGITS = [f"{i:02d}" for i in range(100)]
+_THREE_DIGITS = [f"{i:03d}" for i in range(1000)]
+
+
+def to_millis(seconds):
+    """Seconds rounded to the nearest whole millisecond (at least 0)."""
+    return max(round(seconds * 1000), 0)
+
+
+def format_timestamp(seconds, separator='.'):
+    """HH:MM:SS.mmm (WebVTT), or HH:MM:SS,mmm (SRT) with separator=','."""
+    hours, millis = divmod(to_millis(seconds), 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return (
+        f"{_TWO_DIGITS[hours] if hours < 100 else hours}:"
+        f"{_TWO_DIGITS[minutes]}:{_TWO_DIGITS[secs]}{separator}{_THREE_DIGITS[millis]}"
+    )
+
+
+def format_clock(seconds):
+    """HH:MM:SS, the whole seconds of format_timestamp."""
+    hours, secs = divmod(to_millis(seconds) // 1000, 3600)
+    minutes, secs = divmod(secs, 60)
+    return f"{_TWO_DIGITS[hours] if hours < 100 else hours}:{_TWO_DIGITS[minutes]}:{_TWO_DIGITS[secs]}"
+
+
+def format_timestamps(values, separator='.'):
+    """
+    format_timestamp over a sequence of times, with the rounding and
+    splitting done for the whole array at once when numpy is available.
+    Worth it from a few hundred values; below that call format_timestamp.
+    """
+    if np is None:
+        return [format_timestamp(value, separator) for value in values]
+
+    millis = np.maximum(np.rint(np.asarray(values, dtype=np.float64) * 1000), 0).astype(np.int64)
+    hours, millis = np.divmod(millis, 3600000)
+    minutes, millis = np.divmod(millis, 60000)
+    secs, millis = np.divmod(millis, 1000)
+
+    two, three = _TWO_DIGITS, _THREE_DIGITS
+    return [
+        f"{two[h] if h < 100 else h}:{two[m]}:{two[s]}{separator}{three[ms]}"
+        for h, m, s, ms in zip(hours.tolist(), minutes.tolist(), secs.tolist(), millis.tolist())
+    ]
@@ -0,0 +1,371 @@
+import io
+import os
+import gzip
+import json
+import logging
+import functools
+from pathlib import Path
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F
+from .models import Transcription, TranscriptSegment, TranscriptWord
+from .rendering import TranscriptStats
+
+try:
+    import zstandard
+except ImportError:  # Raw output files are gzip-compressed without zstandard
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+RAW_OUTPUT_NAME = 'raw_whisperx_output.json'
+RAW_OUTPUT_CACHE_SIZE = 4  # Decoded raw output files kept in memory
+RAW_OUTPUT_ZSTD_LEVEL = 10
+RAW_OUTPUT_GZIP_LEVEL = 6
+
+# Compact: no indentation or spaces after separators
+_raw_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+class TranscriptStore:
+    """
+    Normalized transcript storage: one TranscriptSegment row per segment and
+    one TranscriptWord row per word, keyed by transcription and index with
+    start/end indexes.
+
+    These tables are the working copy that reads, edits and statistics go
+    through. The raw WhisperX response is cold storage, kept only when
+    TRANSCRIPTION_STORE_RAW_OUTPUT is set.
+    """
+
+    @staticmethod
+    def save(transcription, whisperx_output):
+        """
+        Make the stored segments and words match a WhisperX-shaped output,
+        and update the transcription's counts (not saved).
+
+        Only rows that differ are written: editing one segment updates that
+        segment and replaces its words, and words after it are renumbered
+        only if its word count changed.
+        """
+        segments = whisperx_output.get('segments', []) if isinstance(whisperx_output, dict) else []
+
+        new_rows = []
+        new_words = []
+        stats = TranscriptStats()
+        for segment in segments:
+            stats.add(segment)
+            new_rows.append((
+                float(segment.get('start') or 0),
+                float(segment.get('end') or 0),
+                segment.get('text', '').strip(),
+                segment.get('speaker'),
+            ))
+            new_words.append([
+                (
+                    word['word'][:255],
+                    word.get('start'),
+                    word.get('end'),
+                    word.get('score'),
+                    word.get('speaker', segment.get('speaker')),
+                )
+                for word in segment.get('words') or []
+                if word.get('word')
+            ])
+
+        with db_transaction.atomic():
+            old_segments = list(
+                TranscriptSegment.objects.filter(transcription=transcription).order_by('index')
+            )
+            old_words = {}
+            old_offsets = {}
+            word_rows = TranscriptWord.objects.filter(transcription=transcription).order_by('index').values_list(
+                'segment_id', 'index', 'word', 'start', 'end', 'score', 'speaker'
+            )
+            for segment_id, index, *values in word_rows:
+                old_offsets.setdefault(segment_id, index)
+                old_words.setdefault(segment_id, []).append(tuple(values))
+
+            # Segments past the new end go, with their words
+            TranscriptSegment.objects.filter(transcription=transcription, index__gte=len(new_rows)).delete()
+
+            changed = []
+            for segment, row in zip(old_segments, new_rows):
+                if (segment.start, segment.end, segment.text, segment.speaker) != row:
+                    segment.start, segment.end, segment.text, segment.speaker = row
+                    changed.append(segment)
+            TranscriptSegment.objects.bulk_update(changed, ['start', 'end', 'text', 'speaker'], batch_size=BATCH_SIZE)
+
+            TranscriptSegment.objects.bulk_create(
+                [
+                    TranscriptSegment(
+                        transcription=transcription,
+                        index=i,
+                        start=start,
+                        end=end,
+                        text=text,
+                        speaker=speaker,
+                    )
+                    for i, (start, end, text, speaker) in enumerate(new_rows)
+                    if i >= len(old_segments)
+                ],
+                batch_size=BATCH_SIZE
+            )
+            # Not every backend returns primary keys from bulk_create
+            segment_ids = [segment.id for segment in old_segments[:len(new_rows)]]
+            if len(new_rows) > len(old_segments):
+                segment_ids += list(
+                    TranscriptSegment.objects.filter(transcription=transcription, index__gte=len(old_segments))
+                    .order_by('index').values_list('id', flat=True)
+                )
+
+            # Keep the words of unchanged segments, renumbering them if words before them changed count
+            rewrite = []
+            shifts = {}
+            offset = 0
+            for i, words in enumerate(new_words):
+                segment_id = segment_ids[i]
+                if old_words.get(segment_id, []) != words:
+                    rewrite.append(i)
+                elif words and old_offsets[segment_id] != offset:
+                    shifts.setdefault(offset - old_offsets[segment_id], []).append(segment_id)
+                offset += len(words)
+
+            TranscriptWord.objects.filter(segment_id__in=[segment_ids[i] for i in rewrite]).delete()
+            TranscriptStore._shift_words(transcription, shifts, offset + len(word_rows))
+
+            words = []
+            offset = 0
+            rewrite = set(rewrite)
+            for i, segment_words in enumerate(new_words):
+                if i in rewrite:
+                    words.extend(
+                        TranscriptWord(
+                            transcription=transcription,
+                            segment_id=segment_ids[i],
+                            index=offset + j,
+                            word=word,
+                            start=start,
+                            end=end,
+                            score=score,
+                            speaker=speaker,
+                        )
+                        for j, (word, start, end, score, speaker) in enumerate(segment_words)
+                    )
+                offset += len(segment_words)
+            TranscriptWord.objects.bulk_create(words, batch_size=BATCH_SIZE)
+
+        transcription.segment_count = stats.segment_count
+        transcription.word_count = stats.word_count
+        transcription.speaker_count = stats.speaker_count
+        transcription.max_segment_seconds = stats.max_segment_seconds
+
+    @staticmethod
+    def _shift_words(transcription, shifts, headroom):
+        """
+        Add each delta in `shifts` ({delta: [segment_id, ...]}) to the index of
+        those segments' words. Done in two passes through indexes above
+        `headroom`, so no intermediate state breaks the unique word index.
+        """
+        if not shifts:
+            return
+        for delta, ids in shifts.items():
+            for i in range(0, len(ids), BATCH_SIZE):
+                TranscriptWord.objects.filter(segment_id__in=ids[i:i + BATCH_SIZE]).update(
+                    index=F('index') + headroom + delta
+                )
+        TranscriptWord.objects.filter(transcription=transcription, index__gte=headroom).update(
+            index=F('index') - headroom
+        )
+
+    @staticmethod
+    def has_index(transcription):
+        """
+        Whether the tables hold this transcription. save() is the only writer
+        of max_segment_seconds (0 for an empty transcript), so it marks an
+        indexed transcription, segments or not; rows indexed before it existed
+        are found by their segments.
+        """
+        if transcription.max_segment_seconds is not None:
+            return True
+        return TranscriptSegment.objects.filter(transcription=transcription).exists()
+
+    @staticmethod
+    def ensure_index(transcription):
+        """Index a transcription from its raw output on first use. Returns whether it is indexed."""
+        return TranscriptStore.has_index(transcription) or TranscriptStore.backfill(transcription)
+
+    @staticmethod
+    def segments_between(transcription, start, end):
+        """
+        Segments overlapping [start, end) seconds, in order.
+
+        No segment is longer than max_segment_seconds, so any overlapping one
+        starts within [start - max_segment_seconds, end): a range scan of the
+        (transcription, start) index rather than a test of every segment.
+        """
+        segments = TranscriptSegment.objects.filter(transcription=transcription, start__lt=end, end__gt=start)
+        if transcription.max_segment_seconds is not None:
+            segments = segments.filter(start__gte=start - transcription.max_segment_seconds)
+        return segments.order_by('index')
+
+    @staticmethod
+    def segment_at(transcription, time):
+        """The segment being spoken at `time` seconds (the latest-starting one if they overlap), or None."""
+        return TranscriptStore._latest_covering(TranscriptSegment.objects.filter(transcription=transcription), transcription, time)
+
+    @staticmethod
+    def word_at(transcription, time):
+        """The word being spoken at `time` seconds, or None."""
+        return TranscriptStore._latest_covering(TranscriptWord.objects.filter(transcription=transcription), transcription, time)
+
+    @staticmethod
+    def _latest_covering(queryset, transcription, time):
+        queryset = queryset.filter(start__lte=time, end__gt=time)
+        if transcription.max_segment_seconds is not None:
+            # Words lie within their segment, so the same bound applies
+            queryset = queryset.filter(start__gte=time - transcription.max_segment_seconds)
+        return queryset.order_by('-start', '-index').first()
+
+    @staticmethod
+    def words_for(segments):
+        """Words of the given segments, grouped by segment id, in order."""
+        words_by_segment = {}
+        for word in TranscriptWord.objects.filter(segment__in=segments).order_by('index'):
+            words_by_segment.setdefault(word.segment_id, []).append(word)
+        return words_by_segment
+
+    @staticmethod
+    def output(transcription, words=True):
+        """
+        WhisperX-shaped `{'segments': [...]}` rebuilt from the tables, with
+        each segment's words unless `words` is False, for subtitle generation
+        and edits.
+        """
+        words_by_segment = {}
+        word_rows = TranscriptWord.objects.filter(transcription=transcription).order_by('index') if words else ()
+        for word in word_rows:
+            entry = {'word': word.word}
+            for field in ('start', 'end', 'score', 'speaker'):
+                value = getattr(word, field)
+                if value is not None:
+                    entry[field] = value
+            words_by_segment.setdefault(word.segment_id, []).append(entry)
+
+        segments = []
+        for segment in TranscriptSegment.objects.filter(transcription=transcription).order_by('index'):
+            entry = {'start': segment.start, 'end': segment.end, 'text': segment.text}
+            if segment.speaker:
+                entry['speaker'] = segment.speaker
+            if segment.id in words_by_segment:
+                entry['words'] = words_by_segment[segment.id]
+            segments.append(entry)
+
+        return {'segments': segments}
+
+    @staticmethod
+    def raw_output(transcription):
+        """
+        The raw WhisperX response from the DB or its file, or None if it was
+        not kept. Decoded files are cached, so treat the result as read-only.
+        """
+        if transcription.raw_whisperx_output:
+            return transcription.raw_whisperx_output
+        if transcription.raw_whisperx_output_path:
+            full_path = os.path.join(settings.MEDIA_ROOT, transcription.raw_whisperx_output_path)
+            stat = os.stat(full_path)
+            return _read_raw_file(full_path, stat.st_mtime_ns, stat.st_size)
+        return None
+
+    @staticmethod
+    def store_raw_output(transcription, whisperx_output, directory):
+        """
+        Keep the raw output on the transcription (not saved): in the JSONField
+        if it encodes to fewer than TRANSCRIPTION_RAW_OUTPUT_DB_MAX_BYTES
+        characters, otherwise compressed in `directory`. A file it replaces
+        is removed.
+        """
+        previous_path = transcription.raw_whisperx_output_path
+
+        if isinstance(whisperx_output, dict) and _encodes_under(whisperx_output, settings.TRANSCRIPTION_RAW_OUTPUT_DB_MAX_BYTES):
+            transcription.raw_whisperx_output = whisperx_output
+            transcription.raw_whisperx_output_path = None
+        else:
+            path = _write_raw_file(Path(directory) / RAW_OUTPUT_NAME, whisperx_output)
+            transcription.raw_whisperx_output = None
+            transcription.raw_whisperx_output_path = os.path.relpath(path, settings.MEDIA_ROOT)
+
+        if previous_path and previous_path != transcription.raw_whisperx_output_path:
+            try:
+                os.remove(os.path.join(settings.MEDIA_ROOT, previous_path))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def backfill(transcription):
+        """Build the tables from the raw output. Returns False if there is no raw output."""
+        output = TranscriptStore.raw_output(transcription)
+        if not output:
+            return False
+
+        TranscriptStore.save(transcription, output)
+        Transcription.objects.filter(id=transcription.id).update(
+            segment_count=transcription.segment_count,
+            word_count=transcription.word_count,
+            speaker_count=transcription.speaker_count,
+            max_segment_seconds=transcription.max_segment_seconds,
+        )
+        return True
+
+
+def _encodes_under(output, limit):
+    """Whether `output` JSON-encodes to fewer than `limit` characters, encoding only as far as needed."""
+    size = 0
+    for chunk in _raw_encoder.iterencode(output):
+        size += len(chunk)
+        if size >= limit:
+            return False
+    return True
+
+
+def _write_raw_file(base_path, output):
+    """Write `output` as compressed JSON next to `base_path` (adding .zst or .gz). Returns the path."""
+    data = _raw_encoder.encode(output).encode('utf-8')
+
+    if settings.TRANSCRIPTION_RAW_OUTPUT_COMPRESSION == 'zstd' and zstandard is not None:
+        path = base_path.with_name(base_path.name + '.zst')
+        data = zstandard.ZstdCompressor(level=RAW_OUTPUT_ZSTD_LEVEL).compress(data)
+    else:
+        path = base_path.with_name(base_path.name + '.gz')
+        data = gzip.compress(data, compresslevel=RAW_OUTPUT_GZIP_LEVEL, mtime=0)
+
+    temp_path = path.with_name(path.name + '.partial')
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+    return path
+
+
+@functools.lru_cache(maxsize=RAW_OUTPUT_CACHE_SIZE)
+def _read_raw_file(full_path, mtime_ns, size):
+    """
+    Decode a raw output file, decompressing as it is parsed. Keyed by
+    modification time and size as well, so rewritten files are read again.
+    Plain .json files are from before outputs were compressed.
+    """
+    if full_path.endswith('.zst'):
+        if zstandard is None:
+            raise IOError(f"zstandard is needed to read {full_path}")
+        try:
+            with open(full_path, 'rb') as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                return json.load(io.TextIOWrapper(reader, encoding='utf-8'))
+        except zstandard.ZstdError as e:
+            raise IOError(f"Could not decompress {full_path}: {e}") from e
+
+    if full_path.endswith('.gz'):
+        with gzip.open(full_path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    with open(full_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -7,6 +7,11 @@ urlpatterns = [
     # Transcription details
     path('<uuid:file_id>/', views.transcription_detail, name='transcription_detail'),
     path('<uuid:file_id>/status/', views.transcription_status, name='transcription_status'),
+    path('<uuid:file_id>/words/', views.serve_word_timings, name='serve_word_timings'),
+
+    # Windowed transcript access
+    path('<uuid:file_id>/segments/', views.transcription_segments, name='transcription_segments'),
+    path('<uuid:file_id>/at/', views.transcription_at, name='transcription_at'),
 
     # Transcription editing
     path('<uuid:file_id>/update/', views.update_transcription_segments, name='update_transcription_segments'),
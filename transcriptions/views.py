@@ -1,17 +1,25 @@
 import os
 import json
-import copy
+import math
+import gzip
 from pathlib import Path
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse, Http404, HttpResponse
+from django.http import Http404, HttpResponse
 from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from media_files.models import MediaFile
+from media_files.serializers import requested_fields
+from media_files.streaming import file_response
 from .models import Transcription
 from .serializers import TranscriptionSerializer, TranscriptionDetailSerializer
-from .subtitle_generators import VTTGenerator, WordLevelVTTGenerator, SRTGenerator, TXTGenerator
+from .scheduler import transcription_scheduler
+from .subtitle_generators import WordTimingsGenerator
+from .artifacts import SubtitleArtifactCache, LEGACY_PATH_FIELDS
+from .transcript_store import TranscriptStore
 
 
 @api_view(['GET'])
@@ -21,18 +29,26 @@ def transcription_detail(request, file_id):
     Get transcription details for a media file.
     """
     # For testing without authentication, get any media file with this ID
-    media_file = get_object_or_404(MediaFile, id=file_id)
+    media_file = get_object_or_404(MediaFile.objects.select_related('user'), id=file_id)
 
-    try:
-        transcription = media_file.transcription
+    # The raw output can be megabytes, so it is only loaded when asked for
+    fields = requested_fields(request)
+    include_raw = (
+        request.query_params.get('include_raw', 'false').lower() == 'true'
+        or (fields is not None and 'raw_whisperx_output' in fields)
+    )
 
-        # Use detailed serializer if raw output is requested
-        include_raw = request.query_params.get('include_raw', 'false').lower() == 'true'
+    try:
+        transcriptions = Transcription.objects.filter(media_file=media_file)
+        if not include_raw:
+            transcriptions = transcriptions.defer('raw_whisperx_output')
+        transcription = transcriptions.get()
+        transcription.media_file = media_file
 
         if include_raw:
-            serializer = TranscriptionDetailSerializer(transcription)
+            serializer = TranscriptionDetailSerializer(transcription, fields=fields)
         else:
-            serializer = TranscriptionSerializer(transcription)
+            serializer = TranscriptionSerializer(transcription, fields=fields)
 
         return Response(serializer.data)
 
@@ -61,27 +77,14 @@ def download_subtitle_file(request, file_id, file_type):
     try:
         transcription = media_file.transcription
 
-        # Get file path based on type
-        if file_type == 'word_vtt':
-            file_path = transcription.word_level_vtt_file_path
-        else:
-            file_path_attr = f'{file_type}_file_path'
-            file_path = getattr(transcription, file_path_attr)
+        full_path = _subtitle_file(transcription, file_type)
 
-        if not file_path:
+        if not full_path:
             return Response(
                 {'error': f'{file_type.upper()} file not available'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        full_path = os.path.join(settings.MEDIA_ROOT, file_path)
-
-        if not os.path.exists(full_path):
-            return Response(
-                {'error': f'{file_type.upper()} file not found on disk'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
         # Determine content type
         content_types = {
             'vtt': 'text/vtt',
@@ -91,15 +94,14 @@ def download_subtitle_file(request, file_id, file_type):
         }
 
         try:
-            response = FileResponse(
-                open(full_path, 'rb'),
-                content_type=content_types[file_type]
-            )
-
             filename = f"{media_file.filename_original}_{file_type}.{file_type}"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-            return response
+            return file_response(
+                request,
+                full_path,
+                content_types[file_type],
+                filename=filename,
+                disposition='attachment'
+            )
 
         except IOError:
             return Response(
@@ -132,21 +134,11 @@ def serve_subtitle_file(request, file_id, file_type):
     try:
         transcription = media_file.transcription
 
-        # Get file path based on type
-        if file_type == 'word_vtt':
-            file_path = transcription.word_level_vtt_file_path
-        else:
-            file_path_attr = f'{file_type}_file_path'
-            file_path = getattr(transcription, file_path_attr)
+        full_path = _subtitle_file(transcription, file_type)
 
-        if not file_path:
+        if not full_path:
             raise Http404(f'{file_type.upper()} file not available')
 
-        full_path = os.path.join(settings.MEDIA_ROOT, file_path)
-
-        if not os.path.exists(full_path):
-            raise Http404(f'{file_type.upper()} file not found on disk')
-
         # Determine content type
         content_types = {
             'vtt': 'text/vtt',
@@ -155,10 +147,7 @@ def serve_subtitle_file(request, file_id, file_type):
         }
 
         try:
-            response = FileResponse(
-                open(full_path, 'rb'),
-                content_type=content_types[file_type]
-            )
+            response = file_response(request, full_path, content_types[file_type])
 
             # Set headers for inline display
             response['Content-Disposition'] = 'inline'
@@ -173,6 +162,208 @@ def serve_subtitle_file(request, file_id, file_type):
         raise Http404('Transcription not found')
 
 
+def _subtitle_file(transcription, file_type):
+    """
+    Full path of a subtitle format for the transcription: the file written
+    when it was transcribed if there is one, else the render in the
+    subtitle cache (made now if needed). None if neither is available.
+    """
+    legacy_path = getattr(transcription, LEGACY_PATH_FIELDS[file_type])
+    if legacy_path:
+        full_path = os.path.join(settings.MEDIA_ROOT, legacy_path)
+        if os.path.exists(full_path):
+            return full_path
+
+    try:
+        return SubtitleArtifactCache.path(transcription, file_type)
+    except (IOError, json.JSONDecodeError):
+        return None
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])  # Temporarily allow any for testing
+def transcription_segments(request, file_id):
+    """
+    Get a window of segments: by time (`?start=<s>&end=<s>`, segments
+    overlapping the range) or by index (`?from_index=<i>&to_index=<j>`,
+    end exclusive). Add `?words=true` to include each segment's words.
+    At most TRANSCRIPT_WINDOW_MAX_SEGMENTS segments are returned.
+    """
+    # For testing without authentication, get any media file with this ID
+    media_file = get_object_or_404(MediaFile, id=file_id)
+    transcription = _indexed_transcription(media_file)
+
+    limit = settings.TRANSCRIPT_WINDOW_MAX_SEGMENTS
+    try:
+        if 'start' in request.query_params or 'end' in request.query_params:
+            end = request.query_params.get('end')
+            segments = TranscriptStore.segments_between(
+                transcription,
+                _seconds(request.query_params.get('start', 0)),
+                _seconds(end) if end is not None else math.inf
+            )
+        else:
+            from_index = int(request.query_params.get('from_index', 0))
+            to_index = int(request.query_params.get('to_index', from_index + limit))
+            segments = transcription.segments.filter(index__gte=from_index, index__lt=to_index).order_by('index')
+    except ValueError:
+        return Response(
+            {'error': 'start/end must be seconds and from_index/to_index integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    segments = list(segments[:limit])
+    include_words = request.query_params.get('words', 'false').lower() == 'true'
+    words_by_segment = TranscriptStore.words_for(segments) if include_words else {}
+
+    return Response({
+        'segment_count': transcription.segment_count,
+        'segments': [
+            _segment_payload(segment, words_by_segment.get(segment.id, []) if include_words else None)
+            for segment in segments
+        ],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])  # Temporarily allow any for testing
+def transcription_at(request, file_id):
+    """
+    What is being said at `?t=<seconds>`: the segment and word there (null
+    between them), each found with one bounded index lookup.
+    """
+    # For testing without authentication, get any media file with this ID
+    media_file = get_object_or_404(MediaFile, id=file_id)
+    transcription = _indexed_transcription(media_file)
+
+    try:
+        time = _seconds(request.query_params['t'])
+    except (KeyError, ValueError):
+        return Response(
+            {'error': 'Provide t in seconds'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    segment = TranscriptStore.segment_at(transcription, time)
+    word = TranscriptStore.word_at(transcription, time)
+
+    return Response({
+        'segment': _segment_payload(segment) if segment else None,
+        'word': _word_payload(word) if word else None,
+    })
+
+
+def _seconds(value):
+    """A query parameter as a finite number of seconds; ValueError for nan, inf or non-numbers."""
+    seconds = float(value)
+    if not math.isfinite(seconds):
+        raise ValueError(f'{value} is not a finite number of seconds')
+    return seconds
+
+
+def _indexed_transcription(media_file):
+    """The media file's transcription with its segment tables filled, or 404."""
+    try:
+        transcription = media_file.transcription
+    except Transcription.DoesNotExist:
+        raise Http404('Transcription not found')
+
+    try:
+        indexed = TranscriptStore.ensure_index(transcription)
+    except (IOError, json.JSONDecodeError):
+        indexed = False
+    if not indexed:
+        raise Http404('Transcript segments not available')
+    return transcription
+
+
+def _segment_payload(segment, words=None):
+    payload = {
+        'index': segment.index,
+        'start': segment.start,
+        'end': segment.end,
+        'text': segment.text,
+    }
+    if segment.speaker:
+        payload['speaker'] = segment.speaker
+    if words is not None:
+        payload['words'] = [_word_payload(word) for word in words]
+    return payload
+
+
+def _word_payload(word):
+    payload = {'index': word.index, 'word': word.word, 'start': word.start, 'end': word.end}
+    if word.score is not None:
+        payload['score'] = word.score
+    return payload
+
+
+def _accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header allows gzip, honouring q-values (gzip;q=0 refuses it)."""
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])  # Temporarily allow any for testing
+def serve_word_timings(request, file_id):
+    """
+    Serve the binary word timings (see WordTimingsGenerator), gzip-encoded.
+    The ETag is the transcription version, so unchanged transcripts
+    revalidate with a 304 without the timings being read or rendered.
+    """
+    # For testing without authentication, get any media file with this ID
+    media_file = get_object_or_404(MediaFile, id=file_id)
+
+    try:
+        transcription = media_file.transcription
+    except Transcription.DoesNotExist:
+        raise Http404('Transcription not found')
+
+    use_gzip = _accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    # Strong validators differ per content-coding, so the gzip body has its own
+    etag = f'"{transcription.id}-v{transcription.version}-{WordTimingsGenerator.VERSION}{"-gz" if use_gzip else ""}"'
+    if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+        response = HttpResponse(status=304)
+    else:
+        file_path = _subtitle_file(transcription, 'word_timings')
+        if not file_path:
+            raise Http404('Word timings not available')
+
+        with open(file_path, 'rb') as f:
+            compressed = f.read()
+
+        if use_gzip:
+            response = HttpResponse(compressed, content_type='application/octet-stream')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(compressed), content_type='application/octet-stream')
+
+    response['ETag'] = etag
+    response['Vary'] = 'Accept-Encoding'
+    # Cacheable, but revalidated on every use since edits change the timings
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])  # Temporarily allow any for testing
 def transcription_status(request, file_id):
@@ -180,11 +371,16 @@ def transcription_status(request, file_id):
     Get transcription status for a media file.
     """
     # For testing without authentication, get any media file with this ID
-    media_file = get_object_or_404(MediaFile, id=file_id)
+    # Polled every few seconds: load only the columns reported here
+    media_file = get_object_or_404(
+        MediaFile.objects.only('id', 'status', 'processing_progress', 'error_message', 'replicate_job_id'),
+        id=file_id
+    )
 
     response_data = {
         'media_file_id': str(media_file.id),
         'status': media_file.status,
+        'processing_progress': media_file.processing_progress,
         'is_processing': media_file.is_processing,
         'is_completed': media_file.is_completed,
         'has_failed': media_file.has_failed,
@@ -192,9 +388,17 @@ def transcription_status(request, file_id):
         'replicate_job_id': media_file.replicate_job_id,
     }
 
+    # Add queue position and estimated start if waiting to be transcribed
+    queue_info = transcription_scheduler.queue_status(media_file.id)
+    if queue_info:
+        response_data.update(queue_info)
+
     # Add transcription info if available
-    try:
-        transcription = media_file.transcription
+    transcription = Transcription.objects.filter(media_file_id=media_file.id).only(
+        'vtt_file_path', 'word_level_vtt_file_path', 'srt_file_path', 'txt_file_path',
+        'word_count', 'segment_count', 'speaker_count'
+    ).first()
+    if transcription:
         response_data.update({
             'transcription_available': True,
             'has_vtt': transcription.has_vtt,
@@ -205,9 +409,13 @@ def transcription_status(request, file_id):
             'segment_count': transcription.segment_count,
             'speaker_count': transcription.speaker_count,
         })
-    except Transcription.DoesNotExist:
+    else:
         response_data['transcription_available'] = False
 
+    fields = requested_fields(request)
+    if fields is not None:
+        response_data = {key: value for key, value in response_data.items() if key in fields}
+
     return Response(response_data)
 
 
@@ -265,20 +473,16 @@ def update_transcription_segments(request, file_id):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-    # Get the original WhisperX output
-    original_output = None
-    if transcription.raw_whisperx_output:
-        original_output = copy.deepcopy(transcription.raw_whisperx_output)
-    elif transcription.raw_whisperx_output_path:
-        try:
-            full_path = os.path.join(settings.MEDIA_ROOT, transcription.raw_whisperx_output_path)
-            with open(full_path, 'r', encoding='utf-8') as f:
-                original_output = json.load(f)
-        except (IOError, json.JSONDecodeError):
-            return Response(
-                {'error': 'Could not load original transcription data'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+    # Get the original WhisperX output, or the indexed segments when the raw output was not kept
+    try:
+        original_output = TranscriptStore.raw_output(transcription)
+    except (IOError, json.JSONDecodeError):
+        return Response(
+            {'error': 'Could not load original transcription data'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    if original_output is None and TranscriptStore.has_index(transcription):
+        original_output = TranscriptStore.output(transcription)
 
     if not original_output or 'segments' not in original_output:
         return Response(
@@ -286,8 +490,8 @@ def update_transcription_segments(request, file_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-    # Update the segments in the output
-    updated_output = copy.deepcopy(original_output)
+    # Update the segments in the output; the rest is kept as is, so a shallow copy will do
+    updated_output = dict(original_output)
     updated_output['segments'] = []
 
     for segment in updated_segments:
@@ -307,54 +511,32 @@ def update_transcription_segments(request, file_id):
 
         updated_output['segments'].append(updated_segment)
 
-    # Save the updated output
-    if transcription.raw_whisperx_output:
-        transcription.raw_whisperx_output = updated_output
-    else:
-        # Save to file
+    transcription_dir = Path(settings.MEDIA_ROOT) / 'transcriptions' / str(media_file.user.id) / str(media_file.id)
+
+    # Save the updated output, if the raw output is kept
+    if transcription.raw_whisperx_output or transcription.raw_whisperx_output_path:
         try:
-            full_path = os.path.join(settings.MEDIA_ROOT, transcription.raw_whisperx_output_path)
-            with open(full_path, 'w', encoding='utf-8') as f:
-                json.dump(updated_output, f, indent=2, ensure_ascii=False)
+            transcription_dir.mkdir(parents=True, exist_ok=True)
+            TranscriptStore.store_raw_output(transcription, updated_output, transcription_dir)
         except IOError:
             return Response(
                 {'error': 'Could not save updated transcription data'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    # Regenerate subtitle files with updated content
+    # Re-index, then bump the version so subtitle formats are rendered afresh on their next request.
+    # Together, so the tables never change under a version whose renders are cached
     try:
-        transcription_dir = Path(settings.MEDIA_ROOT) / 'transcriptions' / str(media_file.user.id) / str(media_file.id)
-        transcription_dir.mkdir(parents=True, exist_ok=True)
-
-        # Regenerate VTT file
-        if transcription.vtt_file_path:
-            vtt_path = os.path.join(settings.MEDIA_ROOT, transcription.vtt_file_path)
-            VTTGenerator.generate(updated_output, vtt_path)
-
-        # Regenerate word-level VTT file
-        if transcription.word_level_vtt_file_path:
-            word_vtt_path = os.path.join(settings.MEDIA_ROOT, transcription.word_level_vtt_file_path)
-            WordLevelVTTGenerator.generate(updated_output, word_vtt_path)
-
-        # Regenerate SRT file
-        if transcription.srt_file_path:
-            srt_path = os.path.join(settings.MEDIA_ROOT, transcription.srt_file_path)
-            SRTGenerator.generate(updated_output, srt_path)
-
-        # Regenerate TXT file
-        if transcription.txt_file_path:
-            txt_path = os.path.join(settings.MEDIA_ROOT, transcription.txt_file_path)
-            TXTGenerator.generate(updated_output, txt_path)
-
-        # Update segment count
-        transcription.segment_count = len(updated_segments)
-
-        # Update word count
-        total_words = sum(len(segment['text'].split()) for segment in updated_segments)
-        transcription.word_count = total_words
+        with db_transaction.atomic():
+            # Re-index segments and words, updating the counts
+            TranscriptStore.save(transcription, updated_output)
 
-        transcription.save()
+            # Incremented in the database, so concurrent edits each get a version
+            transcription.version = F('version') + 1
+            transcription.save()
+            transcription.refresh_from_db(fields=['version'])
+            SubtitleArtifactCache.invalidate(transcription)
+            transcription.save(update_fields=list(LEGACY_PATH_FIELDS.values()))
 
         return Response({
             'message': 'Transcription updated successfully',
@@ -364,6 +546,6 @@ def update_transcription_segments(request, file_id):
 
     except Exception as e:
         return Response(
-            {'error': f'Error regenerating subtitle files: {str(e)}'},
+            {'error': f'Error saving updated transcription: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )